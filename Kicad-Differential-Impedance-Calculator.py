@@ -1,9 +1,26 @@
+import time
+_SCRIPT_START = time.perf_counter()  # Açılış süresi ölçümü bu satırdan başlar
+
 import math
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-import copy 
 import re 
-import csv 
+from collections import namedtuple, OrderedDict, deque
+import itertools
+import functools
+import contextlib
+import mmap
+import os
+import sys
+import json
+import struct
+import threading
+import queue
+
+# Açılışı hızlandırmak için ağır veya nadiren gereken modüller kullanıldıkları fonksiyonda içe aktarılır:
+# tkinter (_load_tk, yalnızca GUI), numpy (_numpy), concurrent.futures, sqlite3, shelve, csv, copy, glob,
+# random, hashlib, tempfile, argparse, platform, timeit, asyncio (yalnızca servis). re burada kalır; json zaten onu yükler.
+tk = ttk = messagebox = filedialog = None
+np = None  # NumPy isteğe bağlıdır; ilk toplu (batch) hesaplamada yüklenir
+_numpy_checked = False
 
 # --- Dil Sözlükleri (Sadece İngilizce) ---
 MESSAGES = {
@@ -28,6 +45,29 @@ MESSAGES = {
     "MM": "mm",
     "EXPORT_CSV": "Export to CSV",
     "IMPORT_CSV": "Import from CSV",
+    "IMPORT_KICAD": "Import from KiCad (.kicad_pcb)",
+    "LIBRARY_BUTTON": "Stackup Library...",
+    "LIBRARY_TITLE": "Stackup Library",
+    "LIBRARY_SEARCH": "Search:",
+    "LIBRARY_LAYERS": "Layers:",
+    "LIBRARY_THICKNESS": "Total Thickness (mm):",
+    "LIBRARY_ALL": "All",
+    "LIBRARY_LOAD": "Load Selected",
+    "LIBRARY_ADD": "Add Current Stackup...",
+    "LIBRARY_REMOVE": "Remove Selected",
+    "LIBRARY_NAME": "Stackup Name:",
+    "LIBRARY_REPLACE": "'{name}' is already in the library. Replace it?",
+    "LIBRARY_SHOWING": "Showing {shown} of {matches} matching stackups ({total} in library)",
+    "OPT_BUTTON": "Optimize Stackup...",
+    "OPT_TITLE": "Stackup Optimizer",
+    "OPT_TARGETS": "Targets (layer=Zdiff[/tol]; ...):",
+    "OPT_DK_VALUES": "Allowed Dk values:",
+    "OPT_MIN_TOTAL": "Minimum total thickness (mm):",
+    "OPT_MAX_TOTAL": "Maximum total thickness (mm):",
+    "OPT_HINT": "Zdiff may be a number or an interface from the Standards tab (e.g. 1. Top Layer=USB 2.0). W, Gap and S are taken from the Calculation tab; Prepreg and Core thicknesses and Dk values are optimized.",
+    "OPT_APPLY": "Apply Selected Stackup",
+    "OPT_MET": "All targets met",
+    "OPT_NOT_MET": "Not met",
     "SYNC_SAVE": "Save Stackup Data / Synchronize",
     
     # Stackup Table Headers
@@ -63,16 +103,81 @@ MESSAGES = {
     "LABEL_USED_PARAMS": "Used H, T, Er:",
     "LABEL_MODEL": "Model Selection:",
     "LABEL_CPWG": "CPWG Control:",
+    "LABEL_CACHE": "Cache:",
+    "PROFILE_MODE": "Profile",
+    "JOB_CANCEL": "Cancel",
+    "JOB_RUNNING": "Running: {title} ({percent:.0f} %)",
+    "JOB_QUEUED": "{count} more queued",
+    "PROFILE_SAVE": "Save Profile...",
+    "STARTUP_SUMMARY": "Started in {first_window:.0f} ms (import {import:.0f}, Tk {tk:.0f}, window {build:.0f} ms)",
+    "GROUP_SLIDERS": "Interactive Geometry",
+    "SLIDER_ZDIFF": "Zdiff = {zdiff:.2f} Ω",
+    "CACHE_STATS": "{hits} hits, {disk_hits} from disk, {misses} misses ({size}/{maxsize} entries)",
     "CPWG_IGNORED": "(Lateral Ground S ignored, since S > H)",
     "CPWG_APPLIED": "(Lateral Ground S EFFECTIVE! CPWG Correction Applied)",
+    "CPWG_FIELD": "(Lateral Ground S included in the field solution)",
+    "LOSS_BUTTON": "Loss / Touchstone Export...",
+    "LOSS_TITLE": "Frequency-Dependent Loss (Touchstone .s2p)",
+    "LOSS_LENGTH": "Trace Length (mm):",
+    "LOSS_START": "Start Frequency (Hz):",
+    "LOSS_STOP": "Stop Frequency (Hz):",
+    "LOSS_POINTS": "Frequency Points:",
+    "LOSS_REFERENCE": "Reference Impedance (Ω, differential):",
+    "LOSS_DF": "Loss Tangent Df (empty = per dielectric type):",
+    "LOSS_ROUGHNESS": "Copper Roughness Rq (µm):",
+    "LOSS_HINT": "Uses the 2D field solver for the selected layer; Dk and Df are taken as frequency independent.",
+    "LOSS_SUMMARY": "{points} points; at {frequency_ghz:.3g} GHz: Zdiff {zdiff:.2f} Ω, loss {loss_db:.4f} dB/mm (conductor {conductor_db:.4f}, dielectric {dielectric_db:.4f}), insertion loss {insertion_loss_db:.2f} dB",
+    "CALC_MODEL": "Model:",
+    
+    # Synthesis
+    "SYNTH_FOR": "Synthesize:",
+    "SYNTH_BUTTON": "Synthesize for Target (All Layers)",
+    "SYNTH_TITLE": "Synthesis Results",
+    "SYNTH_ACHIEVED": "Target reached",
+    "SYNTH_UNREACHABLE": "Target not reachable within the valid range (closest value shown)",
+    "LIVE_MODE": "Live Recalculation (all Signal layers)",
+    "GROUP_LIVE": "Live Results (All Signal Layers)",
+    "SWEEP_BUTTON": "Parameter Sweep to CSV...",
+    "SWEEP_TITLE": "Parameter Sweep (W x Gap x S x Layer)",
+    "SWEEP_HINT": "Ranges: start:stop:step, a list (0.1; 0.15) or a single value",
+    "SWEEP_LAYERS": "Layers (empty = all Signal layers):",
+    "SWEEP_STORE": "Also save every row to the result database (slower)",
+    "SWEEP_DONE": "Sweep finished",
+    "MC_BUTTON": "Yield Analysis (Monte Carlo)...",
+    "MC_TITLE": "Monte Carlo Yield Analysis",
+    "MC_SAMPLES": "Number of Samples",
+    "MC_SEED": "Random Seed:",
+    "MC_SIGMA_W": "Etched Width Sigma (mm):",
+    "MC_SIGMA_THICKNESS": "Dielectric Thickness Sigma (%):",
+    "MC_SIGMA_COPPER": "Copper Thickness Sigma (%):",
+    "MC_SIGMA_DK": "Dk Sigma (%):",
+    "MC_YIELD": "Yield (boards in spec):",
+    "MC_HINT": "Pitch is kept constant: a wider etched trace narrows Gap and S by the same amount.",
+    "PARALLEL_THROUGHPUT": "{workers} worker(s), {rate:.2f} M points/s",
+    "DIALOG_OK": "OK",
+    "DIALOG_CANCEL": "Cancel",
+    "SYNTH_REGIME_JUMP": "Target falls in the W/H=1 jump between the WIDE and NARROW formulas (closest value shown)",
     
     # Standards Table Headers
     "STD_INTERFACE": "Interface",
     "STD_NOMINAL_Z": "Nominal Differential Impedance (Ω)",
     "STD_TOLERANCE": "Typical Tolerance (± %)",
     "STD_NOTES": "Notes",
+    "STD_CHECK_ALL": "Check All Layers",
+    "STD_MATRIX_TITLE": "Standards Compliance (W = {W:g} mm, Gap = {Gap:g} mm, S = {S:g} mm)",
+    "STD_MATRIX_HINT": "Green: current W/Gap is within the typical tolerance. Red: outside it. Each cell shows the W that gives the nominal Zdiff (grey: not reachable).",
+    "STD_MATRIX_PASS": "PASS",
+    "STD_MATRIX_FAIL": "FAIL",
+    "STD_MATRIX_UNREACHABLE": "W unreachable",
     
     # Standard Notes Content
+    # Board Audit
+    "AUDIT_BUTTON": "Audit Differential Pairs of a KiCad Board...",
+    "AUDIT_TITLE": "Differential Pair Audit",
+    "AUDIT_SUMMARY": "{segments} segments scanned, {pairs} pair/layer entries, {unique_geometries} unique geometries ({cache_hits} cache hits), {failing} failing",
+    "AUDIT_EXPORT": "Export Report to CSV",
+    "AUDIT_NO_PAIRS": "No coupled differential pairs (_P/_N, +/-, DP/DN, CANH/CANL) were found on the board.",
+    
     "NOTE_PCIE": "PCI-SIG specification; 100Ω targeted for PCB, 85Ω may be preferred in low-loss designs.",
     "NOTE_ETH": "IEEE 802.3; compatible with twisted pair cables, ±5% tighter tolerance possible.",
     "NOTE_USB2": "USB-IF specification; single-ended 45Ω.",
@@ -100,6 +205,50 @@ COLOR_STANDARD_HEADER = "#36454F"
 COLOR_SYNC_BUTTON_BG = "#0056b3" 
 COLOR_SYNC_BUTTON_FG = "black"   
 COLOR_SUCCESS = "green"          
+COLOR_MATRIX_PASS = "#C8E6C9"
+COLOR_MATRIX_FAIL = "#FFCDD2"
+COLOR_MATRIX_UNREACHABLE = "#E0E0E0"
+
+LIVE_DEBOUNCE_MS = 120
+JOB_POLL_MS = 50
+LIBRARY_DISPLAY_LIMIT = 500  # Seçicide gösterilen en fazla satır; arama/filtre tüm indekste yapılır
+
+# Profil özeti: üst seviye aşama -> durum alanında birlikte gösterilen alt aşama önekleri
+# Açılış aşamaları (ms): modül yükleme, Tk yükleme + kök pencere, pencere kurulumu, betik başından ilk çizime toplam süre
+STARTUP_STAGES = ("startup.import", "startup.tk", "startup.build", "startup.first_window")
+
+PROFILE_STAGE_GROUPS = {
+    "calculate": ("calculate.", "solve."),
+    "import_csv": ("import_csv.", "redraw_table"),
+    "redraw_table": (),
+}
+
+# Kalıcı kullanıcı verileri (önbellek vb.) ve bellek içi empedans önbelleğinin kapasitesi
+APP_DATA_DIR = os.path.join(os.path.expanduser("~"), ".kicad-impedance-calculator")
+IMPEDANCE_CACHE_SIZE = 4096
+IMPEDANCE_DISK_CACHE_SIZE = 65536
+RESULT_STORE_PATH = os.path.join(APP_DATA_DIR, "results.sqlite3")
+RESULT_FLUSH_MS = 2000  # GUI sonuçları veritabanına bu aralıkla toplu yazılır
+RESULT_STORE_MAX_ROWS = 500000  # GUI veritabanı için (~110 MB); aşılınca en eski sonuçlar silinir
+
+# Standart arayüzler: (Arayüz, Nominal Zdiff, Tipik Tolerans (±%), Not anahtarı, Net adı anahtar kelimeleri)
+STANDARD_IMPEDANCES = [
+    ("PCI Express (PCIe, Gen1-6)", "100 (or 85 for Gen2+)", "10", "NOTE_PCIE", ("PCIE", "PCI_E", "PETP", "PETN", "PERP", "PERN")),
+    ("Ethernet (1000BASE-T)", "100", "10", "NOTE_ETH", ("ETH", "MDI", "TRD")),
+    ("USB 2.0", "90", "15", "NOTE_USB2", ("USB",)),
+    ("USB 3.0 / 3.x", "90", "10-15", "NOTE_USB3", ("USB3", "SSTX", "SSRX", "SS_TX", "SS_RX")),
+    ("CAN Bus", "120", "10-20", "NOTE_CAN", ("CAN",)),
+    ("RS-485", "120", "20", "NOTE_RS485", ("RS485", "RS-485", "485")),
+    ("RS-422", "100-120", "20", "NOTE_RS422", ("RS422", "RS-422", "422")),
+    ("LVDS", "100", "10", "NOTE_LVDS", ("LVDS",)),
+    ("HDMI", "100", "10", "NOTE_HDMI", ("HDMI", "TMDS")),
+    ("EtherCAT", "100", "10", "NOTE_ETHCAT", ("ETHERCAT", "ECAT")),
+    ("MIL-STD-1553", "78", "10", "NOTE_MIL", ("1553",)),
+    ("Profibus DP", "150", "10-20", "NOTE_PROFIBUS", ("PROFIBUS",)),
+]
+
+TABLE_HEADERS = ["#", "COL_NAME", "COL_CLASS", "COL_THICKNESS", "COL_DK"]
+TABLE_COLUMN_WIDTHS = [30, 150, 100, 100, 100]
 
 COPPER_TEMPLATE = ["", "Signal", "0.018", "", "Copper"] 
 SOLDER_MASK_TOP = ["Top Solder", "Solder Mask", "0.01", "3.5", "Solder Mask"] 
@@ -124,132 +273,251 @@ def calculate_narrow_traces(W, S_track, T, H, Er):
     coupling_factor = (1.0 - 0.48 * math.exp(-0.96 * S_track / H))
     return 2.0 * Z0 * coupling_factor
 
-# --- GUI Sınıfı ---
+def calculate_zdiff(W, Gap, S, T, H, Er):
+    """W/H rejim seçimi ve S < H koplanar (CPWG) düzeltmesi dahil tek nokta Zdiff hesabı."""
+    if W / H >= 1.0:
+        Zdiff = calculate_wide_traces(W, Gap, T, H, Er)
+    else:
+        Zdiff = calculate_narrow_traces(W, Gap, T, H, Er)
+    if S < H:
+        Zdiff *= math.pow(S / (S + 0.5 * W), 0.1)
+    return Zdiff
 
-class ImpedanceCalculatorApp:
-    def __init__(self, master):
-        self.master = master
-        
-        # Tek Dil: İngilizce
-        self.current_lang = MESSAGES 
+# --- Vektörel (NumPy) Hesaplama Fonksiyonları ---
 
-        self.layer_options = [2, 4, 6, 8, 10, 12, 14, 16]
-        self.num_layers_var = tk.StringVar(value=str(self.layer_options[2])) 
-        self.num_layers_var.trace_add('write', self.on_layer_count_change) 
+def _numpy():
+    """NumPy'yi ilk çağrıda yükler; kurulu değilse None döndürür. GUI açıldıktan sonra arka planda da çağrılır."""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        # Bayrak içe aktarma bittikten sonra kurulur; eşzamanlı çağrı yarım yüklenmiş durumu "kurulu değil" sanmasın
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = None
+        _numpy_checked = True
+    return np
 
-        self.W_var = tk.StringVar(value="0.2")    
-        self.Gap_var = tk.StringVar(value="0.2")  
-        self.S_var = tk.StringVar(value="1.0")    
-        self.target_zdiff_var = tk.StringVar(value="100.0") 
-        self.tolerance_percent_var = tk.StringVar(value="10.0") 
+def _require_numpy():
+    if _numpy() is None:
+        raise ImportError("NumPy is required for batch calculations (pip install numpy).")
+    return np
 
-        self.stackup_data = [] 
-        self.entry_vars = [] 
-        self.signal_layers = []
-        self.selected_layer = tk.StringVar() 
-        
-        self.Zdiff_result = tk.StringVar()
-        self.tolerance_status_var = tk.StringVar(value="---") 
-        self.model_info = tk.StringVar()
-        self.cpwg_info = tk.StringVar()
-        self.params_used = tk.StringVar()
-        self.sync_status_var = tk.StringVar(value="")
-        
-        self.total_thickness_var = tk.StringVar(value="0.00") 
+def calculate_wide_traces_batch(W, S_track, T, H, Er):
+    """calculate_wide_traces'in dizi kabul eden sürümü."""
+    np = _require_numpy()
+    W, S_track, T, H, Er = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (W, S_track, T, H, Er)))
+    Z0_base = (87.0 / np.sqrt(Er + 1.41)) * np.log((5.98 * H) / (0.8 * W + T))
+    coupling_factor = 1.0 - 0.48 * np.exp(-0.96 * S_track / H)
+    return 2.0 * Z0_base * coupling_factor
 
-        self.table_frame = None 
-        self.layer_select_combobox = None 
-        self.zdiff_result_label = None 
-        self.status_label = None 
-        self.sync_status_label = None 
-        self.notebook = None 
+def calculate_narrow_traces_batch(W, S_track, T, H, Er):
+    """calculate_narrow_traces'in dizi kabul eden sürümü."""
+    np = _require_numpy()
+    W, S_track, T, H, Er = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (W, S_track, T, H, Er)))
+    W_prime = W + (T / math.pi) * (1.0 + np.log((4.0 * math.pi * W) / T + 1.0))
+    u = W_prime / H
+    a = (Er + 1.0) / 2.0
+    b = (Er - 1.0) / 2.0
+    c = np.power(1.0 + 12.0 / u, -0.5)
+    Er_eff = a + b * c
+    Z0 = (60.0 / np.sqrt(Er_eff)) * np.log(8.0 / u + u / 4.0)
+    coupling_factor = 1.0 - 0.48 * np.exp(-0.96 * S_track / H)
+    return 2.0 * Z0 * coupling_factor
 
-        self.setup_styles()
-        self.vcmd_float = (master.register(self.validate_float_input), '%P')
-        
-        self.create_widgets()
-        self.generate_stackup_data(int(self.num_layers_var.get()))
-        self.update_main_title()
+def calculate_zdiff_batch(W, Gap, S, T, H, Er):
+    """calculate_zdiff'in vektörel sürümü: tüm girişler yayınlanır (broadcast), her nokta kendi rejimiyle hesaplanır."""
+    np = _require_numpy()
+    W, Gap, S, T, H, Er = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (W, Gap, S, T, H, Er)))
+    Zdiff = np.empty(W.shape, dtype=float)
 
-    # Dil Seçimi ve Yenileme Fonksiyonları kaldırıldı
-    def update_main_title(self):
-        self.master.title(self.current_lang["TITLE"])
-        
-    def validate_float_input(self, P):
-        if P == "":
-            return True
-        if re.match(r'^\d*[,\.]?\d*$', P):
-            return True
-        return False
+    wide = W / H >= 1.0
+    narrow = ~wide
+    if wide.any():
+        Zdiff[wide] = calculate_wide_traces_batch(W[wide], Gap[wide], T[wide], H[wide], Er[wide])
+    if narrow.any():
+        Zdiff[narrow] = calculate_narrow_traces_batch(W[narrow], Gap[narrow], T[narrow], H[narrow], Er[narrow])
 
-    # --- Görsel ve Renk Fonksiyonları (Değişmedi) ---
-    
-    def setup_styles(self):
-        style = ttk.Style()
-        
-        style.configure("Cell.TLabel", padding=[5, 2], borderwidth=1, relief="solid", anchor="center")
-        style.configure("Header.TLabel", background=COLOR_HEADER, foreground=COLOR_TEXT_LIGHT, font=('Arial', 9, 'bold'), borderwidth=1, relief="solid", anchor="center")
-        style.configure("Copper.TLabel", background=COLOR_COPPER, foreground=COLOR_TEXT_DARK)
-        style.configure("Solder.TLabel", background=COLOR_SOLDER_MASK, foreground=COLOR_TEXT_LIGHT)
-        style.configure("Core.TLabel", background=COLOR_CORE, foreground=COLOR_TEXT_LIGHT)
-        style.configure("Dielectric.TLabel", background=COLOR_PREPREG, foreground=COLOR_TEXT_DARK)
-        style.configure("Total.TLabel", font=('Arial', 11, 'bold'), foreground='darkred') 
-        style.configure("MappingHeader.TLabel", 
-                        background=COLOR_MAPPING_HEADER, 
-                        foreground=COLOR_TEXT_LIGHT, 
-                        font=('Arial', 9, 'bold'), 
-                        borderwidth=1, 
-                        relief="solid", 
-                        anchor="center")
-        style.configure("Mapping.TLabel", background="white", borderwidth=1, relief="solid", anchor="w", padding=[5, 2], foreground='black')
-        style.configure("Designer.TLabel", font=('Arial', 8, 'italic'), foreground='gray', anchor="e")
-        style.configure("StandardHeader.TLabel", 
-                        background=COLOR_STANDARD_HEADER, 
-                        foreground=COLOR_TEXT_LIGHT, 
-                        font=('Arial', 10, 'bold'), 
-                        borderwidth=1, 
-                        relief="solid", 
-                        anchor="center",
-                        padding=[5, 5])
-        style.configure("StandardCell.TLabel", 
-                        background="white", 
-                        foreground="black", 
-                        font=('Arial', 9), 
-                        borderwidth=1, 
-                        relief="solid", 
-                        anchor="w",
-                        padding=[5, 2])
-        style.configure("Status.TLabel", font=('Arial', 12, 'bold'))
-        
-        style.configure("Sync.TButton", 
-                        background=COLOR_SYNC_BUTTON_BG, 
-                        foreground=COLOR_SYNC_BUTTON_FG,
-                        font=('Arial', 9, 'bold'))
-        style.map("Sync.TButton", 
-                  background=[('active', '#004a99')], 
-                  foreground=[('active', COLOR_SYNC_BUTTON_FG)])
-        
-        style.configure("SyncStatus.TLabel", 
-                        foreground=COLOR_SUCCESS, 
-                        font=('Arial', 9, 'bold'),
-                        anchor="e")
+    coplanar = S < H
+    if coplanar.any():
+        Zdiff[coplanar] *= np.power(S[coplanar] / (S[coplanar] + 0.5 * W[coplanar]), 0.1)
+    return Zdiff
 
+# --- Başsız (Headless) Çözücü Çekirdeği: Tk gerektirmez ---
 
-    def get_color_style_by_type(self, layer_class, layer_name):
-        if layer_class == "Solder Mask":
-            return "Solder.TLabel"
-        elif layer_class == "Copper":
-            return "Copper.TLabel"
-        elif layer_class == "Core":
-            return "Core.TLabel"
-        elif layer_class in ["Prepreg", "Dielectric"]:
-            return "Dielectric.TLabel"
-        return "Cell.TLabel"
+def get_float_or_error(var_name, var_value, can_be_zero=False):
+    """String değeri float'a çevirir ve sıfırdan küçük/eşit olma durumunu kontrol eder."""
+    try:
+        # Gerekirse virgülü noktaya çevir (Hem 0.15 hem 0,15 kabul edilir)
+        value = float(str(var_value).replace(',', '.')) 
+        if not can_be_zero and value <= 0:
+             raise ValueError(f"'{var_name}' must be greater than zero.")
+        return value
+    except ValueError:
+        raise ValueError(f"Please enter a valid numeric value for '{var_name}' (e.g., 0.15 or 0,15).")
 
-    # --- Dinamik Stackup Oluşturma Mantığı (Değişmedi) ---
 
-    def generate_stackup_data(self, num_copper_layers):
-        
+DIELECTRIC_TYPES = ["Prepreg", "Core", "Solder Mask"]
+
+
+def read_stackup_csv(filepath):
+    """Stackup CSV'sindeki veri satırlarını (başlık ve toplam kalınlık satırı hariç) döndürür. ';' veya ',' ayraç kabul edilir."""
+    import csv
+    data = []
+    with open(filepath, 'r', newline='', encoding='utf-8') as f:
+        first_line = f.readline()
+        f.seek(0)
+        reader = csv.reader(f, delimiter=';' if ';' in first_line else ',')
+
+        next(reader, None)
+        for row in reader:
+            if len(row) > 3 and MESSAGES["TOTAL_THICKNESS"] not in row[1]: 
+                data.append(row)
+    return data
+
+
+class PlaneIndex:
+    """Stackup üzerinde tek geçişte kurulan referans plane indeksi.
+
+    Her bakır katman için hemen üstündeki/altındaki Plane ile dielektrik kalınlığı ve kalınlık x Dk önek
+    toplamlarını tutar; böylece herhangi bir sinyal katmanı için H ve ağırlıklı Er O(1) bulunur.
+    """
+
+    def __init__(self, rows):
+        n = len(rows)
+        self.names = [item[0] for item in rows]
+        self.signal_indices = [i for i, item in enumerate(rows) if item[1] == "Signal"]
+        self._dependents = None
+        self.plane_above = [-1] * n
+        self.plane_below = [-1] * n
+        # Önek toplamları: [i] değeri rows[0:i] dielektriklerinin toplamıdır
+        self.thickness_sum = [0.0] * (n + 1)
+        self.weighted_sum = [0.0] * (n + 1)
+        self.invalid_count = [0] * (n + 1)
+
+        thickness_sum, weighted_sum, invalid_count = 0.0, 0.0, 0
+        last_copper = -1
+        for i, item in enumerate(rows):
+            if item[4] in DIELECTRIC_TYPES:
+                try:
+                    thickness = float(item[2].replace(',', '.'))
+                    er = float(item[3].replace(',', '.'))
+                    if thickness <= 0 or er <= 0:
+                        raise ValueError
+                    thickness_sum += thickness
+                    weighted_sum += thickness * er
+                except ValueError:
+                    invalid_count += 1
+            elif item[4] == "Copper":
+                # Plane araması en yakın bakırda durur: komşu bakır Plane ise referans odur
+                if last_copper != -1:
+                    if rows[last_copper][1] == "Plane":
+                        self.plane_above[i] = last_copper
+                    if item[1] == "Plane":
+                        self.plane_below[last_copper] = i
+                last_copper = i
+            self.thickness_sum[i + 1] = thickness_sum
+            self.weighted_sum[i + 1] = weighted_sum
+            self.invalid_count[i + 1] = invalid_count
+
+    def affected_signals(self, changed_rows):
+        """Değişen satırları T/H/Er hesabında kullanan sinyal katmanlarının indeksleri.
+
+        Bağımlılık grafiği: her sinyal katmanı, üst plane'inden alt plane'ine kadar olan satırlara bağlıdır
+        (iki yön de dahil, çünkü en yakın plane seçimi iki tarafın H değerine bağlıdır).
+        """
+        if self._dependents is None:
+            self._dependents = {}
+            for signal_index in self.signal_indices:
+                first = self.plane_above[signal_index] if self.plane_above[signal_index] != -1 else signal_index
+                last = self.plane_below[signal_index] if self.plane_below[signal_index] != -1 else signal_index
+                for i in range(first, last + 1):
+                    self._dependents.setdefault(i, []).append(signal_index)
+
+        affected = set()
+        for i in changed_rows:
+            affected.update(self._dependents.get(i, ()))
+        return sorted(affected)
+
+    def dielectric_between(self, signal_index, plane_index):
+        """İki katman arasındaki (uçlar hariç) dielektriklerin toplam H'si ve kalınlıkla ağırlıklı Er'i."""
+        first, last = min(signal_index, plane_index) + 1, max(signal_index, plane_index)
+        if self.invalid_count[last] != self.invalid_count[first]:
+            # Hatalı katman, arama yönünde ilk karşılaşılan olarak raporlanır
+            step = 1 if plane_index > signal_index else -1
+            for i in range(signal_index + step, plane_index, step):
+                if self.invalid_count[i + 1] != self.invalid_count[i]:
+                    raise Exception(f"{MESSAGES['COL_THICKNESS']}/{MESSAGES['COL_DK']} value for layer ({self.names[i]}) is invalid or zero/negative.")
+
+        # Önek farkındaki kayan nokta gürültüsü yuvarlanır; aksi halde eşit H'li iki plane arasındaki seçim kayabilir
+        total_H = round(self.thickness_sum[last] - self.thickness_sum[first], 12)
+        if total_H == 0:
+            return 0.0, 1.0
+        return total_H, (self.weighted_sum[last] - self.weighted_sum[first]) / total_H
+
+
+class Stackup:
+    """Stackup verisi ve referans plane araması. Satır: [Name (0), Class (1), Thickness (2), Dk (3), Layer_Type (4)]
+
+    Satırlar set_rows ile değiştirilmelidir; PlaneIndex yalnızca içerik değiştiğinde yeniden kurulur.
+    """
+
+    def __init__(self, rows):
+        self.rows = [[str(value) for value in row] for row in rows]
+        self.revision = 0
+        self._plane_index = None
+        self._content_hash = None
+
+    def set_rows(self, rows):
+        """Satırları günceller; içerik gerçekten değiştiyse indeksi geçersiz kılar ve True döndürür."""
+        new_rows = [[str(value) for value in row] for row in rows]
+        if new_rows == self.rows:
+            return False
+        self.rows = new_rows
+        self.revision += 1
+        self._plane_index = None
+        self._content_hash = None
+        return True
+
+    def update_rows(self, changes):
+        """Sadece verilen satırları ({indeks: satır}) günceller.
+
+        (değişen indeksler, topoloji değişti mi) döndürür; ad, sınıf veya tip değişikliği plane
+        eşleşmelerini etkileyebileceği için topoloji değişikliği sayılır.
+        """
+        changed = []
+        topology_changed = False
+        for i, row in changes.items():
+            new_row = [str(value) for value in row]
+            if new_row == self.rows[i]:
+                continue
+            if new_row[0] != self.rows[i][0] or new_row[1] != self.rows[i][1] or new_row[4] != self.rows[i][4]:
+                topology_changed = True
+            self.rows[i] = new_row
+            changed.append(i)
+        if changed:
+            self.revision += 1
+            self._plane_index = None
+            self._content_hash = None
+        return sorted(changed), topology_changed
+
+    def content_hash(self):
+        """Satır içeriğinin özeti; önbellek anahtarlarında stackup'ı temsil eder (oturumlar arası kararlı)."""
+        import hashlib
+        if self._content_hash is None:
+            text = "\x1e".join("\x1f".join(row) for row in self.rows)
+            self._content_hash = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        return self._content_hash
+
+    def plane_index(self):
+        if self._plane_index is None:
+            self._plane_index = PlaneIndex(self.rows)
+        return self._plane_index
+
+    @classmethod
+    def generate(cls, num_copper_layers):
+        """Bakır katman sayısına göre varsayılan stackup'ı oluşturur."""
+        import copy
         copper_names = []
         for i in range(1, num_copper_layers + 1):
              if i == 1:
@@ -309,158 +577,3877 @@ class ImpedanceCalculatorApp:
         if num_copper_layers > 0:
             new_stackup.append(copy.deepcopy(SOLDER_MASK_BOTTOM))
 
-        self.stackup_data = new_stackup
-        
-        self.signal_layers = [item[0] for item in self.stackup_data if item[1] == "Signal"] 
-        if self.signal_layers:
-             self.selected_layer.set(self.signal_layers[0])
+        return cls(new_stackup)
 
-        self.redraw_stackup_table()
+    @classmethod
+    def from_csv(cls, filepath):
+        """export_to_csv formatındaki dosyadan stackup oluşturur. Tip sütunu yoksa sınıftan çıkarılır."""
+        rows = []
+        for row in read_stackup_csv(filepath):
+            name, layer_class = row[1].strip(), row[2].strip()
+            thickness = row[3].strip().replace(',', '.')
+            dk = re.sub(r'[a-zA-Z\s]+', '', row[4]).replace(',', '.') if len(row) > 4 else ""
+            if len(row) > 5 and row[5].strip():
+                layer_type = row[5].strip()
+            else:
+                layer_type = layer_class if layer_class in DIELECTRIC_TYPES else "Copper"
+            rows.append([name, layer_class, thickness, dk, layer_type])
+        if not rows:
+            raise ValueError(f"No stackup rows found in '{filepath}'.")
+        return cls(rows)
 
-    def on_layer_count_change(self, *args):
-        try:
-            num = int(self.num_layers_var.get())
-            if num in self.layer_options:
-                self.generate_stackup_data(num)
-        except ValueError:
-            pass 
+    def to_csv(self, filepath, total_thickness_text=None):
+        """Stackup'ı GUI'nin CSV dışa aktarma formatında yazar (';' ayraç, ondalık virgül)."""
+        import csv
+        headers = ["Layer Number", MESSAGES["COL_NAME"], MESSAGES["COL_CLASS"], MESSAGES["COL_THICKNESS"], MESSAGES["COL_DK"]]
+        if total_thickness_text is None:
+            total_thickness_text = f"{self.total_thickness():.3f}"
 
-    # --- METOT: Stackup Verilerini StringVar'lardan Ana Listeye Aktar ---
-    def update_stackup_data(self):
-        try:
-            for i, row_vars in enumerate(self.entry_vars):
-                
-                self.stackup_data[i][0] = row_vars[0].get().strip()
-                self.stackup_data[i][1] = row_vars[1].get().strip()
-                self.stackup_data[i][2] = row_vars[2].get().strip()
-                self.stackup_data[i][3] = row_vars[3].get().strip()
-                
-            self.signal_layers = [item[0] for item in self.stackup_data if item[1] == "Signal"] 
-            if self.layer_select_combobox:
-                self.layer_select_combobox['values'] = self.signal_layers
-                if self.selected_layer.get() not in self.signal_layers and self.signal_layers:
-                    self.selected_layer.set(self.signal_layers[0])
-                elif not self.signal_layers:
-                    self.selected_layer.set("")
+        with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, delimiter=';') 
+            writer.writerow(headers)
             
-            self.update_total_thickness()
-            
-            self.sync_status_var.set(self.current_lang["SUCCESS"])
-            if self.sync_status_label:
-                self.sync_status_label.config(foreground=COLOR_SUCCESS)
-                self.master.after(2000, lambda: self.sync_status_var.set(""))
-
-        except Exception as e:
-            messagebox.showerror(self.current_lang["ERROR_SYNC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
-            self.sync_status_var.set(self.current_lang["ERROR_SYNC"])
-            if self.sync_status_label:
-                self.sync_status_label.config(foreground="red")
-            self.master.after(3000, lambda: self.sync_status_var.set(""))
+            for i, row_data in enumerate(self.rows):
+                row_list = [
+                    f"{i+1:02d}", 
+                    row_data[0],  
+                    row_data[1],  
+                    row_data[2].replace('.', ','),  
+                    row_data[3].replace('.', ','),   
+                    row_data[4] 
+                ]
+                writer.writerow(row_list)
+                
+            writer.writerow(["", MESSAGES["TOTAL_THICKNESS"], "", total_thickness_text, MESSAGES["MM"]])
 
+    def signal_layers(self):
+        return [item[0] for item in self.rows if item[1] == "Signal"]
 
-    # --- Toplam Kalınlık Güncelleme Fonksiyonu (Değişmedi) ---
+    def index_of(self, layer_name):
+        for i, item in enumerate(self.rows):
+            if item[0] == layer_name:
+                return i
+        return -1
 
-    def update_total_thickness(self, *args):
+    def total_thickness(self):
         total = 0.0
-        for row_vars in self.entry_vars:
-            thickness_str = row_vars[2].get()
-            
-            if thickness_str:
+        for item in self.rows:
+            if item[2]:
                 try:
-                    # Virgüllü veya noktalı girişi float'a çevir
-                    value = float(thickness_str.replace(',', '.'))
-                    total += value
+                    total += float(item[2].replace(',', '.'))
                 except ValueError:
                     pass
-        
-        self.total_thickness_var.set(f"{total:.3f}")
+        return total
 
-    # --- CSV İşlemleri ---
+    def find_plane_index(self, signal_index, step):
+        """Sinyal katmanından step yönünde (1: aşağı, -1: yukarı) ilk Plane'in indeksini döndürür; yoksa -1."""
+        index = self.plane_index()
+        return index.plane_below[signal_index] if step == 1 else index.plane_above[signal_index]
 
-    def export_to_csv(self):
-        self.update_stackup_data() 
-        
-        try:
-            filepath = filedialog.asksaveasfilename(
-                defaultextension=".csv",
-                filetypes=[("CSV files", "*.csv")],
-                title=self.current_lang["EXPORT_CSV"]
-            )
-            
-            if filepath:
-                headers = ["Layer Number", self.current_lang["COL_NAME"], self.current_lang["COL_CLASS"], self.current_lang["COL_THICKNESS"], self.current_lang["COL_DK"]]
-                
-                with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f, delimiter=';') 
-                    writer.writerow(headers)
-                    
-                    for i, row_data in enumerate(self.stackup_data):
-                        row_list = [
-                            f"{i+1:02d}", 
-                            row_data[0],  
-                            row_data[1],  
-                            row_data[2].replace('.', ','),  
-                            row_data[3].replace('.', ','),   
-                            row_data[4] 
-                        ]
-                        writer.writerow(row_list)
-                        
-                    writer.writerow(["", self.current_lang["TOTAL_THICKNESS"], "", self.total_thickness_var.get(), self.current_lang["MM"]])
+    def reference_candidates(self, signal_index):
+        """find_nearest_plane_and_dielectric kurallarına göre yarışan yönler: [(plane indeksi, dielektrik indeksleri), ...]"""
+        layer_name = self.rows[signal_index][0]
+        if layer_name == "1. Top Layer":
+            steps = (1,)
+        elif layer_name.endswith("Bottom Layer"):
+            steps = (-1,)
+        else:
+            steps = (1, -1)
 
-                messagebox.showinfo(self.current_lang["SUCCESS"], f"{self.current_lang['SUCCESS']} (CSV: {filepath})")
-            
-        except Exception as e:
-            messagebox.showerror(self.current_lang["ERROR_SYNC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+        candidates = []
+        for step in steps:
+            plane_index = self.find_plane_index(signal_index, step)
+            if plane_index == -1:
+                continue
+            dielectrics = [i for i in range(signal_index + step, plane_index, step) if self.rows[i][4] in DIELECTRIC_TYPES]
+            if dielectrics:
+                candidates.append((plane_index, dielectrics))
+        return candidates
 
-    def clean_dk_value(self, value):
-        value = str(value).strip()
-        if not value:
-            return ""
+    # YARDIMCI FONKSİYON: Bitişik Plane'i ve Dielektrikleri Bulma (KESİN KURAL SETİ)
+    def find_nearest_plane_and_dielectric(self, signal_index):
+        
+        index = self.plane_index()
+
+        is_top_layer = (self.rows[signal_index][0] == "1. Top Layer")
+        is_bottom_layer = (self.rows[signal_index][0].endswith("Bottom Layer"))
 
-        cleaned = re.sub(r'[a-zA-Z\s]+', '', value) 
         
-        if cleaned:
-            return cleaned.replace('.', ',') 
+        # --- ARAMA YÖNLERİ ---
         
-        return ""
-
+        # 1. AŞAĞI YÖNDE ARAMA (Lower Plane)
+        down_plane_index = self.find_plane_index(signal_index, 1)
+        
+        H_down, Er_down, ref_down = (float('inf'), 0.0, None)
 
-    def import_from_csv(self):
-        try:
-            filepath = filedialog.askopenfilename(
-                defaultextension=".csv",
-                filetypes=[("CSV files", "*.csv")],
-                title=self.current_lang["IMPORT_CSV"]
-            )
-            
-            if not filepath:
-                return
+        if down_plane_index != -1:
+            H_down, Er_down = index.dielectric_between(signal_index, down_plane_index) # Dielektrikleri al
+            ref_down = self.rows[down_plane_index][0]
 
-            data = []
-            with open(filepath, 'r', newline='', encoding='utf-8') as f:
-                
-                try:
-                    reader = csv.reader(f, delimiter=';')
-                except:
-                    f.seek(0)
-                    reader = csv.reader(f, delimiter=',') 
-
-                headers = next(reader) 
-                for row in reader:
-                    if len(row) > 3 and self.current_lang["TOTAL_THICKNESS"] not in row[1]: 
-                        data.append(row)
-            
-            if not data or len(data) != len(self.stackup_data):
-                 messagebox.showerror(self.current_lang["ERROR_INPUT"], f"Stackup size mismatch. File row count ({len(data)}) does not match existing stackup ({len(self.stackup_data)}).")
-                 return
 
-            for i, row in enumerate(data):
+        # 2. YUKARI YÖNDE ARAMA (Upper Plane)
+        up_plane_index = self.find_plane_index(signal_index, -1)
+        
+        H_up, Er_up, ref_up = (float('inf'), 0.0, None)
+
+        if up_plane_index != -1:
+            H_up, Er_up = index.dielectric_between(signal_index, up_plane_index) # Dielektrikleri al
+            ref_up = self.rows[up_plane_index][0]
+        
+        
+        # --- KARAR VERME: HANGİ PLANE KULLANILACAK? ---
+        
+        if is_top_layer:
+            if down_plane_index != -1 and H_down > 0:
+                return H_down, Er_down, ref_down
+            else:
+                raise Exception("No 'Plane' layer found immediately below the Top Layer. Stackup error!")
+                
+        elif is_bottom_layer:
+            if up_plane_index != -1 and H_up > 0:
+                return H_up, Er_up, ref_up
+            else:
+                raise Exception("No 'Plane' layer found immediately above the Bottom Layer. Stackup error!")
+
+        else:
+            down_available = H_down != float('inf') and H_down > 0
+            up_available = H_up != float('inf') and H_up > 0
+
+            if not down_available and not up_available:
+                raise Exception(f"{self.rows[signal_index][0]} (Inner Layer): No 'Plane' layer found above or below. Stackup error!")
+                
+            elif down_available and not up_available:
+                return H_down, Er_down, ref_down
+                
+            elif not down_available and up_available:
+                return H_up, Er_up, ref_up
+            
+            elif down_available and up_available:
+                # İki Plane de varsa, en yakını seçilir
+                if H_down <= H_up:
+                    return H_down, Er_down, ref_down
+                else:
+                    return H_up, Er_up, ref_up
+        
+        raise Exception("Unexpected error occurred during reference plane selection.")
+
+# --- Ters Çözücü (Sentez) Yardımcıları ---
+
+def _zdiff_in_regime(W, Gap, S, T, H, Er, wide):
+    """calculate_zdiff ile aynı, ancak rejim (geniş/dar) dışarıdan zorlanır."""
+    if wide:
+        Zdiff = calculate_wide_traces(W, Gap, T, H, Er)
+    else:
+        Zdiff = calculate_narrow_traces(W, Gap, T, H, Er)
+    if S < H:
+        Zdiff *= math.pow(S / (S + 0.5 * W), 0.1)
+    return Zdiff
+
+def _zdiff_in_regime_batch(W, Gap, S, T, H, Er, wide):
+    """_zdiff_in_regime'in vektörel sürümü."""
+    np = _require_numpy()
+    W, Gap, S, T, H, Er = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (W, Gap, S, T, H, Er)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if wide:
+            Zdiff = calculate_wide_traces_batch(W, Gap, T, H, Er)
+        else:
+            Zdiff = calculate_narrow_traces_batch(W, Gap, T, H, Er)
+    return np.where(S < H, Zdiff * np.power(S / (S + 0.5 * W), 0.1), Zdiff)
+
+def required_width_batch(target_zdiff, Gap, S, T, H, Er, guess, xtol=1e-9, ftol=1e-9, max_iter=100):
+    """Solver.synthesize(solve_for='W')'un vektörel sürümü; tüm girişler yayınlanır.
+
+    Zdiff her rejim segmentinde W ile azalır; kök segment başına Illinois (düzeltilmiş regula falsi) yöntemiyle
+    bulunur. İki segmentte de kök varsa guess'e en yakını seçilir; hedef ulaşılamıyorsa NaN döner.
+    """
+    np = _require_numpy()
+    target, Gap, S, T, H, Er, guess = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (target_zdiff, Gap, S, T, H, Er, guess)))
+    W_max = 0.999 * (5.98 * H - T) / 0.8
+    best = np.full(target.shape, np.nan)
+    for lo, hi, wide in ((1e-4 * H, H * (1.0 - 1e-9), False), (H, np.maximum(W_max, H), True)):
+        a, b = lo.copy(), hi.copy()
+        f_a = _zdiff_in_regime_batch(a, Gap, S, T, H, Er, wide) - target
+        f_b = _zdiff_in_regime_batch(b, Gap, S, T, H, Er, wide) - target
+        bracketed = (hi > lo) & (f_a >= 0) & (f_b <= 0)
+        root = np.where(f_a == 0, a, b)
+        active = bracketed & (f_a != 0) & (f_b != 0)
+        for _ in range(max_iter):
+            if not active.any():
+                break
+            with np.errstate(invalid="ignore", divide="ignore"):
+                c = np.where(active, b - f_b * (b - a) / (f_b - f_a), root)
+            f_c = _zdiff_in_regime_batch(c, Gap, S, T, H, Er, wide) - target
+            root = np.where(active, c, root)
+            # Kök c ile b arasındaysa a <- b; değilse a'nın fonksiyon değeri yarıya indirilir (Illinois)
+            crossed = active & (f_c * f_b < 0)
+            a, f_a = np.where(crossed, b, a), np.where(crossed, f_b, np.where(active, 0.5 * f_a, f_a))
+            b, f_b = np.where(active, c, b), np.where(active, f_c, f_b)
+            active &= (np.abs(f_c) > ftol) & (np.abs(b - a) > xtol)
+        closer = bracketed & (np.isnan(best) | (np.abs(root - guess) < np.abs(best - guess)))
+        best = np.where(closer, root, best)
+    return best
+
+def _bracketed_root(f, lo, hi, f_lo, f_hi, xtol=1e-9, ftol=1e-9, max_iter=100):
+    """f(lo) ve f(hi) zıt işaretliyken Illinois (regula falsi) yöntemiyle kök bulur."""
+    side = 0
+    x = lo
+    for _ in range(max_iter):
+        x = (lo * f_hi - hi * f_lo) / (f_hi - f_lo)
+        if not lo < x < hi:
+            x = 0.5 * (lo + hi)
+        fx = f(x)
+        if abs(fx) < ftol or hi - lo < xtol:
+            break
+        if (fx > 0) == (f_lo > 0):
+            lo, f_lo = x, fx
+            if side == -1:
+                f_hi *= 0.5
+            side = -1
+        else:
+            hi, f_hi = x, fx
+            if side == 1:
+                f_lo *= 0.5
+            side = 1
+    return x
+
+def _solve_in_segment(f, lo, hi, guess):
+    """[lo, hi] aralığında monoton f için kök arar; guess (sıcak başlangıç) braketi daraltmak için kullanılır."""
+    f_lo, f_hi = f(lo), f(hi)
+    if f_lo == 0:
+        return lo
+    if f_hi == 0:
+        return hi
+    if (f_lo > 0) == (f_hi > 0):
+        return None
+    if guess is not None and lo < guess < hi:
+        f_guess = f(guess)
+        if (f_guess > 0) == (f_lo > 0):
+            lo, f_lo = guess, f_guess
+            probe = min(hi, guess * 1.1)
+        else:
+            hi, f_hi = guess, f_guess
+            probe = max(lo, guess / 1.1)
+        if lo < probe < hi:
+            f_probe = f(probe)
+            if (f_probe > 0) == (f_lo > 0):
+                lo, f_lo = probe, f_probe
+            else:
+                hi, f_hi = probe, f_probe
+    return _bracketed_root(f, lo, hi, f_lo, f_hi)
+
+
+SynthesisResult = namedtuple("SynthesisResult", ["layer", "solve_for", "W", "Gap", "zdiff", "achieved", "note"])
+
+
+# passed/required_W: arayüz x katman listeleri; required_W ulaşılamıyorsa None. errors: {katman: hata metni}
+ComplianceMatrix = namedtuple("ComplianceMatrix", ["interfaces", "layers", "targets", "tolerances", "W", "Gap", "S", "zdiff", "passed", "required_W", "errors"])
+
+YieldResult = namedtuple("YieldResult", ["layer", "samples", "yield_percent", "mean", "std", "minimum", "maximum", "lower", "upper", "counts", "bin_edges",
+                                         "parallel"], defaults=(None,))
+
+ImpedanceResult = namedtuple("ImpedanceResult", ["layer", "zdiff", "T", "H", "Er", "reference_plane", "wh_ratio", "cpwg_applied", "model"],
+                             defaults=("formula",))
+IMPEDANCE_MODELS = ["formula", "field"]
+
+
+class ImpedanceCache:
+    """Katman parametreleri ve Zdiff için boyutu sınırlı LRU önbellek; path verilirse diskte (shelve) kalıcıdır.
+
+    Anahtarlar normalize edilmiş girişlerden (9 ondalık basamak) oluşur; stackup'a bağlı girdiler
+    Stackup.content_hash() içerir. hits/disk_hits/misses sayaçları boyutlandırma içindir.
+    Disk her put'ta değil, yalnızca LRU'dan düşen ve close() anında bellekte kalan yeni girdilerle yazılır.
+    Disk deposu disk_maxsize girdiyi aşarsa açılışta yarıya budanır.
+    """
+
+    def __init__(self, maxsize=IMPEDANCE_CACHE_SIZE, path=None, disk_maxsize=IMPEDANCE_DISK_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.path = path
+        self.disk_maxsize = disk_maxsize
+        self.entries = OrderedDict()
+        # Henüz diske yazılmamış anahtarlar
+        self._unsaved = set()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._store = None
+        # Arka plan işleri (JobScheduler) ile GUI aynı önbelleği paylaşabilir
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def normalize(value):
+        # mm ve Er için 1e-9 çözünürlük yeterlidir; format tabanlı yuvarlamadan belirgin şekilde hızlıdır
+        return round(float(value), 9) + 0.0
+
+    def _disk(self):
+        import shelve
+        if self._store is None and self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._store = shelve.open(self.path)
+                if len(self._store) > self.disk_maxsize:
+                    self._prune()
+            except Exception:
+                # Disk önbelleği açılamazsa (kilitli, salt okunur vb.) sadece bellek kullanılır
+                self.path = None
+        return self._store
+
+    def _prune(self):
+        """Disk deposunu disk_maxsize/2 girdiye indirir (arka uç sırasında son yazılanlar kalır).
+
+        dbm dosyaları silinen girdilerin yerini geri vermez; depo yeniden oluşturulur.
+        """
+        import glob
+        import shelve
+        kept = list(self._store.items())[-(self.disk_maxsize // 2):] if self.disk_maxsize >= 2 else []
+        self._store.close()
+        for filename in glob.glob(glob.escape(self.path) + ".*") + [self.path]:
+            if os.path.isfile(filename):
+                os.remove(filename)
+        self._store = shelve.open(self.path)
+        self._store.update(kept)
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            old_key, old_value = self.entries.popitem(last=False)
+            if old_key in self._unsaved:
+                self._unsaved.discard(old_key)
+                store = self._disk()
+                if store is not None:
+                    store[repr(old_key)] = old_value
+
+    def get(self, key):
+        """Değeri döndürür; yoksa None."""
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        store = self._disk()
+        if store is not None:
+            value = store.get(repr(key))
+            if value is not None:
+                self.disk_hits += 1
+                self._remember(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        with self._lock:
+            if self.path:
+                self._unsaved.add(key)
+            self._remember(key, value)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "size": len(self.entries),
+                "maxsize": self.maxsize, "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0}
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self._unsaved.clear()
+            self.hits = self.disk_hits = self.misses = 0
+            store = self._disk()
+            if store is not None:
+                store.clear()
+
+    def close(self):
+        """Bellekteki yeni girdileri diske yazar ve depoyu kapatır; sonrasında önbellek yalnızca bellekte çalışır."""
+        with self._lock:
+            if self._unsaved:
+                store = self._disk()
+                if store is not None:
+                    for key in self._unsaved:
+                        store[repr(key)] = self.entries[key]
+                self._unsaved.clear()
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+            self.path = None
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        self.profiler.depth -= 1
+        if self.profiler.depth == 0 and self.profiler.listener is not None:
+            self.profiler.listener(self.name)
+        return False
+
+
+class StageProfiler:
+    """İsteğe bağlı aşama zamanlayıcısı: 'with profiler.stage(ad):' blokları çağrı sayısı ve gecikme dağılımı toplar.
+
+    Kapalıyken stage() paylaşılan boş bir bağlam döndürür (ölçülebilir ek yük yok). Aşama başına son max_samples
+    ölçüm yüzdelikler için tutulur; sayaç ve toplam süre tüm çağrıları kapsar. listener, en dıştaki aşama
+    bittiğinde aşama adıyla çağrılır (GUI özetini güncellemek için).
+    """
+
+    def __init__(self, enabled=False, max_samples=10000):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self.listener = None
+        self.depth = 0
+        self.reset()
+
+    def reset(self):
+        self.samples = {}
+        self.counts = {}
+        self.totals = {}
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.max_samples)
+            self.counts[name] = 0
+            self.totals[name] = 0.0
+        samples.append(seconds)
+        self.counts[name] += 1
+        self.totals[name] += seconds
+
+    @staticmethod
+    def _percentile(ordered, percent):
+        # En yakın sıra (nearest-rank) yüzdeliği
+        return ordered[max(0, math.ceil(percent / 100.0 * len(ordered)) - 1)]
+
+    def summary(self, names=None):
+        """{aşama: {count, total_ms, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        result = {}
+        for name, samples in self.samples.items():
+            if names is not None and name not in names:
+                continue
+            ordered = sorted(samples)
+            result[name] = {
+                "count": self.counts[name],
+                "total_ms": 1e3 * self.totals[name],
+                "mean_ms": 1e3 * self.totals[name] / self.counts[name],
+                "p50_ms": 1e3 * self._percentile(ordered, 50),
+                "p95_ms": 1e3 * self._percentile(ordered, 95),
+                "p99_ms": 1e3 * self._percentile(ordered, 99),
+                "max_ms": 1e3 * ordered[-1],
+            }
+        return result
+
+    def compact(self, name, prefixes=()):
+        """Bir aşama ve verilen önekli alt aşamalar için tek satırlık özet (durum alanı için)."""
+        names = [stage_name for stage_name in self.samples if stage_name == name or stage_name.startswith(prefixes)]
+        summary = self.summary(names)
+        if name not in summary:
+            return ""
+        stats = summary[name]
+        parts = [f"{name}: n={stats['count']} p50={stats['p50_ms']:.2f} p95={stats['p95_ms']:.2f} ms"]
+        for stage_name in names:
+            if stage_name != name:
+                parts.append(f"{stage_name} {summary[stage_name]['p50_ms']:.2f}")
+        return " | ".join(parts)
+
+    def dump_json(self, filepath):
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump({"summary": self.summary(), "samples_ms": {name: [1e3 * value for value in samples] for name, samples in self.samples.items()}}, f, indent=2)
+
+
+_NULL_STAGE = contextlib.nullcontext()
+NO_PROFILER = StageProfiler(enabled=False)
+
+def profiled(stage_name):
+    """GUI metotları için: self.profiler açıksa metodun tamamını tek aşama olarak ölçer."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.stage(stage_name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Solver:
+    """Bir Stackup üzerinde GUI'siz empedans hesabı yapar."""
+
+    def __init__(self, stackup, cache=None, profiler=None, field_solver=None):
+        self.stackup = stackup
+        self.cache = cache
+        self.profiler = NO_PROFILER if profiler is None else profiler
+        self.field_solver = field_solver
+
+    def layer_parameters(self, layer_name):
+        """Sinyal katmanı için (indeks, T, H, Er, referans plane) döndürür."""
+        if self.cache is None:
+            return self._layer_parameters(layer_name)
+        key = ("layer", self.stackup.content_hash(), layer_name)
+        return self.cache.get_or_compute(key, lambda: self._layer_parameters(layer_name))
+
+    def _layer_parameters(self, layer_name):
+        with self.profiler.stage("solve.validate"):
+            layer_index = self.stackup.index_of(layer_name)
+            
+            if layer_index == -1 or layer_name == "":
+                raise Exception("Please select a valid Signal Layer for calculation.")
+                
+            if self.stackup.rows[layer_index][1] != "Signal": 
+                raise Exception(f"{MESSAGES['ERROR_INPUT']}: Layer Class ('{self.stackup.rows[layer_index][1]}') must be 'Signal'.")
+
+            T = get_float_or_error(f"{layer_name} {MESSAGES['COL_THICKNESS']} (T)", self.stackup.rows[layer_index][2])
+
+        with self.profiler.stage("solve.plane"):
+            H, Er, reference_plane_name = self.stackup.find_nearest_plane_and_dielectric(layer_index)
+        
+        if H <= 0 or Er <= 0:
+            raise Exception(f"{MESSAGES['ERROR_INPUT']}: {MESSAGES['COL_THICKNESS']} (H={H:.3f}) or Dk (Er={Er:.2f}) is zero or negative. Check stackup parameters.")
+
+        return layer_index, T, H, Er, reference_plane_name
+
+    def solve(self, layer_name, W, Gap, S, model="formula"):
+        """Tek katman için Zdiff hesaplar; W/Gap/S string ('0,15') veya sayı olabilir. model: 'formula' veya 'field'."""
+        if model not in IMPEDANCE_MODELS:
+            raise ValueError(f"Unknown impedance model '{model}' (expected 'formula' or 'field').")
+        _, T, H, Er, reference_plane_name = self.layer_parameters(layer_name)
+
+        with self.profiler.stage("solve.validate"):
+            W = get_float_or_error(MESSAGES["LABEL_W"].split(':')[0], W)
+            Gap = get_float_or_error(MESSAGES["LABEL_GAP"].split(':')[0], Gap)
+            S = get_float_or_error(MESSAGES["LABEL_S"].split(':')[0], S)
+
+        if model == "field":
+            with self.profiler.stage("solve.field"):
+                normalize = ImpedanceCache.normalize
+                W, Gap, S = normalize(W), normalize(Gap), normalize(S)
+                if self.cache is None:
+                    Zdiff = self._field_zdiff(layer_name, W, Gap, S)
+                else:
+                    key = ("field", self.stackup.content_hash(), layer_name, W, Gap, S)
+                    Zdiff = self.cache.get_or_compute(key, lambda: self._field_zdiff(layer_name, W, Gap, S))
+            return ImpedanceResult(layer_name, Zdiff, T, H, Er, reference_plane_name, W / H, S < H, model)
+
+        with self.profiler.stage("solve.formula"):
+            if self.cache is None:
+                Zdiff = calculate_zdiff(W, Gap, S, T, H, Er)
+            else:
+                # Sonuç normalize edilmiş girişlerle hesaplanır; böylece önbellek değeri anahtarın saf bir fonksiyonudur
+                normalize = ImpedanceCache.normalize
+                inputs = (normalize(W), normalize(Gap), normalize(S), normalize(T), normalize(H), normalize(Er))
+                Zdiff = self.cache.get_or_compute(("zdiff",) + inputs, lambda: calculate_zdiff(*inputs))
+        return ImpedanceResult(layer_name, Zdiff, T, H, Er, reference_plane_name, W / H, S < H)
+
+    def solve_all(self, W, Gap, S, model="formula"):
+        """Tüm sinyal katmanları için Zdiff hesaplar."""
+        return [self.solve(layer_name, W, Gap, S, model) for layer_name in self.stackup.signal_layers()]
+
+    def cross_section(self, layer_name):
+        """Alan çözücüsü için CrossSection: referans plane'e kadarki dielektrikler ve karşı taraftaki katmanlar.
+
+        Karşı taraf bir sonraki Plane'e (kapalı, stripline) ya da yüzeye (açık) kadar okunur; araya giren sinyal
+        katmanları komşu dielektrikle dolu kabul edilir.
+        """
+        return self._cross_section_rows(layer_name)[0]
+
+    def _cross_section_rows(self, layer_name):
+        """(CrossSection, kesit katmanlarının malzeme satırları, (sinyal, referans plane, karşı Plane) satırları).
+
+        Malzeme satırı, araya giren sinyal bakırı için dolgu dielektriğidir (yoksa None); karşı Plane yoksa None.
+        """
+        layer_index, T, _, _, reference_plane_name = self.layer_parameters(layer_name)
+        rows = self.stackup.rows
+
+        def dielectric(i):
+            return (get_float_or_error(f"{rows[i][0]} {MESSAGES['COL_THICKNESS']}", rows[i][2]),
+                    get_float_or_error(f"{rows[i][0]} {MESSAGES['COL_DK']}", rows[i][3]))
+
+        plane_index, dielectrics = next((plane_index, dielectrics) for plane_index, dielectrics in self.stackup.reference_candidates(layer_index)
+                                        if rows[plane_index][0] == reference_plane_name)
+        step = -1 if plane_index > layer_index else 1
+
+        above, materials = [], []
+        top_plane = None
+        i = layer_index + step
+        while 0 <= i < len(rows):
+            if rows[i][4] in DIELECTRIC_TYPES:
+                above.append(dielectric(i))
+                materials.append(i)
+            elif rows[i][4] == "Copper":
+                if rows[i][1] == "Plane":
+                    top_plane = i
+                    break
+                thickness = get_float_or_error(f"{rows[i][0]} {MESSAGES['COL_THICKNESS']}", rows[i][2])
+                above.append((thickness, above[-1][1] if above else 1.0))
+                materials.append(materials[-1] if materials else None)
+            i += step
+        section = CrossSection(T, tuple(dielectric(i) for i in dielectrics), tuple(above), top_plane is not None)
+        return section, list(dielectrics) + materials, (layer_index, plane_index, top_plane)
+
+    def line_model(self, layer_name, W, Gap, S, loss=None):
+        """Kayıp hesabı için DifferentialLine; loss bir LossParameters'tır (None: tip varsayılanları)."""
+        loss = LossParameters() if loss is None else loss
+        W = get_float_or_error(MESSAGES["LABEL_W"].split(':')[0], W)
+        Gap = get_float_or_error(MESSAGES["LABEL_GAP"].split(':')[0], Gap)
+        S = get_float_or_error(MESSAGES["LABEL_S"].split(':')[0], S)
+
+        section, materials, conductors = self._cross_section_rows(layer_name)
+        field_solver = self.field_solver if self.field_solver is not None else default_field_solver()
+        field = field_solver.solve(W, Gap, S, section)
+
+        rows = self.stackup.rows
+        tan_delta = sum(share * loss.tan_delta(rows[i]) for share, i in zip(field.filling, materials) if i is not None)
+        roughness = [loss.roughness_um(rows[i]) if i is not None else 0.0 for i in conductors]
+        return DifferentialLine(layer_name, field, tan_delta, roughness, W, section.T)
+
+    def _field_zdiff(self, layer_name, W, Gap, S):
+        field_solver = self.field_solver if self.field_solver is not None else default_field_solver()
+        return field_solver.solve(W, Gap, S, self.cross_section(layer_name)).zdiff
+
+    def synthesize(self, layer_name, target_zdiff, W, Gap, S, solve_for="W", guess=None):
+        """Hedef Zdiff için W'yi (veya Gap'i) bulur; diğeri sabit tutulur. W/H=1 rejim sıçraması ayrı segmentlerle ele alınır."""
+        _, T, H, Er, _ = self.layer_parameters(layer_name)
+
+        target_zdiff = get_float_or_error(MESSAGES["LABEL_Z0_TARGET"].split(':')[0], target_zdiff)
+        W = get_float_or_error(MESSAGES["LABEL_W"].split(':')[0], W)
+        Gap = get_float_or_error(MESSAGES["LABEL_GAP"].split(':')[0], Gap)
+        S = get_float_or_error(MESSAGES["LABEL_S"].split(':')[0], S)
+
+        if solve_for == "W":
+            # Segment 1: dar formül (W < H), Segment 2: geniş formül (W >= H, Zdiff > 0 olan bölge)
+            segments = [(1e-4 * H, H * (1.0 - 1e-9), False)]
+            W_max = 0.999 * (5.98 * H - T) / 0.8
+            if W_max > H:
+                segments.append((H, W_max, True))
+
+            def make_f(wide):
+                return lambda x: _zdiff_in_regime(x, Gap, S, T, H, Er, wide) - target_zdiff
+            guess = W if guess is None else guess
+        elif solve_for == "Gap":
+            wide = W / H >= 1.0
+            segments = [(1e-3 * H, 50.0 * H, wide)]
+
+            def make_f(wide):
+                return lambda x: _zdiff_in_regime(W, x, S, T, H, Er, wide) - target_zdiff
+            guess = Gap if guess is None else guess
+        else:
+            raise ValueError(f"Unknown synthesis variable '{solve_for}' (expected 'W' or 'Gap').")
+
+        roots = []
+        closest = None
+        for lo, hi, wide in segments:
+            f = make_f(wide)
+            root = _solve_in_segment(f, lo, hi, guess)
+            if root is not None:
+                roots.append(root)
+            for x in (lo, hi):
+                error = abs(f(x))
+                if closest is None or error < closest[0]:
+                    closest = (error, x)
+
+        if roots:
+            # İki rejimde de çözüm varsa başlangıç değerine en yakın olan seçilir
+            value = min(roots, key=lambda x: abs(x - guess))
+            achieved = True
+            note = ""
+        else:
+            value = closest[1]
+            achieved = False
+            if solve_for == "W" and len(segments) == 2:
+                Z_narrow = _zdiff_in_regime(H * (1.0 - 1e-9), Gap, S, T, H, Er, False)
+                Z_wide = _zdiff_in_regime(H, Gap, S, T, H, Er, True)
+                in_jump = min(Z_narrow, Z_wide) < target_zdiff < max(Z_narrow, Z_wide)
+            else:
+                in_jump = False
+            note = MESSAGES["SYNTH_REGIME_JUMP"] if in_jump else MESSAGES["SYNTH_UNREACHABLE"]
+
+        if solve_for == "W":
+            W = value
+        else:
+            Gap = value
+        return SynthesisResult(layer_name, solve_for, W, Gap, calculate_zdiff(W, Gap, S, T, H, Er), achieved, note)
+
+    def synthesize_all(self, target_zdiff, W, Gap, S, solve_for="W", progress=None):
+        """Tüm sinyal katmanları için sentez; her katman bir öncekinin (H'ye oranlanmış) çözümüyle sıcak başlar.
+
+        progress verilirse her katmandan sonra (tamamlanan, toplam) ile çağrılır; iptal bu çağrıdan fırlatılabilir.
+        """
+        results = []
+        guess_ratio = None
+        layers = self.stackup.signal_layers()
+        for layer_name in layers:
+            H = self.layer_parameters(layer_name)[2]
+            guess = None if guess_ratio is None else guess_ratio * H
+            result = self.synthesize(layer_name, target_zdiff, W, Gap, S, solve_for=solve_for, guess=guess)
+            if result.achieved:
+                guess_ratio = (result.W if solve_for == "W" else result.Gap) / H
+            results.append(result)
+            if progress:
+                progress(len(results), len(layers))
+        return results
+
+    def compliance_matrix(self, W, Gap, S, standards=None):
+        """Her standart arayüz x her sinyal katmanı için mevcut W/Gap ile geçti/kaldı ve hedef için gereken W.
+
+        Hedef ve tolerans tablo metinlerinin ilk sayısıdır ('10-15' -> 10). NumPy varsa tüm matris tek vektörel
+        geçişte çözülür; yoksa hücre başına synthesize kullanılır. Katman hataları errors'a yazılır.
+        """
+        standards = STANDARD_IMPEDANCES if standards is None else standards
+        W = get_float_or_error(MESSAGES["LABEL_W"].split(':')[0], W)
+        Gap = get_float_or_error(MESSAGES["LABEL_GAP"].split(':')[0], Gap)
+        S = get_float_or_error(MESSAGES["LABEL_S"].split(':')[0], S)
+        interfaces = [standard[0] for standard in standards]
+        targets = [standard_target(standard[1]) for standard in standards]
+        tolerances = [standard_target(standard[2]) for standard in standards]
+
+        layers, parameters, errors = self.stackup.signal_layers(), [], {}
+        for layer_name in layers:
+            try:
+                parameters.append(self.layer_parameters(layer_name)[1:4])
+            except Exception as e:
+                errors[layer_name] = str(e)
+                parameters.append(None)
+        valid = [i for i, item in enumerate(parameters) if item is not None]
+
+        zdiff = [None] * len(layers)
+        passed = [[False] * len(layers) for _ in standards]
+        required_W = [[None] * len(layers) for _ in standards]
+        if valid and _numpy() is not None:
+            T, H, Er = (np.array([parameters[i][k] for i in valid]) for k in range(3))
+            Z = calculate_zdiff_batch(W, Gap, S, T, H, Er)
+            target, tolerance = np.array(targets)[:, None], np.array(tolerances)[:, None]
+            in_spec = np.abs(Z[None, :] - target) <= target * tolerance / 100.0
+            required = required_width_batch(target, Gap, S, T[None, :], H[None, :], Er[None, :], W)
+            for column, i in enumerate(valid):
+                zdiff[i] = float(Z[column])
+                for k in range(len(standards)):
+                    passed[k][i] = bool(in_spec[k, column])
+                    required_W[k][i] = None if np.isnan(required[k, column]) else float(required[k, column])
+        else:
+            for i in valid:
+                T, H, Er = parameters[i]
+                zdiff[i] = calculate_zdiff(W, Gap, S, T, H, Er)
+                for k, (target, tolerance) in enumerate(zip(targets, tolerances)):
+                    passed[k][i] = abs(zdiff[i] - target) <= target * tolerance / 100.0
+                    result = self.synthesize(layers[i], target, W, Gap, S)
+                    required_W[k][i] = result.W if result.achieved else None
+        return ComplianceMatrix(interfaces, layers, targets, tolerances, W, Gap, S, zdiff, passed, required_W, errors)
+
+    def sweep(self, W_values, Gap_values, S_values, layers=None, chunk_size=65536, executor=None):
+        """W x Gap x S x katman taramasını SweepChunk üreteci olarak döndürür; bellek kullanımı chunk_size ile sınırlıdır.
+
+        executor (ParallelZdiffExecutor) verilirse ızgara blok blok paylaşımlı belleğe yazılıp işçilerde hesaplanır.
+        """
+        if layers is None:
+            layers = self.stackup.signal_layers()
+        # Katman hataları, üreteç tüketilmeden önce (çağrı anında) yükseltilir
+        parameters = [(layer_name, self.layer_parameters(layer_name)) for layer_name in layers]
+        if executor is not None and _numpy() is not None:
+            return _sweep_chunks_parallel(executor, parameters, W_values, Gap_values, S_values, chunk_size)
+        return itertools.chain.from_iterable(
+            _sweep_layer_chunks(layer_name, T, H, Er, W_values, Gap_values, S_values, chunk_size)
+            for layer_name, (_, T, H, Er, _) in parameters
+        )
+
+    def monte_carlo_yield(self, layer_name, W, Gap, S, target_zdiff, tolerance_percent, samples=100000, seed=0,
+                          sigma_W=0.01, sigma_thickness_percent=5.0, sigma_copper_percent=10.0, sigma_dk_percent=3.0,
+                          bins=40, batch_size=250000, progress=None, executor=None):
+        """Üretim toleransları için Monte Carlo verim analizi.
+
+        W (mm, mutlak sigma), dielektrik kalınlığı, bakır kalınlığı ve Dk (% sigma) normal dağılımla örneklenir.
+        Hatve sabit kabul edilir: aşındırma W'yi ne kadar değiştirirse Gap ve S o kadar ters yönde değişir.
+        Aynı seed, samples ve batch_size ile sonuç birebir tekrarlanır (executor'ın işçi sayısından bağımsız).
+        Örnekler parti parti ZdiffBatch'e yazılır ve executor (ParallelZdiffExecutor; verilmezse bu süreç) ile
+        hesaplanır; işçi başına verim sonucun parallel alanındadır. progress verilirse her partiden sonra
+        (tamamlanan örnek, toplam örnek, o ana kadarki verim %) ile çağrılır.
+        """
+        np = _require_numpy()
+        layer_index, T, _, _, _ = self.layer_parameters(layer_name)
+
+        W = get_float_or_error(MESSAGES["LABEL_W"].split(':')[0], W)
+        Gap = get_float_or_error(MESSAGES["LABEL_GAP"].split(':')[0], Gap)
+        S = get_float_or_error(MESSAGES["LABEL_S"].split(':')[0], S)
+        target_zdiff = get_float_or_error(MESSAGES["LABEL_Z0_TARGET"].split(':')[0], target_zdiff)
+        tolerance_percent = get_float_or_error(MESSAGES["LABEL_TOLERANCE"].split(':')[0], tolerance_percent, can_be_zero=True)
+        samples = int(get_float_or_error(MESSAGES["MC_SAMPLES"], samples))
+        if samples < 1:
+            raise ValueError(f"'{MESSAGES['MC_SAMPLES']}' must be a whole number of at least 1.")
+        lower, upper = self.tolerance_limits(target_zdiff, tolerance_percent)
+
+        # Her aday yön için dielektriklerin nominal kalınlık ve Dk değerleri
+        candidates = []
+        for _, dielectrics in self.stackup.reference_candidates(layer_index):
+            thickness = np.array([get_float_or_error("", self.stackup.rows[i][2]) for i in dielectrics])
+            dk = np.array([get_float_or_error("", self.stackup.rows[i][3]) for i in dielectrics])
+            candidates.append((thickness, dk))
+
+        n_batches = max(1, -(-samples // batch_size))
+        streams = np.random.SeedSequence(seed).spawn(n_batches)
+
+        passed = 0
+        total = 0.0
+        total_sq = 0.0
+        minimum, maximum = math.inf, -math.inf
+        counts, bin_edges = None, None
+
+        local_executor = executor is None
+        if local_executor:
+            executor = ParallelZdiffExecutor(jobs=1)
+        executor.reset_stats()
+        shared = executor.allocate(min(batch_size, samples), len(candidates), max(len(thickness) for thickness, _ in candidates))
+        try:
+            for batch, stream in enumerate(streams):
+                n = min(batch_size, samples - batch * batch_size)
+                rng = np.random.default_rng(stream)
+
+                dW = sigma_W * rng.standard_normal(n)
+                np.maximum(W + dW, 1e-6, out=shared.W[:n])
+                np.maximum(Gap - dW, 1e-6, out=shared.Gap[:n])
+                np.maximum(S - 0.5 * dW, 1e-6, out=shared.S[:n])
+                np.maximum(T * (1.0 + sigma_copper_percent / 100.0 * rng.standard_normal(n)), 1e-6, out=shared.T[:n])
+
+                # Her yönün dielektrikleri örneklenir (kısa yönlerin dolgu satırları sıfır kalır); plane/Er çözümlemesi
+                # boru hattının ilk aşamasıdır
+                for c, (thickness, dk) in enumerate(candidates):
+                    k = len(thickness)
+                    np.maximum(thickness[:, None] * (1.0 + sigma_thickness_percent / 100.0 * rng.standard_normal((k, n))), 1e-6, out=shared.thickness[c, :k, :n])
+                    np.maximum(dk[:, None] * (1.0 + sigma_dk_percent / 100.0 * rng.standard_normal((k, n))), 1.0, out=shared.dk[c, :k, :n])
+
+                executor.run(shared, n)
+                Zdiff = shared.zdiff[:n]
+
+                passed += int(np.count_nonzero((Zdiff >= lower) & (Zdiff <= upper)))
+                total += float(Zdiff.sum())
+                total_sq += float(np.square(Zdiff).sum())
+                minimum = min(minimum, float(Zdiff.min()))
+                maximum = max(maximum, float(Zdiff.max()))
+
+                if bin_edges is None:
+                    # Histogram aralığı ilk partiden belirlenir; sonraki taşmalar uç kutulara eklenir
+                    lo, hi = min(minimum, lower), max(maximum, upper)
+                    pad = 0.05 * (hi - lo)
+                    bin_edges = np.linspace(lo - pad, hi + pad, bins + 1)
+                    counts = np.zeros(bins, dtype=np.int64)
+                counts += np.histogram(np.clip(Zdiff, bin_edges[0], bin_edges[-1]), bins=bin_edges)[0]
+
+                if progress:
+                    done = batch * batch_size + n
+                    progress(done, samples, 100.0 * passed / done)
+        finally:
+            # Paylaşımlı blok, ona bakan görünüm (Zdiff) bırakılmadan kapatılamaz
+            Zdiff = None
+            shared.close()
+            if local_executor:
+                executor.close()
+
+        mean = total / samples
+        std = math.sqrt(max(total_sq / samples - mean * mean, 0.0))
+        return YieldResult(layer_name, samples, 100.0 * passed / samples, mean, std, minimum, maximum, lower, upper,
+                           counts.tolist(), bin_edges.tolist(), executor.stats())
+
+    @staticmethod
+    def tolerance_limits(target_zdiff, tolerance_percent):
+        Tolerance_Factor = tolerance_percent / 100.0
+        return target_zdiff * (1.0 - Tolerance_Factor), target_zdiff * (1.0 + Tolerance_Factor)
+
+
+# --- 2B Alan Çözücüsü (Sonlu Farklar, isteğe bağlı model) ---
+
+ETA0 = 376.730313668  # Boş uzay dalga empedansı (Ω)
+
+# below/above: ((kalınlık, Er), ...) sinyalden dışa doğru; below referans plane'e kadar, above sonraki Plane'e veya yüzeye kadar
+CrossSection = namedtuple("CrossSection", ["T", "below", "above", "top_grounded"])
+# filling: elektrik enerjisinin katman payları (below + above sırası); resistance: Rs ile çarpılacak geometrik çarpanlar
+# (1/mm; sinyal bakırı, referans plane, karşı Plane)
+FieldSolution = namedtuple("FieldSolution", ["zdiff", "z_odd", "er_eff", "nodes", "iterations", "factorized", "filling", "resistance"])
+
+
+def _graded_axis(breakpoints, h_fine, h_max, growth):
+    """Kırılma noktalarında h_fine olan, aralık ortasına doğru growth oranıyla h_max'a kadar büyüyen düğüm dizisi."""
+    points = [breakpoints[0]]
+    for a, b in zip(breakpoints[:-1], breakpoints[1:]):
+        half = (b - a) / 2.0
+        steps, total, h = [], 0.0, min(h_fine, half)
+        while total + h < half * (1.0 - 1e-9):
+            steps.append(h)
+            total += h
+            h = min(h * growth, h_max)
+        # Yarım adımlar aralığı tam dolduracak şekilde ölçeklenir ve ortada aynalanır
+        scale = half / sum(steps) if steps else 1.0
+        steps = [h * scale for h in steps] or [half]
+        x = a
+        for h in (steps + steps[::-1])[:-1]:
+            x += h
+            points.append(x)
+        points.append(b)
+    return points
+
+
+class _BlockTridiagonal:
+    """x sütunlarına göre blok üç köşegenli simetrik sistemin blok Thomas çarpanları.
+
+    Her sütun bloğunun Schur tümleyeninin tersi yoğun olarak saklanır; solve() yalnızca matris-vektör çarpımlarıdır.
+    """
+
+    def __init__(self, diag, gx, gy):
+        nx, ny = diag.shape
+        self.gx = gx
+        self.inverses = np.empty((nx, ny, ny))
+        rows = np.arange(ny)
+        for i in range(nx):
+            block = np.zeros((ny, ny))
+            block[rows, rows] = diag[i]
+            block[rows[:-1], rows[1:]] = -gy[i]
+            block[rows[1:], rows[:-1]] = -gy[i]
+            if i > 0:
+                block -= gx[i - 1][:, None] * self.inverses[i - 1] * gx[i - 1][None, :]
+            self.inverses[i] = np.linalg.inv(block)
+
+    def solve(self, b):
+        inverses, gx = self.inverses, self.gx
+        y = np.empty_like(b)
+        y[0] = b[0]
+        for i in range(1, len(b)):
+            y[i] = b[i] + gx[i - 1] * (inverses[i - 1] @ y[i - 1])
+        x = np.empty_like(b)
+        x[-1] = inverses[-1] @ y[-1]
+        for i in range(len(b) - 2, -1, -1):
+            x[i] = inverses[i] @ (y[i] + gx[i] * x[i + 1])
+        return x
+
+
+class _FieldGeometry:
+    """Er'den bağımsız kısımlar: ızgara, iletken maskesi, hava dolu sistemin çarpanları ve C_air."""
+
+    def __init__(self, W, Gap, S, section, cells_per_feature, growth, open_top):
+        T, below, above = section.T, section.below, section.above
+        H = sum(t for t, _ in below)
+        # Çok ince bakır, ızgarayı tüm kesitte inceltmesin diye en küçük özelliğin 1/4'ü ile sınırlanır
+        feature = min(W, Gap, S, H)
+        h_fine = min(feature, max(2.0 * T, feature / 4.0)) / cells_per_feature
+        h_max = max(H, W) / 3.0
+
+        # Yarım kesit: x=0 tek mod simetri duvarı (V=0), y=0 referans plane (V=0), yanal toprak S mesafesinde
+        self.x_trace = (Gap / 2.0, Gap / 2.0 + W)
+        self.x_ground = self.x_trace[1] + S
+        x_breaks = [0.0, self.x_trace[0], self.x_trace[1], self.x_ground, self.x_ground + 2.0 * H]
+
+        # Katman sınırları section sırasıyla (below, above); kapalı olmayan üst taraf open_top * H uzaklıkta topraklı kabukla kesilir
+        self.layer_bounds = []
+        y = H
+        for t, _ in below:
+            self.layer_bounds.append((y - t, y))
+            y -= t
+        y = H + T
+        for t, _ in above:
+            self.layer_bounds.append((y, y + t))
+            y += t
+        if not section.top_grounded:
+            y += open_top * H
+        y_breaks = sorted({round(v, 12) for v in [0.0, H, H + T, y] + [v for bounds in self.layer_bounds for v in bounds]})
+
+        self.x = np.array(_graded_axis(x_breaks, h_fine, h_max, growth))
+        self.y = np.array(_graded_axis(y_breaks, h_fine, h_max, growth))
+
+        # Her hücre satırının ait olduğu katman (section sırasında indeks, hava -1); bakır bandı iz üstündeki ilk katmana aittir
+        yc = (self.y[:-1] + self.y[1:]) / 2.0
+        self.cell_layer = np.full(len(yc), -1)
+        for k, (lo, hi) in enumerate(self.layer_bounds):
+            self.cell_layer[(yc > lo) & (yc < hi)] = k
+        self.cell_layer[(yc > H) & (yc < H + T)] = len(below) if above else -1
+
+        X, Y = np.meshgrid(self.x, self.y, indexing='ij')
+        tol = 1e-12
+        band = (Y >= H - tol) & (Y <= H + T + tol)
+        self.trace = band & (X >= self.x_trace[0] - tol) & (X <= self.x_trace[1] + tol)
+        self.fixed = self.trace | (band & (X >= self.x_ground - tol))
+        self.fixed[0, :] = True
+        self.fixed[:, 0] = True
+        self.fixed[:, -1] = True
+        self.free = ~self.fixed
+        self.boundary = np.where(self.trace, 1.0, 0.0)
+
+        gx, gy = self.couplings(np.ones((len(self.x) - 1, len(self.y) - 1)))
+        diag, gx_free, gy_free, rhs = self.system(gx, gy)
+        self.factor = _BlockTridiagonal(diag, gx_free, gy_free)
+        V_air = self.factor.solve(rhs)
+        self.c_air = self.energy(gx, gy, V_air)
+        self.last_potential = None
+
+        # Pertürbasyon yöntemi: TEM yüzey akımı yüzey yüküyle orantılıdır, R = Rs * ∮ρ² dl / Q².
+        # Her iletken-serbest düğüm kenarının akısı g·ΔV, yüz genişliği ikili hücrenin kenarıdır (1/mm).
+        hx = np.concatenate(([0.0], np.diff(self.x), [0.0]))
+        hy = np.concatenate(([0.0], np.diff(self.y), [0.0]))
+        flux_x = (gx * np.diff(V_air, axis=0)) ** 2 / ((hy[:-1] + hy[1:]) / 2.0)[None, :]
+        flux_y = (gy * np.diff(V_air, axis=1)) ** 2 / ((hx[:-1] + hx[1:]) / 2.0)[:, None]
+
+        def surface(conductor):
+            edges_x = (conductor[:-1, :] & self.free[1:, :]) | (self.free[:-1, :] & conductor[1:, :])
+            edges_y = (conductor[:, :-1] & self.free[:, 1:]) | (self.free[:, :-1] & conductor[:, 1:])
+            return float(flux_x[edges_x].sum() + flux_y[edges_y].sum()) / self.c_air ** 2
+
+        reference = np.zeros_like(self.fixed)
+        reference[:, 0] = True
+        opposite = np.zeros_like(self.fixed)
+        opposite[:, -1] = section.top_grounded
+        # Sıra: sinyal katmanı bakırı (iz + yanal toprak), referans plane, karşı Plane
+        self.resistance = (surface(self.fixed & band), surface(reference), surface(opposite))
+
+    @property
+    def nodes(self):
+        return self.fixed.size
+
+    def permittivity(self, section):
+        """Hücre bazında bağıl dielektrik sabiti; katmanlar yatay olduğundan yalnızca y'ye bağlıdır.
+
+        Bakır bandındaki boşluk izin üstündeki ilk dielektrikle (prepreg) dolar; dış katmanda havadır.
+        """
+        ers = np.array([1.0] + [er for _, er in section.below + section.above])
+        return np.broadcast_to(ers[self.cell_layer + 1], (len(self.x) - 1, len(self.cell_layer)))
+
+    def filling(self, eps, V, layer_count):
+        """Elektrik enerjisinin katmanlara (section sırasında) dağılımı; toplamı 1 - havadaki pay."""
+        hx, hy = np.diff(self.x), np.diff(self.y)
+        dvx, dvy = np.diff(V, axis=0) ** 2, np.diff(V, axis=1) ** 2
+        cells = eps * ((hy / 2.0)[None, :] / hx[:, None] * (dvx[:, :-1] + dvx[:, 1:]) +
+                       (hx / 2.0)[:, None] / hy[None, :] * (dvy[:-1, :] + dvy[1:, :]))
+        rows = cells.sum(axis=0)
+        inside = self.cell_layer >= 0
+        return np.bincount(self.cell_layer[inside], weights=rows[inside], minlength=layer_count) / rows.sum()
+
+    def couplings(self, eps):
+        """Sonlu hacim bağları: her kenar, iki yanındaki yarım hücrelerin eps * genişlik / uzunluk toplamıdır."""
+        hx, hy = np.diff(self.x), np.diff(self.y)
+        nx, ny = len(self.x), len(self.y)
+        eps_y = np.zeros((nx - 1, ny + 1))
+        eps_y[:, 1:-1] = eps * hy / 2.0
+        gx = (eps_y[:, :-1] + eps_y[:, 1:]) / hx[:, None]
+        eps_x = np.zeros((nx + 1, ny - 1))
+        eps_x[1:-1, :] = eps * hx[:, None] / 2.0
+        gy = (eps_x[:-1, :] + eps_x[1:, :]) / hy[None, :]
+        return gx, gy
+
+    def system(self, gx, gy):
+        """Sabit potansiyelli düğümler simetrik olarak elenir: birim satır, bağları sağ tarafa taşınır."""
+        fixed, free, V = self.fixed, self.free, self.boundary
+        diag = np.zeros(fixed.shape)
+        diag[:-1, :] += gx
+        diag[1:, :] += gx
+        diag[:, :-1] += gy
+        diag[:, 1:] += gy
+        rhs = np.zeros(fixed.shape)
+        rhs[:-1, :] += gx * (free[:-1, :] & fixed[1:, :]) * V[1:, :]
+        rhs[1:, :] += gx * (free[1:, :] & fixed[:-1, :]) * V[:-1, :]
+        rhs[:, :-1] += gy * (free[:, :-1] & fixed[:, 1:]) * V[:, 1:]
+        rhs[:, 1:] += gy * (free[:, 1:] & fixed[:, :-1]) * V[:, :-1]
+        return (np.where(fixed, 1.0, diag), gx * free[:-1, :] * free[1:, :], gy * free[:, :-1] * free[:, 1:],
+                np.where(fixed, V, rhs))
+
+    @staticmethod
+    def energy(gx, gy, V):
+        """Birim uzunluk kapasitansı / eps0 = Σ g ΔV² (iz potansiyeli 1 V)."""
+        return float((gx * np.diff(V, axis=0) ** 2).sum() + (gy * np.diff(V, axis=1) ** 2).sum())
+
+
+class FieldSolver:
+    """Kesitte Laplace denklemini sonlu farklarla çözerek tek mod Zdiff hesaplar (kapalı formlara doğrulama modeli).
+
+    Yarım kesit dikdörtgen, kırılma noktalarında sıklaşan bir ızgaraya bölünür. Hava dolu sistem geometri başına bir kez
+    çarpanlarına ayrılır ve LRU'da tutulur; dielektrikli sistem bu çarpanlarla ön koşullandırılmış eşlenik gradyanla
+    (PCG) çözülür. Böylece aynı geometride Er değişimleri ve tekrar eden tarama noktaları yeniden çarpanlara ayırma
+    gerektirmez; önceki potansiyel dağılımı da başlangıç tahmini olarak kullanılır.
+    """
+
+    def __init__(self, cells_per_feature=16, growth=1.25, open_top=10.0, max_geometries=16, tolerance=1e-9, max_iterations=500):
+        self.cells_per_feature = cells_per_feature
+        self.growth = growth
+        self.open_top = open_top
+        self.max_geometries = max_geometries
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self._geometries = OrderedDict()
+        self._lock = threading.Lock()
+        self.factorizations = 0
+
+    def geometry(self, W, Gap, S, section):
+        """Geometri (Er hariç) için önbellekteki çarpanları döndürür; yoksa kurar."""
+        normalize = ImpedanceCache.normalize
+        key = (normalize(W), normalize(Gap), normalize(S), normalize(section.T), section.top_grounded,
+               tuple(normalize(t) for t, _ in section.below), tuple(normalize(t) for t, _ in section.above))
+        with self._lock:
+            geometry = self._geometries.get(key)
+            if geometry is not None:
+                self._geometries.move_to_end(key)
+                return geometry, False
+
+        geometry = _FieldGeometry(W, Gap, S, section, self.cells_per_feature, self.growth, self.open_top)
+        with self._lock:
+            self.factorizations += 1
+            self._geometries[key] = geometry
+            while len(self._geometries) > self.max_geometries:
+                self._geometries.popitem(last=False)
+        return geometry, True
+
+    def solve(self, W, Gap, S, section):
+        """FieldSolution döndürür; W/Gap/S ve kalınlıklar mm, section bir CrossSection'dır."""
+        _require_numpy()
+        if min(W, Gap, S, section.T) <= 0 or not section.below or any(t <= 0 or er < 1.0 for t, er in section.below + section.above):
+            raise ValueError("Field solver needs positive W, Gap, S, T and dielectric thicknesses, and Dk >= 1.")
+
+        geometry, factorized = self.geometry(W, Gap, S, section)
+        eps = geometry.permittivity(section)
+        gx, gy = geometry.couplings(eps)
+        diag, gx_free, gy_free, rhs = geometry.system(gx, gy)
+
+        def apply(v):
+            result = diag * v
+            result[:-1, :] -= gx_free * v[1:, :]
+            result[1:, :] -= gx_free * v[:-1, :]
+            result[:, :-1] -= gy_free * v[:, 1:]
+            result[:, 1:] -= gy_free * v[:, :-1]
+            return result
+
+        # PCG: ön koşullandırıcı hava sisteminin kesin çözümüdür; sınır koşulları başlangıç tahmininde zaten sağlanır
+        V = geometry.boundary.copy() if geometry.last_potential is None else geometry.last_potential.copy()
+        residual = rhs - apply(V)
+        z = geometry.factor.solve(residual)
+        direction = z.copy()
+        rz = float((residual * z).sum())
+        limit = self.tolerance * float(np.linalg.norm(rhs))
+        iterations = 0
+        while float(np.linalg.norm(residual)) > limit:
+            if iterations >= self.max_iterations:
+                raise Exception(f"Field solver did not converge in {self.max_iterations} iterations.")
+            iterations += 1
+            Ad = apply(direction)
+            alpha = rz / float((direction * Ad).sum())
+            V += alpha * direction
+            residual -= alpha * Ad
+            z = geometry.factor.solve(residual)
+            rz, rz_old = float((residual * z).sum()), rz
+            direction = z + (rz / rz_old) * direction
+        geometry.last_potential = V
+
+        c_dielectric = geometry.energy(gx, gy, V)
+        z_odd = ETA0 / math.sqrt(c_dielectric * geometry.c_air)
+        filling = tuple(geometry.filling(eps, V, len(section.below) + len(section.above)).tolist())
+        return FieldSolution(2.0 * z_odd, z_odd, c_dielectric / geometry.c_air, geometry.nodes, iterations, factorized,
+                             filling, geometry.resistance)
+
+    def clear(self):
+        with self._lock:
+            self._geometries.clear()
+
+
+@functools.lru_cache(maxsize=None)
+def default_field_solver():
+    """Süreç başına paylaşılan FieldSolver; çarpan önbelleği Solver örnekleri arasında korunur."""
+    return FieldSolver()
+
+
+# --- Frekansa Bağlı Kayıp ve Touchstone Çıkışı ---
+
+C0 = 299792458.0
+MU0 = 4e-7 * math.pi
+COPPER_CONDUCTIVITY = 5.8e7  # S/m
+# Stackup satırlarında Df/pürüzlülük sütunu yoktur; LossParameters'ta verilmeyen katmanlar bu varsayılanları kullanır
+DEFAULT_LOSS_TANGENT = {"Prepreg": 0.02, "Core": 0.02, "Solder Mask": 0.025}
+DEFAULT_ROUGHNESS_UM = 0.5
+
+# Diziler parça (chunk) uzunluğundadır; kayıplar dB/mm, s11/s21 karmaşık SDD değerleridir
+LossChunk = namedtuple("LossChunk", ["frequency", "zdiff", "loss_db", "conductor_db", "dielectric_db", "s11", "s21"])
+TouchstoneSummary = namedtuple("TouchstoneSummary", ["points", "frequency", "zdiff", "loss_db", "conductor_db", "dielectric_db", "insertion_loss_db"])
+
+
+class LossParameters:
+    """Katman adına göre kayıp tanjantı (Df) ve bakır pürüzlülüğü (Rq, µm). Verilmeyen dielektrikler default_loss_tangent'ı,
+    o da None ise tip varsayılanını (DEFAULT_LOSS_TANGENT); verilmeyen bakırlar default_roughness'ı kullanır."""
+
+    def __init__(self, loss_tangent=None, roughness=None, default_loss_tangent=None, default_roughness=DEFAULT_ROUGHNESS_UM):
+        self.loss_tangent = dict(loss_tangent or {})
+        self.roughness = dict(roughness or {})
+        self.default_loss_tangent = default_loss_tangent
+        self.default_roughness = default_roughness
+
+    def tan_delta(self, row):
+        if row[0] in self.loss_tangent:
+            return self.loss_tangent[row[0]]
+        if self.default_loss_tangent is not None:
+            return self.default_loss_tangent
+        return DEFAULT_LOSS_TANGENT.get(row[4], 0.0)
+
+    def roughness_um(self, row):
+        return self.roughness.get(row[0], self.default_roughness)
+
+    @staticmethod
+    def parse_overrides(var_name, entries):
+        """'Katman Adı=değer' listesini sözlüğe çevirir (komut satırı için)."""
+        overrides = {}
+        for entry in entries or ():
+            name, separator, value = entry.rpartition('=')
+            if not separator or not name.strip():
+                raise ValueError(f"'{entry}' is not in 'Layer Name=value' form ({var_name}).")
+            overrides[name.strip()] = get_float_or_error(f"{var_name} ({name.strip()})", value, can_be_zero=True)
+        return overrides
+
+
+class DifferentialLine:
+    """Diferansiyel çiftin tek mod RLGC modeli (hat başına, SI birimleri); frekans dizileri üzerinde vektörel çalışır.
+
+    L ve C alan çözümünden gelir. R, yüzey yükünden hesaplanan pertürbasyon çarpanlarıyla Rs(f)'den bulunur; her bakır
+    katmana kendi Rq'su ile Hammerstad pürüzlülük çarpanı uygulanır ve DC direnciyle birleştirilir. G, katman Df'lerinin
+    elektrik enerjisi paylarıyla ağırlıklı ortalamasından gelir. Dk ve Df frekanstan bağımsız kabul edilir.
+    """
+
+    def __init__(self, layer, field, tan_delta, roughness, W, T, conductivity=COPPER_CONDUCTIVITY):
+        # roughness: (sinyal bakırı, referans plane, karşı Plane) için Rq (µm); W, T: mm
+        self.layer = layer
+        self.zdiff_dc = field.zdiff
+        self.er_eff = field.er_eff
+        self.tan_delta = tan_delta
+        self.L = field.z_odd * math.sqrt(field.er_eff) / C0
+        self.C = math.sqrt(field.er_eff) / (C0 * field.z_odd)
+        self.resistance = [1e3 * factor for factor in field.resistance]
+        self.roughness = [1e-6 * rq for rq in roughness]
+        self.conductivity = conductivity
+        self.R_dc = 1.0 / (conductivity * W * T * 1e-6)
+
+    def rlgc(self, f):
+        """f (Hz, > 0) dizisi için R, L, G, C (Ω/m, H/m, S/m, F/m) dizileri."""
+        omega = 2.0 * math.pi * f
+        skin_depth = 1.0 / np.sqrt(math.pi * MU0 * self.conductivity * f)
+        Rs = 1.0 / (self.conductivity * skin_depth)
+        R_smooth = Rs * sum(self.resistance)
+        R_rough = Rs * sum(factor * (1.0 + 2.0 / math.pi * np.arctan(1.4 * (rq / skin_depth) ** 2))
+                           for factor, rq in zip(self.resistance, self.roughness))
+        R = np.sqrt(self.R_dc ** 2 + R_rough ** 2)
+        # İç endüktans: düzgün yüzeyde ωL_iç = R_ac
+        L = self.L + R_smooth / omega
+        G = omega * self.C * self.tan_delta
+        return R, L, G, np.full_like(f, self.C)
+
+    def evaluate(self, f, length_mm, reference=100.0):
+        """f dizisi için LossChunk; S parametreleri reference (Ω, diferansiyel) ile normalize edilir."""
+        R, L, G, C = self.rlgc(f)
+        omega = 2.0 * math.pi * f
+        series = R + 1j * omega * L
+        shunt = G + 1j * omega * C
+        zdiff = 2.0 * np.sqrt(series / shunt)
+        gamma = np.sqrt(series * shunt)
+
+        # Kayıp ayrımı düşük kayıp yaklaşımıyla (α_c = R/2Z, α_d = GZ/2); toplam Re(γ)'dır
+        z_odd = zdiff.real / 2.0
+        neper_to_db = 20.0 / math.log(10.0) * 1e-3
+        loss_db = gamma.real * neper_to_db
+        conductor_db = R / (2.0 * z_odd) * neper_to_db
+        dielectric_db = G * z_odd / 2.0 * neper_to_db
+
+        gl = gamma * (length_mm * 1e-3)
+        sinh, cosh = np.sinh(gl), np.cosh(gl)
+        denominator = 2.0 * zdiff * reference * cosh + (zdiff ** 2 + reference ** 2) * sinh
+        s11 = (zdiff ** 2 - reference ** 2) * sinh / denominator
+        s21 = 2.0 * zdiff * reference / denominator
+        return LossChunk(f, zdiff, loss_db, conductor_db, dielectric_db, s11, s21)
+
+    def chunks(self, f_start, f_stop, points, length_mm, reference=100.0, chunk_size=65536):
+        """Doğrusal frekans ızgarasını parça parça değerlendiren üreteç; bellek kullanımı chunk_size ile sınırlıdır."""
+        np = _require_numpy()
+        # Aralık hataları, üreteç tüketilmeden önce (dosya açılmadan) yükseltilir
+        if not 0.0 < f_start < f_stop or points < 2:
+            raise ValueError("Frequency range must satisfy 0 < start < stop with at least 2 points.")
+        step = (f_stop - f_start) / (points - 1)
+
+        def generate():
+            for first in range(0, points, chunk_size):
+                index = np.arange(first, min(first + chunk_size, points), dtype=float)
+                yield self.evaluate(f_start + step * index, length_mm, reference)
+        return generate()
+
+
+def write_touchstone(filepath, line, length_mm, f_start, f_stop, points, reference=100.0, chunk_size=65536, progress=None):
+    """SDD11/SDD21'i Touchstone v1 (.s2p, RI) olarak akış halinde yazar; TouchstoneSummary (son frekans) döndürür."""
+    np = _require_numpy()
+    chunks = line.chunks(f_start, f_stop, points, length_mm, reference, chunk_size)
+    last = None
+    written = 0
+    with open(filepath, 'w', newline='', encoding='utf-8') as f:
+        f.write(f"! Differential-mode (SDD) S-parameters, layer {line.layer}, length {length_mm:g} mm\n")
+        f.write(f"! Zdiff(DC) = {line.zdiff_dc:.3f} Ohm, Er_eff = {line.er_eff:.4f}, effective Df = {line.tan_delta:.5f}\n")
+        f.write(f"# Hz S RI R {reference:g}\n")
+        for chunk in chunks:
+            # Karşılıklı ve simetrik hat: S12 = S21, S22 = S11 (Touchstone 2-port sırası: S11 S21 S12 S22)
+            table = np.column_stack([chunk.frequency, chunk.s11.real, chunk.s11.imag, chunk.s21.real, chunk.s21.imag,
+                                     chunk.s21.real, chunk.s21.imag, chunk.s11.real, chunk.s11.imag])
+            np.savetxt(f, table, fmt="%.9g")
+            written += len(chunk.frequency)
+            last = chunk
+            if progress:
+                progress(written, points)
+
+    return TouchstoneSummary(written, float(last.frequency[-1]), float(last.zdiff[-1].real), float(last.loss_db[-1]),
+                             float(last.conductor_db[-1]), float(last.dielectric_db[-1]),
+                             -20.0 * math.log10(abs(complex(last.s21[-1]))))
+
+
+# --- Parametre Taraması (Sweep) ---
+
+SweepChunk = namedtuple("SweepChunk", ["layer", "W", "Gap", "S", "T", "H", "Er", "zdiff"])
+
+def parse_sweep_range(var_name, text):
+    """'başlangıç:bitiş:adım', '0.1; 0.15' listesi veya tek değer kabul eder; değer listesi döndürür."""
+    text = str(text).strip()
+    if ':' in text:
+        parts = text.split(':')
+        if len(parts) != 3:
+            raise ValueError(f"'{var_name}' range must be written as start:stop:step (e.g., 0.1:0.3:0.05).")
+        start, stop, step = (get_float_or_error(var_name, part) for part in parts)
+        if stop < start:
+            raise ValueError(f"'{var_name}' range stop must not be smaller than start.")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return [start + i * step for i in range(count)]
+    return [get_float_or_error(var_name, part) for part in re.split(r'[;\s]+', text) if part]
+
+def _sweep_layer_chunks(layer_name, T, H, Er, W_values, Gap_values, S_values, chunk_size):
+    """Tek katman için W x Gap x S ızgarasını sabit boyutlu parçalar halinde üretir (tüm ızgara bellekte tutulmaz)."""
+    shape = (len(W_values), len(Gap_values), len(S_values))
+    total = shape[0] * shape[1] * shape[2]
+
+    if _numpy() is None:
+        grid = itertools.product(W_values, Gap_values, S_values)
+        while True:
+            points = list(itertools.islice(grid, chunk_size))
+            if not points:
+                return
+            zdiff = [calculate_zdiff(W, Gap, S, T, H, Er) for W, Gap, S in points]
+            W, Gap, S = (list(column) for column in zip(*points))
+            yield SweepChunk(layer_name, W, Gap, S, T, H, Er, zdiff)
+
+    W_values, Gap_values, S_values = (np.asarray(values, dtype=float) for values in (W_values, Gap_values, S_values))
+    for start in range(0, total, chunk_size):
+        iW, iGap, iS = np.unravel_index(np.arange(start, min(start + chunk_size, total)), shape)
+        W, Gap, S = W_values[iW], Gap_values[iGap], S_values[iS]
+        yield SweepChunk(layer_name, W, Gap, S, T, H, Er, calculate_zdiff_batch(W, Gap, S, T, H, Er))
+
+def _sweep_chunks_parallel(executor, parameters, W_values, Gap_values, S_values, chunk_size):
+    """Solver.sweep'in paralel sürümü: ızgara bloklar halinde tek bir ZdiffBatch'e yazılır.
+
+    H ve Er katman başına sabittir (plane aşaması atlanır). Çıkan parçalar kopyadır; blok bir sonraki turda yeniden doldurulur.
+    """
+    W_values, Gap_values, S_values = (np.asarray(values, dtype=float) for values in (W_values, Gap_values, S_values))
+    shape = (len(W_values), len(Gap_values), len(S_values))
+    total = shape[0] * shape[1] * shape[2]
+    if not total:
+        return
+    # İşçi başına birkaç parça: yük dengelenir, bellek blokla sınırlı kalır. Blok hem chunk_size'ın hem işçi parçasının
+    # katıdır; çıkan parçalar ve parça sınırları seri taramayla aynı kalır
+    unit = chunk_size * executor.chunk_size // math.gcd(chunk_size, executor.chunk_size)
+    block = min(total, unit * -(-executor.chunk_size * 4 * executor.jobs // unit))
+    executor.reset_stats()
+    with executor.allocate(block) as batch:
+        for layer_name, (_, T, H, Er, _) in parameters:
+            batch.T[:], batch.H[:], batch.Er[:] = T, H, Er
+            for block_start in range(0, total, block):
+                count = min(block, total - block_start)
+                iW, iGap, iS = np.unravel_index(np.arange(block_start, block_start + count), shape)
+                np.take(W_values, iW, out=batch.W[:count])
+                np.take(Gap_values, iGap, out=batch.Gap[:count])
+                np.take(S_values, iS, out=batch.S[:count])
+                executor.run(batch, count)
+                for start in range(0, count, chunk_size):
+                    part = slice(start, min(start + chunk_size, count))
+                    yield SweepChunk(layer_name, batch.W[part].copy(), batch.Gap[part].copy(), batch.S[part].copy(), T, H, Er,
+                                     batch.zdiff[part].copy())
+
+def _as_list(values):
+    # NumPy skalerlerini tek tek biçimlendirmek yavaştır; önce Python float listesine çevrilir
+    return values.tolist() if hasattr(values, "tolist") else values
+
+def write_sweep_csv(filepath, chunks, progress=None):
+    """Sweep parçalarını geldikçe CSV'ye yazar (export_to_csv ile aynı biçim: ';' ayraç, virgüllü ondalık). Satır sayısını döndürür.
+
+    progress verilirse her parçadan sonra o ana kadar yazılan satır sayısıyla çağrılır.
+    """
+    headers = [MESSAGES["COL_NAME"], "W (mm)", "Gap (mm)", "S (mm)", "T (mm)", "H (mm)", "Er", "Zdiff (Ohm)"]
+    row_count = 0
+    with open(filepath, 'w', newline='', encoding='utf-8') as f:
+        f.write(';'.join(headers) + '\r\n')
+        for chunk in chunks:
+            fixed = f"{chunk.T:.4f};{chunk.H:.4f};{chunk.Er:.3f}"
+            lines = [
+                f"{chunk.layer};" + f"{W:.4f};{Gap:.4f};{S:.4f};{fixed};{Z:.3f}\r\n".replace('.', ',')
+                for W, Gap, S, Z in zip(*(_as_list(values) for values in (chunk.W, chunk.Gap, chunk.S, chunk.zdiff)))
+            ]
+            f.writelines(lines)
+            row_count += len(lines)
+            if progress:
+                progress(row_count)
+    return row_count
+
+
+# --- Paylaşımlı Bellekli Paralel Yürütücü (Büyük Toplu Hesaplar) ---
+
+# Parça sınırları yalnızca bu boyuta bağlıdır; işçi sayısı sonucu değiştirmez
+PARALLEL_CHUNK_SIZE = 32768
+# Bu kadar noktanın altında süreç havuzu kullanılmaz (aynı parçalar bu süreçte hesaplanır)
+PARALLEL_MIN_POINTS = 131072
+
+WorkerThroughput = namedtuple("WorkerThroughput", ["worker", "chunks", "points", "seconds", "points_per_second"])
+ParallelRunStats = namedtuple("ParallelRunStats", ["points", "chunks", "workers", "seconds", "points_per_second", "per_worker"])
+
+def _attach_shared_memory(name):
+    from multiprocessing import shared_memory
+    try:
+        # Python 3.13+: bağlanan süreç bloğu kaynak izleyicisine kaydetmez (silme işi oluşturan süreçtedir)
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class ZdiffBatch:
+    """Zdiff boru hattının giriş ve çıkış dizileri; shared=True ise tek bir multiprocessing.shared_memory bloğunda.
+
+    Girişler: W, Gap, S, T (n) ve her referans yönü için dielektrik kalınlık/Dk satırları thickness, dk (yön, derinlik, n).
+    Kısa yönler sıfır kalınlıkla doldurulur, tamamen sıfır yön yok sayılır. directions=0 ise plane çözümlemesi atlanır ve
+    H, Er doğrudan girilir. Çıkışlar: H, Er, zdiff (n). Çağıran dizileri yerinde doldurur; işçilere kopya gönderilmez.
+    """
+
+    FIELDS = ("W", "Gap", "S", "T", "thickness", "dk", "H", "Er", "zdiff")
+
+    def __init__(self, n, directions=0, depth=0, shared=False, name=None):
+        np = _require_numpy()
+        self.n, self.directions, self.depth = n, directions, depth
+        shapes = [(n,)] * 4 + [(directions, depth, n)] * 2 + [(n,)] * 3
+        size = max(8, 8 * sum(math.prod(shape) for shape in shapes))
+        self.shm = None
+        if name is not None:
+            self.shm = _attach_shared_memory(name)
+        elif shared:
+            from multiprocessing import shared_memory
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.name = self.shm.name if self.shm is not None else None
+        self.owner = name is None
+        buffer = self.shm.buf if self.shm is not None else bytearray(size)
+        offset = 0
+        for field, shape in zip(self.FIELDS, shapes):
+            setattr(self, field, np.ndarray(shape, dtype=np.float64, buffer=buffer, offset=offset))
+            offset += 8 * math.prod(shape)
+
+    def close(self):
+        # Dizi görünümleri bırakılmadan paylaşımlı blok kapatılamaz
+        for field in self.FIELDS:
+            setattr(self, field, None)
+        if self.shm is not None:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def _zdiff_pipeline(batch, start, stop):
+    """Bir parçayı hesaplar: plane/Er çözümlemesi, W/H rejimine göre geniş/dar formül, S < H için koplanar çarpan."""
+    np = _require_numpy()
+    part = slice(start, stop)
+    if batch.directions:
+        # Monte Carlo ile aynı kural: her yönde H = kalınlıklar toplamı, Er kalınlık ağırlıklı; en yakın plane seçilir
+        H, Er = None, None
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for thickness, dk in zip(batch.thickness[:, :, part], batch.dk[:, :, part]):
+                H_c = thickness.sum(axis=0)
+                Er_c = (thickness * dk).sum(axis=0) / H_c
+                H_c[H_c <= 0.0] = np.inf
+                if H is None:
+                    H, Er = H_c, Er_c
+                else:
+                    closer = H_c < H
+                    H = np.where(closer, H_c, H)
+                    Er = np.where(closer, Er_c, Er)
+        batch.H[part] = H
+        batch.Er[part] = Er
+    batch.zdiff[part] = calculate_zdiff_batch(batch.W[part], batch.Gap[part], batch.S[part], batch.T[part], batch.H[part], batch.Er[part])
+
+_worker_batches = {}
+
+def _zdiff_pipeline_task(task):
+    # İşçi bloğa bir kez bağlanır; yeni blok gelince eskisi bırakılır
+    name, n, directions, depth, start, stop = task
+    batch = _worker_batches.get(name)
+    if batch is None:
+        for old in _worker_batches.values():
+            old.close()
+        _worker_batches.clear()
+        batch = _worker_batches[name] = ZdiffBatch(n, directions, depth, name=name)
+    started = time.perf_counter()
+    _zdiff_pipeline(batch, start, stop)
+    return os.getpid(), stop - start, time.perf_counter() - started
+
+
+class ParallelZdiffExecutor:
+    """ZdiffBatch'leri sabit boyutlu parçalara bölüp süreç havuzunda hesaplar.
+
+    İşçilere yalnızca blok adı ve parça sınırları gönderilir; diziler paylaşımlı bellekte kalır. Parça sınırları yalnızca
+    chunk_size'a bağlı olduğundan ve her parça aynı fonksiyonla hesaplandığından sonuç jobs'tan bağımsızdır (jobs=1 aynı
+    parçaları bu süreçte hesaplar). Havuz ilk paralel çalıştırmada kurulur, close() ile kapatılır. stats() son
+    reset_stats()'tan beri işçi başına verimi (nokta/s, yalnızca hesap süresi) döndürür.
+    """
+
+    def __init__(self, jobs=None, chunk_size=PARALLEL_CHUNK_SIZE, min_parallel_points=PARALLEL_MIN_POINTS):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.min_parallel_points = min_parallel_points
+        self._pool = None
+        self.reset_stats()
+
+    def parallel(self, n):
+        return self.jobs > 1 and n >= self.min_parallel_points
+
+    def allocate(self, n, directions=0, depth=0):
+        """n noktalık ZdiffBatch ayırır; yalnızca paralel çalışılacaksa paylaşımlı bellekte."""
+        return ZdiffBatch(n, directions, depth, shared=self.parallel(n))
+
+    def run(self, batch, count=None, progress=None):
+        """batch'in ilk count noktasını hesaplar (çıkışlar batch.H/Er/zdiff'e yazılır). progress (tamamlanan, toplam) alır."""
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        count = batch.n if count is None else count
+        bounds = [(start, min(start + self.chunk_size, count)) for start in range(0, count, self.chunk_size)]
+        started = time.perf_counter()
+        done = 0
+        if batch.shm is None or not self.parallel(count) or len(bounds) < 2:
+            for start, stop in bounds:
+                chunk_started = time.perf_counter()
+                _zdiff_pipeline(batch, start, stop)
+                self._account(os.getpid(), stop - start, time.perf_counter() - chunk_started)
+                done += stop - start
+                if progress:
+                    progress(done, count)
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.jobs)
+            futures = [self._pool.submit(_zdiff_pipeline_task, (batch.name, batch.n, batch.directions, batch.depth, start, stop))
+                       for start, stop in bounds]
+            try:
+                for future in as_completed(futures):
+                    worker, points, seconds = future.result()
+                    self._account(worker, points, seconds)
+                    done += points
+                    if progress:
+                        progress(done, count)
+            except BaseException:
+                # İptal veya hata: sıradaki parçalar başlatılmaz
+                for future in futures:
+                    future.cancel()
+                raise
+        self._seconds += time.perf_counter() - started
+        self._points += count
+        self._chunks += len(bounds)
+
+    def _account(self, worker, points, seconds):
+        chunks, total_points, total_seconds = self._workers.get(worker, (0, 0, 0.0))
+        self._workers[worker] = (chunks + 1, total_points + points, total_seconds + seconds)
+
+    def reset_stats(self):
+        self._workers = {}
+        self._points = 0
+        self._chunks = 0
+        self._seconds = 0.0
+
+    def stats(self):
+        per_worker = [WorkerThroughput(worker, chunks, points, seconds, points / seconds if seconds else 0.0)
+                      for worker, (chunks, points, seconds) in sorted(self._workers.items())]
+        return ParallelRunStats(self._points, self._chunks, len(per_worker), self._seconds,
+                                self._points / self._seconds if self._seconds else 0.0, per_worker)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+def format_parallel_stats(stats):
+    """ParallelRunStats'ı satır listesi olarak biçimlendirir (toplam ve işçi başına verim)."""
+    lines = [f"{stats.points} points in {stats.chunks} chunks on {stats.workers} worker(s): "
+             f"{stats.seconds * 1e3:.1f} ms, {stats.points_per_second / 1e6:.2f} M points/s"]
+    for worker in stats.per_worker:
+        lines.append(f"  worker {worker.worker}: {worker.chunks} chunks, {worker.points} points, "
+                     f"{worker.seconds * 1e3:.1f} ms busy, {worker.points_per_second / 1e6:.2f} M points/s")
+    return lines
+
+
+# --- Stackup Optimizasyonu (Çapraz Entropi) ---
+
+StackupTarget = namedtuple("StackupTarget", ["layer", "target", "tolerance"])
+# cost: en kötü hedef sapmasının toleransa oranı + başlangıç stackup'ından uzaklık için küçük bir terim
+OptimizedStackup = namedtuple("OptimizedStackup", ["cost", "met", "stackup", "total_thickness", "results"])
+# Değişkenler: Prepreg/Core satırlarının kalınlığı (sınırlar, mm) ve izin verilen Dk değerlerinden biri
+_OptimizerProblem = namedtuple("_OptimizerProblem", ["variables", "lower", "upper", "initial", "initial_dk", "dk_values", "targets", "W", "Gap", "S",
+                                                     "fixed_total", "min_total", "max_total"])
+
+OPTIMIZER_THICKNESS_LIMITS = {"Prepreg": (0.05, 0.4), "Core": (0.1, 1.6)}
+OPTIMIZER_THICKNESS_STEP = 0.001  # Adaylar bu adıma yuvarlanarak değerlendirilir (mm)
+OPTIMIZER_SMOOTHING = 0.7
+# Eşit sapmalı adaylar arasında başlangıç stackup'ına en yakın olanı öne alır (ortalama bağıl değişim başına)
+OPTIMIZER_CHANGE_WEIGHT = 1e-3
+
+
+def parse_stackup_targets(text, default_tolerance):
+    """'1. Top Layer=90; 3. Inner Layer 2=85/5; 4. Inner Layer 3=USB 2.0' metnini StackupTarget listesine çevirir.
+
+    Değer bir sayı ya da Standart Empedanslar tablosundaki bir arayüz adıdır (adın bir parçası yeterlidir);
+    '/tol' toleransı (%) verir, verilmezse arayüzün tipik toleransı veya default_tolerance kullanılır.
+    """
+    targets = []
+    for item in text.split(';'):
+        if not item.strip():
+            continue
+        layer, separator, value = item.rpartition('=')
+        if not separator or not layer.strip() or not value.strip():
+            raise ValueError(f"Target '{item.strip()}' must look like 'layer=Zdiff' or 'layer=Zdiff/tolerance'.")
+        value, tolerance = value.strip(), None
+        head, slash, tail = value.rpartition('/')
+        if slash and re.fullmatch(r'\s*\d+(?:[.,]\d+)?\s*', tail):
+            value, tolerance = head.strip(), tail
+
+        if re.fullmatch(r'\d+(?:[.,]\d+)?', value):
+            target = get_float_or_error(f"{layer.strip()} Zdiff", value)
+        else:
+            standard = next((standard for standard in STANDARD_IMPEDANCES if value.casefold() in standard[0].casefold()), None)
+            if standard is None:
+                raise ValueError(f"'{value}' is neither a Zdiff value nor an interface in the Standard Impedances table.")
+            target = standard_target(standard[1])
+            if tolerance is None:
+                tolerance = str(standard_target(standard[2]))
+        tolerance = get_float_or_error(f"{layer.strip()} {MESSAGES['LABEL_TOLERANCE'].split(':')[0]}",
+                                       default_tolerance if tolerance is None else tolerance)
+        targets.append(StackupTarget(layer.strip(), target, tolerance))
+    if not targets:
+        raise ValueError("At least one layer target is needed.")
+    return targets
+
+def _optimizer_problem(stackup, targets, W, Gap, S, dk_values, thickness_limits, min_total, max_total):
+    """Stackup ve hedeflerden vektörel değerlendirme için sabit dizileri kurar; geçersiz stackup/hedefte hata fırlatır."""
+    np = _require_numpy()
+    solver = Solver(stackup)
+    rows = stackup.rows
+    limits = dict(OPTIMIZER_THICKNESS_LIMITS, **(thickness_limits or {}))
+    variables = [i for i, row in enumerate(rows) if row[4] in limits]
+    if not variables:
+        raise ValueError("The stackup has no Prepreg or Core layers to optimize.")
+    column = {row_index: k for k, row_index in enumerate(variables)}
+
+    def thickness(i):
+        return get_float_or_error(f"{rows[i][0]} {MESSAGES['COL_THICKNESS']}", rows[i][2])
+
+    initial_dk = np.array([get_float_or_error(f"{rows[i][0]} {MESSAGES['COL_DK']}", rows[i][3]) for i in variables])
+    if not dk_values:
+        dk_values = initial_dk.tolist()
+    dk_values = np.array(sorted(set(float(value) for value in dk_values)))
+    if (dk_values <= 0).any():
+        raise ValueError("Allowed Dk values must be positive.")
+
+    lower = np.array([limits[rows[i][4]][0] for i in variables])
+    upper = np.array([limits[rows[i][4]][1] for i in variables])
+    initial = np.clip([thickness(i) for i in variables], lower, upper)
+    fixed_total = sum(get_float_or_error(f"{row[0]} {MESSAGES['COL_THICKNESS']}", row[2], can_be_zero=True)
+                      for i, row in enumerate(rows) if i not in column and row[2])
+
+    problem_targets = []
+    for target in targets:
+        layer_index, T, _, _, _ = solver.layer_parameters(target.layer)
+        if target.tolerance <= 0:
+            raise ValueError(f"Tolerance of '{target.layer}' must be greater than zero.")
+        candidates = []
+        for _, dielectrics in stackup.reference_candidates(layer_index):
+            fixed = [i for i in dielectrics if i not in column]
+            fixed_t = sum(thickness(i) for i in fixed)
+            fixed_tdk = sum(thickness(i) * get_float_or_error(f"{rows[i][0]} {MESSAGES['COL_DK']}", rows[i][3]) for i in fixed)
+            candidates.append(([column[i] for i in dielectrics if i in column], fixed_t, fixed_tdk))
+        problem_targets.append((T, target.target, target.tolerance, candidates))
+
+    return _OptimizerProblem(variables, lower, upper, initial, initial_dk, dk_values, problem_targets,
+                             get_float_or_error(MESSAGES["LABEL_W"].split(':')[0], W),
+                             get_float_or_error(MESSAGES["LABEL_GAP"].split(':')[0], Gap),
+                             get_float_or_error(MESSAGES["LABEL_S"].split(':')[0], S),
+                             fixed_total, min_total, max_total)
+
+def _evaluate_stackup_candidates(problem, X, E):
+    """Aday kalınlık (X) ve Dk (E) matrisleri (aday x değişken) için (maliyet, Zdiff (aday x hedef), toplam kalınlık).
+
+    Plane/Er çözümlemesi monte_carlo_yield ile aynıdır: her yön için H ve ağırlıklı Er, iç katmanda en yakın plane.
+    """
+    np = _require_numpy()
+    error = np.zeros(len(X))
+    zdiff = np.empty((len(X), len(problem.targets)))
+    for j, (T, target, tolerance, candidates) in enumerate(problem.targets):
+        H, Er = None, None
+        for columns, fixed_t, fixed_tdk in candidates:
+            H_c = X[:, columns].sum(axis=1) + fixed_t
+            Er_c = ((X[:, columns] * E[:, columns]).sum(axis=1) + fixed_tdk) / H_c
+            if H is None:
+                H, Er = H_c, Er_c
+            else:
+                closer = H_c < H
+                H = np.where(closer, H_c, H)
+                Er = np.where(closer, Er_c, Er)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            Z = calculate_zdiff_batch(problem.W, problem.Gap, problem.S, T, H, Er)
+        zdiff[:, j] = Z
+        # Geniş formülün geçersiz bölgesi (Zdiff <= 0 veya NaN) hiçbir zaman seçilmez
+        deviation = np.where(np.isfinite(Z) & (Z > 0), np.abs(Z - target) / (target * tolerance / 100.0), np.inf)
+        error = np.maximum(error, deviation)
+
+    total = X.sum(axis=1) + problem.fixed_total
+    over = np.zeros(len(X))
+    if problem.max_total is not None:
+        over += np.maximum(total - problem.max_total, 0.0)
+    if problem.min_total is not None:
+        over += np.maximum(problem.min_total - total, 0.0)
+    if over.any():
+        # Bütçe dışı adaylar her zaman bütçe içindekilerin arkasında sıralanır (bütçenin %1'i = 1 birim)
+        scale = 0.01 * (problem.max_total if problem.max_total is not None else problem.min_total)
+        error = np.where(over > 0, np.maximum(error, 1.0 + over / scale), error)
+
+    change = (np.abs(X - problem.initial) / problem.initial).mean(axis=1) + (np.abs(E - problem.initial_dk) / problem.initial_dk).mean(axis=1)
+    return error + OPTIMIZER_CHANGE_WEIGHT * change, zdiff, total
+
+def _cross_entropy_run(problem, seed, samples, iterations, elite_fraction, keep, progress=None):
+    """Tek bir çapraz entropi zinciri: kalınlıklar kırpılmış normal, Dk seçimleri kategorik dağılımdan örneklenir.
+
+    Her turda en iyi elite_fraction kadar aday dağılımları günceller. En iyi keep tekil aday
+    [(maliyet, kalınlık adımları, Dk indeksleri), ...] olarak döndürülür.
+    """
+    np = _require_numpy()
+    rng = np.random.default_rng(seed)
+    lower, upper, step = problem.lower, problem.upper, OPTIMIZER_THICKNESS_STEP
+    n_variables, n_choices = len(problem.initial), len(problem.dk_values)
+    mean = problem.initial.astype(float)
+    std = (upper - lower) / 4.0
+    probabilities = np.full((n_variables, n_choices), 1.0 / n_choices)
+    elite_count = max(2, int(samples * elite_fraction))
+    best = {}
+
+    for iteration in range(iterations):
+        X = np.clip(mean + std * rng.standard_normal((samples, n_variables)), lower, upper)
+        X = np.clip(np.round(X / step) * step, lower, upper)
+        # Kümülatif olasılıkla kategorik örnekleme (satır başına bağımsız)
+        choice = np.minimum((rng.random((samples, n_variables, 1)) > probabilities.cumsum(axis=1)[None]).sum(axis=2), n_choices - 1)
+        cost, _, _ = _evaluate_stackup_candidates(problem, X, problem.dk_values[choice])
+
+        order = np.argsort(cost, kind="stable")
+        elite = order[:elite_count]
+        mean = OPTIMIZER_SMOOTHING * X[elite].mean(axis=0) + (1.0 - OPTIMIZER_SMOOTHING) * mean
+        std = OPTIMIZER_SMOOTHING * X[elite].std(axis=0) + (1.0 - OPTIMIZER_SMOOTHING) * std
+        frequencies = (choice[elite][:, :, None] == np.arange(n_choices)).mean(axis=0)
+        probabilities = OPTIMIZER_SMOOTHING * frequencies + (1.0 - OPTIMIZER_SMOOTHING) * probabilities
+
+        for k in order[:keep]:
+            key = (tuple(np.round(X[k] / step).astype(int).tolist()), tuple(choice[k].tolist()))
+            best.setdefault(key, float(cost[k]))
+        best = dict(sorted(best.items(), key=lambda item: (item[1], item[0]))[:keep])
+        if progress:
+            progress(iteration + 1, iterations)
+
+    return [(cost, key[0], key[1]) for key, cost in best.items()]
+
+def _cross_entropy_task(task):
+    return _cross_entropy_run(*task)
+
+def optimize_stackup(stackup, targets, W, Gap, S, dk_values=None, thickness_limits=None, min_total=None, max_total=None,
+                     samples=2048, iterations=30, restarts=4, jobs=None, seed=0, keep=10, elite_fraction=0.05, progress=None):
+    """Tüm hedefleri (StackupTarget) sağlayacak Prepreg/Core kalınlıklarını ve Dk seçimlerini çapraz entropi yöntemiyle arar.
+
+    Her tur samples adayı tek vektörel geçişte değerlendirir; restarts bağımsız zincir (SeedSequence(seed).spawn)
+    süreç havuzunda çalışır, jobs=1 ise aynı süreçte. Sonuç jobs'tan bağımsızdır. Toplam kalınlık bütçesi
+    min_total/max_total (mm) ile verilir. Maliyete göre sıralı en iyi keep OptimizedStackup döndürülür; Zdiff
+    değerleri Solver ile yeniden hesaplanır. progress verilirse (tamamlanan, toplam) ile çağrılır.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    np = _require_numpy()
+    problem = _optimizer_problem(stackup, targets, W, Gap, S, dk_values, thickness_limits, min_total, max_total)
+    samples, iterations, restarts = int(samples), int(iterations), max(1, int(restarts))
+    if samples < 4 or iterations < 1:
+        raise ValueError("The optimizer needs at least 4 samples and 1 iteration.")
+    tasks = [(problem, stream, samples, iterations, elite_fraction, keep) for stream in np.random.SeedSequence(seed).spawn(restarts)]
+
+    jobs = min(jobs or os.cpu_count() or 1, restarts)
+    runs = []
+    if jobs == 1:
+        for number, task in enumerate(tasks):
+            def chain_progress(done, total, number=number):
+                if progress:
+                    progress(number * total + done, restarts * total)
+            runs.append(_cross_entropy_run(*task, progress=chain_progress))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for number, run in enumerate(executor.map(_cross_entropy_task, tasks)):
+                runs.append(run)
+                if progress:
+                    progress(number + 1, restarts)
+
+    # Zincirler aynı adayı bulabilir; tekilleştirilip maliyete göre sıralanır
+    merged = sorted({(thickness_steps, choices): cost for run in runs for cost, thickness_steps, choices in run}.items(),
+                    key=lambda item: (item[1], item[0]))[:keep]
+    optimized = []
+    for (thickness_steps, choices), cost in merged:
+        rows = [list(row) for row in stackup.rows]
+        for i, steps, choice in zip(problem.variables, thickness_steps, choices):
+            rows[i][2] = f"{steps * OPTIMIZER_THICKNESS_STEP:.3f}"
+            rows[i][3] = f"{problem.dk_values[choice]:g}"
+        candidate = Stackup(rows)
+        solver = Solver(candidate)
+        results = [solver.solve(target.layer, problem.W, problem.Gap, problem.S) for target in targets]
+        total = candidate.total_thickness()
+        met = (all(abs(result.zdiff - target.target) <= target.target * target.tolerance / 100.0 for result, target in zip(results, targets))
+               and (min_total is None or total >= min_total) and (max_total is None or total <= max_total))
+        optimized.append(OptimizedStackup(cost, met, candidate, total, results))
+    return optimized
+
+
+# --- Stackup Kütüphanesi (Tek Dosyada Çok Sayıda Stackup) ---
+
+LibraryEntry = namedtuple("LibraryEntry", ["name", "offset", "length", "layer_count", "total_thickness"])
+
+
+class StackupLibrary:
+    """Binlerce adlandırılmış stackup'ı tek dosyada tutar: başlık, kayıtlar, indeks ve sabit boyutlu son ek (trailer).
+
+    Kayıtlar sıkıştırılmış JSON'dur. İndeks (ad, konum, uzunluk, bakır katman sayısı, toplam kalınlık) kayıtlardan
+    sonra gelir ve trailer onun konumunu gösterir. Açılışta yalnızca indeks okunur; load() kayda doğrudan seek eder,
+    listeleme ve filtreleme bellekteki indeks üzerinde çalışır. Güncellemeler hiçbir şeyin üzerine yazmaz: yeni kayıtlar,
+    yeni indeks ve trailer dosyanın sonuna eklenir, eski indeks boşluk olarak kalır. Yarıda kesilen bir güncellemeden
+    sonra son geçerli trailer kullanılır; yalnızca o güncelleme kaybolur. Aynı adla ekleme veya silme eski kaydı da
+    boşluk olarak bırakır; compact() bunları temizler ve boşluk dosyanın yarısını aşınca kendiliğinden çağrılır.
+    """
+
+    MAGIC = b"KSLIB1\n"
+    TRAILER = struct.Struct("<QQ8s")
+    TRAILER_MAGIC = b"KSLIBEND"
+    AUTO_COMPACT_BYTES = 1 << 20
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        # Son geçerli trailer'ın bittiği konum; sonrasındaki baytlar yarım kalmış bir güncellemedir
+        self._end = len(self.MAGIC)
+        self._index_length = 0
+        self._search_order = None
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._read_index()
+
+    def _read_index(self):
+        with open(self.path, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError(f"'{self.path}' is not a stackup library file.")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                end = len(buffer)
+                while end >= len(self.MAGIC) + self.TRAILER.size:
+                    index_offset, index_length, magic = self.TRAILER.unpack(buffer[end - self.TRAILER.size:end])
+                    if magic == self.TRAILER_MAGIC and len(self.MAGIC) <= index_offset and index_offset + index_length == end - self.TRAILER.size:
+                        try:
+                            index = json.loads(buffer[index_offset:index_offset + index_length].decode('utf-8'))
+                        except ValueError:
+                            index = None
+                        if index is not None:
+                            self._end, self._index_length = end, index_length
+                            self.entries = {item[0]: LibraryEntry(*item) for item in index}
+                            return
+                    # Sondaki trailer geçersizse bir öncekine bakılır
+                    end = buffer.rfind(self.TRAILER_MAGIC, 0, end - 1) + len(self.TRAILER_MAGIC)
+        # Hiç indeks yazılmamış (ilk güncelleme yarıda kalmış): kütüphane boştur
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def load(self, name):
+        """Adı verilen stackup'ı kayda doğrudan seek ederek okur."""
+        entry = self.entries.get(name)
+        if entry is None:
+            raise ValueError(f"Stackup '{name}' is not in the library '{self.path}'.")
+        with open(self.path, 'rb') as f:
+            f.seek(entry.offset)
+            record = json.loads(f.read(entry.length).decode('utf-8'))
+        return Stackup(record["rows"])
+
+    def add(self, name, stackup):
+        self.add_many([(name, stackup)])
+
+    def add_many(self, items):
+        """(ad, Stackup) çiftlerini tek yazımda ekler; indeks sonda bir kez yazılır. Aynı ad varsa yenisiyle değiştirilir."""
+        with self._open_for_update() as f:
+            for name, stackup in items:
+                name = name.strip()
+                if not name:
+                    raise ValueError("Stackup name cannot be empty.")
+                data = json.dumps({"name": name, "rows": stackup.rows}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                offset = f.tell()
+                f.write(data)
+                layer_count = sum(1 for row in stackup.rows if row[4] == "Copper")
+                self.entries[name] = LibraryEntry(name, offset, len(data), layer_count, round(stackup.total_thickness(), 6))
+
+    def remove(self, name):
+        if name not in self.entries:
+            raise ValueError(f"Stackup '{name}' is not in the library '{self.path}'.")
+        with self._open_for_update():
+            del self.entries[name]
+
+    @contextlib.contextmanager
+    def _open_for_update(self):
+        # Kayıtlar son geçerli trailer'dan sonra yazılır; yeni indeks ve trailer yazılana kadar eski indeks geçerli kalır
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        with open(self.path, 'r+b' if exists else 'w+b') as f:
+            if not exists:
+                f.write(self.MAGIC)
+            # Yalnızca önceki yarım güncellemenin artıkları atılır
+            f.seek(self._end)
+            f.truncate()
+            try:
+                yield f
+            finally:
+                self._write_index(f)
+        live = len(self.MAGIC) + sum(entry.length for entry in self.entries.values()) + self._index_length + self.TRAILER.size
+        if self._end - live > max(live, self.AUTO_COMPACT_BYTES):
+            self.compact()
+
+    def _write_index(self, f):
+        offset = f.seek(0, os.SEEK_END)
+        data = json.dumps([list(entry) for entry in self.entries.values()], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        f.write(data)
+        f.write(self.TRAILER.pack(offset, len(data), self.TRAILER_MAGIC))
+        self._end = f.tell()
+        self._index_length = len(data)
+        self._search_order = None
+
+    def compact(self):
+        """Geçersiz kayıtları atarak dosyayı yeniden yazar (aynı dizinde geçici dosya, ardından os.replace)."""
+        import tempfile
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temporary = tempfile.mkstemp(suffix=".kslib", dir=directory)
+        try:
+            with open(self.path, 'rb') as source, os.fdopen(fd, 'wb') as target:
+                target.write(self.MAGIC)
+                entries = {}
+                for entry in sorted(self.entries.values(), key=lambda entry: entry.offset):
+                    source.seek(entry.offset)
+                    entries[entry.name] = entry._replace(offset=target.tell())
+                    target.write(source.read(entry.length))
+                self.entries = entries
+                self._write_index(target)
+            os.replace(temporary, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temporary)
+            raise
+
+    def find(self, text="", layer_count=None, min_thickness=None, max_thickness=None):
+        """Ada göre sıralı LibraryEntry listesi: ad içinde text (büyük/küçük harf duyarsız), bakır katman sayısı ve toplam kalınlık (mm) aralığı."""
+        if self._search_order is None:
+            self._search_order = sorted((entry.name.casefold(), entry) for entry in self.entries.values())
+        text = text.strip().casefold()
+        return [entry for folded, entry in self._search_order
+                if (not text or text in folded)
+                and (layer_count is None or entry.layer_count == layer_count)
+                and (min_thickness is None or entry.total_thickness >= min_thickness)
+                and (max_thickness is None or entry.total_thickness <= max_thickness)]
+
+
+# --- Sonuç Veritabanı (SQLite) ---
+
+StoredResult = namedtuple("StoredResult", ["stackup", "name", "layer_count", "total_thickness", "layer", "layer_kind", "W", "Gap", "S",
+                                           "T", "H", "Er", "zdiff", "model", "target", "tolerance", "passed", "source", "created"])
+
+
+class ResultStore:
+    """Senkronize edilen stackup'ları ve hesaplanan sonuçları yerel SQLite veritabanında tutar.
+
+    Stackup'lar içerik özetiyle (content_hash) tekilleştirilir. Sonuçlar (stackup, katman, W, Gap, S, model) başına
+    tek satırdır; yeniden hesaplama eski satırın yerine geçer. record() yazmaları bellekte biriktirir ve flush()
+    hepsini tek işlemde (transaction) yazar; record_sweep() her tarama parçasını tek işlemde yazar.
+    Sonuç sayısı max_results'ı aşarsa record_sweep() sonunda ve close()'da en eski sonuçlar silinir (None: sınırsız);
+    SQLite boşalan sayfaları sonraki yazmalarda yeniden kullanır.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS stackups (
+            id INTEGER PRIMARY KEY,
+            hash TEXT NOT NULL UNIQUE,
+            name TEXT,
+            layer_count INTEGER NOT NULL,
+            total_thickness REAL NOT NULL,
+            rows TEXT NOT NULL,
+            created REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS stackups_layer_count ON stackups (layer_count);
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY,
+            stackup_id INTEGER NOT NULL REFERENCES stackups (id),
+            layer TEXT NOT NULL,
+            layer_kind TEXT NOT NULL,
+            W REAL NOT NULL,
+            gap REAL NOT NULL,
+            S REAL NOT NULL,
+            T REAL,
+            H REAL,
+            Er REAL,
+            zdiff REAL NOT NULL,
+            model TEXT NOT NULL,
+            target REAL,
+            tolerance REAL,
+            passed INTEGER,
+            source TEXT NOT NULL,
+            created REAL NOT NULL,
+            UNIQUE (stackup_id, layer, W, gap, S, model)
+        );
+        CREATE INDEX IF NOT EXISTS results_target ON results (target);
+        CREATE INDEX IF NOT EXISTS results_zdiff ON results (zdiff);
+    """
+
+    INSERT_RESULT = """INSERT OR REPLACE INTO results (stackup_id, layer, layer_kind, W, gap, S, T, H, Er, zdiff, model, target,
+                       tolerance, passed, source, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+    def __init__(self, path, max_results=None):
+        import sqlite3
+        self.path = path
+        self.max_results = max_results
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Arka plan işleri (sweep, denetim) ile GUI aynı bağlantıyı kilitle paylaşır
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._pending_stackups = {}
+        self._pending_results = []
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _stackup_row(stackup, name):
+        copper = [row[0] for row in stackup.rows if row[4] == "Copper"]
+        return (stackup.content_hash(), name, len(copper), round(stackup.total_thickness(), 6),
+                json.dumps(stackup.rows, ensure_ascii=False, separators=(',', ':')), time.time())
+
+    @staticmethod
+    def layer_kind(stackup, layer_name):
+        """İlk ve son bakır katman 'outer', diğerleri 'inner'."""
+        copper = [row[0] for row in stackup.rows if row[4] == "Copper"]
+        return "outer" if copper and layer_name in (copper[0], copper[-1]) else "inner"
+
+    @staticmethod
+    def _passed(zdiff, target, tolerance):
+        if target is None or tolerance is None:
+            return None
+        lower, upper = Solver.tolerance_limits(target, tolerance)
+        return int(lower <= zdiff <= upper)
+
+    def add_stackup(self, stackup, name=None):
+        """Stackup'ı yazma kuyruğuna ekler; aynı içerik zaten kayıtlıysa yalnızca (verilmişse) adı güncellenir."""
+        if not stackup.rows or self._connection is None:
+            return
+        with self._lock:
+            key = stackup.content_hash()
+            if name is None and key in self._pending_stackups:
+                return
+            self._pending_stackups[key] = self._stackup_row(stackup, name)
+
+    def record(self, stackup, W, Gap, S, results, target=None, tolerance=None, source="gui"):
+        """ImpedanceResult'ları yazma kuyruğuna ekler; flush() çağrılana kadar veritabanına yazılmaz. close()'dan sonra yok sayılır."""
+        W, Gap, S = (ImpedanceCache.normalize(value) for value in (W, Gap, S))
+        created = time.time()
+        with self._lock:
+            if self._connection is None:
+                return
+            self.add_stackup(stackup)
+            key = stackup.content_hash()
+            for result in results:
+                self._pending_results.append((key, result.layer, self.layer_kind(stackup, result.layer), W, Gap, S, result.T, result.H,
+                                              result.Er, result.zdiff, result.model, target, tolerance,
+                                              self._passed(result.zdiff, target, tolerance), source, created))
+
+    def flush(self):
+        """Kuyruktaki stackup ve sonuçları tek işlemde yazar; yazılan sonuç sayısını döndürür."""
+        with self._lock:
+            stackups, results = self._pending_stackups, self._pending_results
+            self._pending_stackups, self._pending_results = {}, []
+            if (not stackups and not results) or self._connection is None:
+                return 0
+            with self._connection:
+                self._upsert_stackups(stackups.values())
+                ids = self._stackup_ids({row[0] for row in results})
+                self._connection.executemany(self.INSERT_RESULT, ((ids[row[0]],) + row[1:] for row in results))
+            return len(results)
+
+    def _upsert_stackups(self, rows):
+        self._connection.executemany(
+            "INSERT INTO stackups (hash, name, layer_count, total_thickness, rows, created) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (hash) DO UPDATE SET name = COALESCE(excluded.name, name)", rows)
+
+    def _stackup_ids(self, hashes):
+        ids = {}
+        for key in hashes:
+            ids[key] = self._connection.execute("SELECT id FROM stackups WHERE hash = ?", (key,)).fetchone()[0]
+        return ids
+
+    def record_sweep(self, stackup, chunks, target=None, tolerance=None, source="sweep"):
+        """SweepChunk'ları değiştirmeden geçirir; her parçayı tek işlemde veritabanına yazar (write_sweep_csv ile zincirlenir).
+
+        Tarama sürerken close() çağrılırsa kalan parçalar yazılmadan geçirilir.
+        """
+        with self._lock:
+            if self._connection is None:
+                yield from chunks
+                return
+            self.add_stackup(stackup)
+            self.flush()
+            stackup_id = self._stackup_ids([stackup.content_hash()])[stackup.content_hash()]
+        lower, upper = Solver.tolerance_limits(target, tolerance) if target is not None and tolerance is not None else (None, None)
+        for chunk in chunks:
+            kind = self.layer_kind(stackup, chunk.layer)
+            created = time.time()
+            rows = ((stackup_id, chunk.layer, kind, W, Gap, S, chunk.T, chunk.H, chunk.Er, Z, "formula", target, tolerance,
+                     None if lower is None else int(lower <= Z <= upper), source, created)
+                    for W, Gap, S, Z in zip(*(_as_list(values) for values in (chunk.W, chunk.Gap, chunk.S, chunk.zdiff))))
+            with self._lock:
+                if self._connection is not None:
+                    with self._connection:
+                        self._connection.executemany(self.INSERT_RESULT, rows)
+            yield chunk
+        self.prune()
+
+    def prune(self):
+        """max_results'tan fazla sonuç varsa en eskilerini (en küçük id) siler; silinen sayıyı döndürür."""
+        with self._lock:
+            if self.max_results is None or self._connection is None:
+                return 0
+            row = self._connection.execute("SELECT id FROM results ORDER BY id DESC LIMIT 1 OFFSET ?", (self.max_results,)).fetchone()
+            if row is None:
+                return 0
+            with self._connection:
+                return self._connection.execute("DELETE FROM results WHERE id <= ?", row).rowcount
+
+    def query(self, zdiff_min=None, zdiff_max=None, layer_kind=None, min_W=None, max_W=None, layer_count=None,
+              target=None, passed=None, model=None, limit=None):
+        """Kayıtlı sonuçları filtreler (yeniden hesaplama yapmaz); Zdiff'e göre sıralı StoredResult listesi döndürür."""
+        conditions, parameters = [], []
+        for clause, value in (("r.zdiff >= ?", zdiff_min), ("r.zdiff <= ?", zdiff_max), ("r.layer_kind = ?", layer_kind),
+                              ("r.W >= ?", min_W), ("r.W <= ?", max_W), ("s.layer_count = ?", layer_count),
+                              ("r.target = ?", target), ("r.model = ?", model),
+                              ("r.passed = ?", None if passed is None else int(passed))):
+            if value is not None:
+                conditions.append(clause)
+                parameters.append(value)
+        sql = ("SELECT s.hash, s.name, s.layer_count, s.total_thickness, r.layer, r.layer_kind, r.W, r.gap, r.S, r.T, r.H, r.Er, "
+               "r.zdiff, r.model, r.target, r.tolerance, r.passed, r.source, r.created "
+               "FROM results r JOIN stackups s ON s.id = r.stackup_id")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY r.zdiff"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(int(limit))
+        self.flush()
+        with self._lock:
+            rows = self._connection.execute(sql, parameters).fetchall()
+        return [StoredResult(*row[:16], None if row[16] is None else bool(row[16]), *row[17:]) for row in rows]
+
+    def load_stackup(self, stackup_hash):
+        """content_hash ile kayıtlı stackup'ı döndürür."""
+        self.flush()
+        with self._lock:
+            row = self._connection.execute("SELECT rows FROM stackups WHERE hash = ?", (stackup_hash,)).fetchone()
+        if row is None:
+            raise ValueError(f"Stackup '{stackup_hash}' is not in the result store '{self.path}'.")
+        return Stackup(json.loads(row[0]))
+
+    def stats(self):
+        self.flush()
+        with self._lock:
+            stackups = self._connection.execute("SELECT COUNT(*) FROM stackups").fetchone()[0]
+            results = self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {"stackups": stackups, "results": results}
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self.flush()
+                self.prune()
+                self._connection.close()
+                self._connection = None
+
+
+# --- KiCad (.kicad_pcb) Okuma ---
+
+_SEXPR_TOKEN = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+
+def _parse_sexpr(buffer, start):
+    """buffer[start] konumundaki '(' ile başlayan ifadeyi iç içe listelere çevirir; (liste, bitiş konumu) döndürür.
+
+    Sadece bu ifadenin kapanış parantezine kadar okunur; dosyanın geri kalanı taranmaz.
+    """
+    stack = []
+    for match in _SEXPR_TOKEN.finditer(buffer, start):
+        token = match.group()
+        if token == b'(':
+            stack.append([])
+        elif token == b')':
+            node = stack.pop()
+            if not stack:
+                return node, match.end()
+            stack[-1].append(node)
+        elif token.startswith(b'"'):
+            stack[-1].append(token[1:-1].decode('utf-8').replace('\\"', '"'))
+        else:
+            stack[-1].append(token.decode('utf-8'))
+    raise ValueError("Unexpected end of file while reading a KiCad s-expression.")
+
+def _sexpr_value(node, key, default=None):
+    """(key değer ...) alt ifadesinin ilk değerini döndürür."""
+    for child in node:
+        if isinstance(child, list) and child and child[0] == key and len(child) > 1:
+            return child[1]
+    return default
+
+def _read_kicad_setup(filepath):
+    """Kartın (layers ...) ve (setup (stackup ...)) bölümlerini bellek eşlemeli (mmap) okur.
+
+    Bu bölümler dosyanın başındadır; setup bloğu okunduğunda durulur, 100+ MB'lık kartın geri kalanına dokunulmaz.
+    (stackup satırları, KiCad bakır katman adları) döndürür.
+    """
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        setup_start = buffer.find(b'(setup')
+        if setup_start == -1:
+            raise ValueError(f"No (setup ...) section found in {filepath}.")
+        layers_start = buffer.find(b'(layers', 0, setup_start)
+        layer_types = {}
+        if layers_start != -1:
+            layers, _ = _parse_sexpr(buffer, layers_start)
+            for entry in layers[1:]:
+                if isinstance(entry, list) and len(entry) >= 3:
+                    layer_types[entry[1]] = entry[2]
+        setup, _ = _parse_sexpr(buffer, setup_start)
+
+    stackup_node = next((child for child in setup if isinstance(child, list) and child and child[0] == "stackup"), None)
+    if stackup_node is None:
+        raise ValueError(f"The board has no physical stackup defined (Board Setup > Physical Stackup): {filepath}")
+
+    layer_nodes = [child for child in stackup_node if isinstance(child, list) and child and child[0] == "layer"]
+    copper_names = [node[1] for node in layer_nodes if _sexpr_value(node, "type") == "copper"]
+    num_copper_layers = len(copper_names)
+
+    rows = []
+    copper_count = 0
+    for node in layer_nodes:
+        layer_type = (_sexpr_value(node, "type") or "").lower()
+
+        # Alt katmanlar (addsublayer) tek dielektrik olarak birleştirilir: kalınlıklar toplanır, Er kalınlıkla ağırlıklandırılır
+        sublayers = [[]]
+        for child in node[2:]:
+            if child == "addsublayer":
+                sublayers.append([])
+            elif isinstance(child, list):
+                sublayers[-1].append(child)
+        thickness = sum(float(_sexpr_value(part, "thickness", 0.0)) for part in sublayers)
+        weighted = sum(float(_sexpr_value(part, "thickness", 0.0)) * float(_sexpr_value(part, "epsilon_r", 1.0)) for part in sublayers)
+        epsilon_r = weighted / thickness if thickness > 0 else float(_sexpr_value(node, "epsilon_r", 1.0))
+
+        if layer_type == "copper":
+            copper_count += 1
+            if copper_count == 1:
+                name = "1. Top Layer"
+            elif copper_count == num_copper_layers:
+                name = f"{num_copper_layers}. Bottom Layer"
+            else:
+                name = f"{copper_count}. Inner Layer {copper_count-1}"
+            layer_class = "Plane" if layer_types.get(node[1]) == "power" else "Signal"
+            rows.append([name, layer_class, f"{thickness:g}", "", "Copper"])
+        elif layer_type in ("core", "prepreg"):
+            layer_class = "Core" if layer_type == "core" else "Prepreg"
+            rows.append([f"Dielectric {copper_count+1}", layer_class, f"{thickness:g}", f"{epsilon_r:g}", layer_class])
+        elif "solder mask" in layer_type:
+            if not _sexpr_value(node, "epsilon_r"):
+                epsilon_r = float(SOLDER_MASK_TOP[3])
+            name = SOLDER_MASK_TOP[0] if layer_type.startswith("top") else SOLDER_MASK_BOTTOM[0]
+            rows.append([name, "Solder Mask", f"{thickness:g}", f"{epsilon_r:g}", "Solder Mask"])
+        # Silkscreen ve solder paste katmanları empedansı etkilemez, atlanır
+
+    if num_copper_layers == 0:
+        raise ValueError(f"The stackup in {filepath} has no copper layers.")
+    return rows, copper_names
+
+def read_kicad_stackup(filepath):
+    """.kicad_pcb dosyasındaki fiziksel stackup'ı Stackup nesnesine çevirir (katman tipleri, kalınlıklar, epsilon_r)."""
+    rows, _ = _read_kicad_setup(filepath)
+    return Stackup(rows)
+
+
+# --- KiCad Kartı Diferansiyel Çift Denetimi ---
+
+_BOARD_ITEM = re.compile(
+    rb'\(net\s+(\d+)\s+"((?:[^"\\]|\\.)*)"\)'
+    rb'|\(segment\s+(?:locked\s+|\(locked\s+\w+\)\s*)?'
+    rb'\(start\s+([-\d.eE]+)\s+([-\d.eE]+)\)\s*\(end\s+([-\d.eE]+)\s+([-\d.eE]+)\)\s*'
+    rb'\(width\s+([\d.eE]+)\)\s*\(layer\s+"?([^"\s)]+)"?\)\s*\(net\s+(\d+|"(?:[^"\\]|\\.)*")\)'
+)
+# Çift son ekleri: USB_D_P/_N, USB_D+/-, USB_DP/DN; H/L yalnızca CAN için (CANH, CAN_H, CAN1_L)
+_PAIR_SUFFIX = re.compile(r'^(.+?)(?:[_.]([PNHL])|([+\-])|(?<=[_/.])D([PN])|(?<=CAN)([HL]))$', re.IGNORECASE)
+# V+/V-, VCC+ gibi besleme netleri '+'/'-' ekine rağmen çift sayılmaz
+_SUPPLY_NET = re.compile(r'^(?:[AD]?V[A-Z]{0,4}\d*|GND\w*)$', re.IGNORECASE)
+PAIR_MAX_GAP = 1.0  # mm; bundan uzaktaki N segmenti P ile eşleşmiş sayılmaz
+
+PairAuditResult = namedtuple("PairAuditResult", ["pair", "interface", "layer", "W", "Gap", "coupled_length", "zdiff", "target", "lower", "upper", "passed", "error"])
+
+def standard_target(text):
+    """'100 (or 85 for Gen2+)' veya '10-15' gibi tablo metinlerinden ilk sayıyı alır."""
+    match = re.search(r'\d+(?:[.,]\d+)?', text)
+    return float(match.group().replace(',', '.')) if match else None
+
+def _name_tokens(text):
+    return re.findall(r'[A-Z0-9]+', text.upper())
+
+def _token_matches(token, keyword):
+    """Kelime tam eşleşmeli; sondaki numara hariç tutulur (CAN1 ~ CAN, ETH0 ~ ETH, ama R485 ≠ 485, SCAN ≠ CAN)."""
+    return token == keyword or token.rstrip('0123456789') == keyword
+
+def match_standard(net_name):
+    """Net adını Standart Empedanslar tablosundaki bir arayüzle eşleştirir (en uzun anahtar kelime kazanır).
+
+    Ad ve anahtar kelimeler '_', '/', '-' vb. ayraçlarda kelimelere bölünür; alt dize eşleşmesi yapılmaz.
+    """
+    tokens = _name_tokens(net_name)
+    best, best_length = None, 0
+    for standard in STANDARD_IMPEDANCES:
+        for keyword in standard[4]:
+            parts = _name_tokens(keyword)
+            if len(keyword) <= best_length:
+                continue
+            for start in range(len(tokens) - len(parts) + 1):
+                if all(_token_matches(token, part) for token, part in zip(tokens[start:], parts)):
+                    best, best_length = standard, len(keyword)
+                    break
+    return best
+
+def _pair_base(net_name):
+    """'USB_D_P' -> ('USB_D', 'P'); '+'/'-' ve H/L, 'P'/'N' olarak normalize edilir. Çift adı değilse None."""
+    match = _PAIR_SUFFIX.match(net_name)
+    if not match:
+        return None
+    base = match.group(1)
+    suffix = next(group for group in match.groups()[1:] if group is not None).upper()
+    tokens = _name_tokens(base)
+    if suffix in "HL" and not (tokens and _token_matches(tokens[-1], "CAN")):
+        return None
+    if suffix in "+-" and _SUPPLY_NET.match(base.lstrip('/')):
+        return None
+    polarity = 'P' if suffix in "P+H" else 'N'
+    return base.rstrip('_'), polarity
+
+def _dominant(weights):
+    return max(weights.items(), key=lambda item: item[1])[0] if weights else None
+
+def _segment_cells(x1, y1, x2, y2, cell):
+    """Segment boyunca cell/2 aralıkla (uçlar dahil) alınan noktaların ızgara hücreleri."""
+    steps = int(math.hypot(x2 - x1, y2 - y1) / (0.5 * cell)) + 1
+    return {(math.floor((x1 + (x2 - x1) * i / steps) / cell), math.floor((y1 + (y2 - y1) * i / steps) / cell)) for i in range(steps + 1)}
+
+def _pair_geometry(p_segments, n_segments):
+    """Aynı katmandaki P ve N segmentlerinden (W, Gap, eşleşmiş uzunluk) hesaplar.
+
+    W: uzunlukla ağırlıklı en yaygın genişlik. Gap: her P segmentine paralel, izdüşümü örtüşen ve en fazla
+    PAIR_MAX_GAP uzaktaki en yakın N segmenti ile kenar-kenar mesafesi; örtüşme uzunluğuyla ağırlıklı en yaygın değer.
+    N segmentleri ızgaralara yerleştirilir; her P segmenti önce W yarıçaplı küçük hücrelerde arar, bulamazsa
+    yarıçap PAIR_MAX_GAP'e kadar ikiye katlanır. Böylece ince bölünmüş uzun çiftlerde aday sayısı sabit kalır.
+    """
+    widths = {}
+    for x1, y1, x2, y2, width in p_segments + n_segments:
+        widths[width] = widths.get(width, 0.0) + math.hypot(x2 - x1, y2 - y1)
+    max_width = max(widths)
+    n_items = [(x1, y1, x2, y2, width, math.hypot(x2 - x1, y2 - y1)) for x1, y1, x2, y2, width in n_segments]
+
+    radii = []
+    radius = max_width
+    while radius < PAIR_MAX_GAP:
+        radii.append(radius)
+        radius *= 2.0
+    radii.append(PAIR_MAX_GAP)
+    grids = {}
+
+    def grid_for(radius):
+        # Hücre, eksen mesafesi radius + W olan her komşuyu 3x3 komşulukta bulacak kadar geniş
+        if radius not in grids:
+            cell = 2.0 * (radius + max_width)
+            grid = {}
+            for index, (x1, y1, x2, y2, _, _) in enumerate(n_items):
+                for key in _segment_cells(x1, y1, x2, y2, cell):
+                    grid.setdefault(key, []).append(index)
+            grids[radius] = cell, grid
+        return grids[radius]
+
+    gaps = {}
+    for ax1, ay1, ax2, ay2, a_width in p_segments:
+        length = math.hypot(ax2 - ax1, ay2 - ay1)
+        if length == 0:
+            continue
+        ux, uy = (ax2 - ax1) / length, (ay2 - ay1) / length
+        best = None
+        for radius in radii:
+            cell, grid = grid_for(radius)
+            candidates = set()
+            for cx, cy in _segment_cells(ax1, ay1, ax2, ay2, cell):
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        candidates.update(grid.get((cx + dx, cy + dy), ()))
+            for index in sorted(candidates):
+                bx1, by1, bx2, by2, b_width, b_length = n_items[index]
+                t1 = (bx1 - ax1) * ux + (by1 - ay1) * uy
+                t2 = (bx2 - ax1) * ux + (by2 - ay1) * uy
+                if (t1 <= 0 and t2 <= 0) or (t1 >= length and t2 >= length):
+                    continue  # izdüşümler örtüşmüyor
+                if b_length == 0 or abs(ux * (by2 - by1) - uy * (bx2 - bx1)) / b_length > 0.02:
+                    continue  # paralel değil
+                overlap = min(length, max(t1, t2)) - max(0.0, min(t1, t2))
+                gap = abs((bx1 - ax1) * uy - (by1 - ay1) * ux) - 0.5 * (a_width + b_width)
+                if 0 < gap <= radius and (best is None or gap < best[0]):
+                    best = (gap, overlap)
+            if best is not None:
+                # radius içindeki tüm N segmentleri aday kümesindeydi, bulunan en yakın olandır
+                key = round(best[0], 4)
+                gaps[key] = gaps.get(key, 0.0) + best[1]
+                break
+
+    if not gaps:
+        return None
+    gap = _dominant(gaps)
+    return _dominant(widths), gap, gaps[gap]
+
+def scan_kicad_pairs(filepath, progress=None):
+    """Karttaki tüm track segmentlerini akış halinde tarar; diferansiyel çift netlerinin segmentlerini katman bazında toplar.
+
+    {(çift adı, katman): (P segmentleri, N segmentleri)} ve taranan segment sayısını döndürür.
+    Sadece çift adına uyan netlerin segmentleri bellekte tutulur; sonda iki yarısı (P ve N neti) birlikte
+    bulunmayan adlar atılır. progress verilirse dosyada ilerledikçe (0-1) çağrılır.
+    """
+    net_names = {}
+    pair_nets = {}
+    polarities = {}
+    segments = {}
+    segment_count = 0
+
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        for match in _BOARD_ITEM.finditer(buffer):
+            if match.group(1) is not None:
+                name = match.group(2).decode('utf-8')
+                net_names[match.group(1).decode()] = name
+                pair_nets[name] = pair = _pair_base(name)
+                if pair is not None:
+                    polarities.setdefault(pair[0], set()).add(pair[1])
+                continue
+
+            segment_count += 1
+            if progress and segment_count % 65536 == 0:
+                progress(match.end() / len(buffer))
+            net = match.group(9).decode('utf-8')
+            name = net.strip('"') if net.startswith('"') else net_names.get(net)
+            if name not in pair_nets:
+                # KiCad 8+ segmentte net adını doğrudan yazar; tablo önceden dolmamış olabilir
+                pair_nets[name] = _pair_base(name) if name else None
+            pair = pair_nets[name]
+            if pair is None:
+                continue
+            polarities.setdefault(pair[0], set()).add(pair[1])
+
+            x1, y1, x2, y2, width = (float(value) for value in match.group(3, 4, 5, 6, 7))
+            layer = match.group(8).decode('utf-8')
+            p_list, n_list = segments.setdefault((pair[0], layer), ([], []))
+            (p_list if pair[1] == 'P' else n_list).append((x1, y1, x2, y2, width))
+
+    segments = {key: value for key, value in segments.items() if len(polarities[key[0]]) == 2}
+    return segments, segment_count
+
+def audit_kicad_board(filepath, S, default_target, default_tolerance, stackup=None, cache=None, progress=None, store=None):
+    """Karttaki tüm diferansiyel çiftleri denetler; her benzersiz (katman, W, Gap) bir kez hesaplanır.
+
+    cache verilirse (ImpedanceCache) katman parametreleri ve Zdiff oturumlar arasında da yeniden kullanılır.
+    store verilirse (ResultStore) kartın stackup'ı ve hesaplanan geometriler sonda tek işlemde kaydedilir.
+    Hedef, net adının eşleştiği standarttan alınır; eşleşme yoksa default_target/default_tolerance kullanılır.
+    (sonuç listesi, istatistik sözlüğü) döndürür.
+    """
+    rows, copper_names = _read_kicad_setup(filepath)
+    if stackup is None:
+        stackup = Stackup(rows)
+    solver = Solver(stackup, cache)
+    copper_rows = [item[0] for item in stackup.rows if item[4] == "Copper"]
+    layer_map = dict(zip(copper_names, copper_rows))
+
+    segments, segment_count = scan_kicad_pairs(filepath, progress)
+    geometries = {}
+    hits = 0
+    results = []
+
+    for (base, kicad_layer), (p_segments, n_segments) in sorted(segments.items()):
+        if not p_segments or not n_segments:
+            continue
+        geometry = _pair_geometry(p_segments, n_segments)
+        if geometry is None:
+            continue
+        W, Gap, coupled_length = geometry
+
+        standard = match_standard(base)
+        if standard is not None:
+            interface, target, tolerance = standard[0], standard_target(standard[1]), standard_target(standard[2])
+        else:
+            interface, target, tolerance = "", default_target, default_tolerance
+        lower, upper = Solver.tolerance_limits(target, tolerance)
+
+        layer_name = layer_map.get(kicad_layer, kicad_layer)
+        key = (layer_name, W, Gap)
+        if key in geometries:
+            hits += 1
+        else:
+            try:
+                result = solver.solve(layer_name, W, Gap, S)
+                geometries[key] = (result.zdiff, "")
+                if store is not None:
+                    store.record(stackup, W, Gap, S, [result], target, tolerance, source="audit")
+            except Exception as e:
+                geometries[key] = (None, str(e))
+        zdiff, error = geometries[key]
+
+        passed = zdiff is not None and lower <= zdiff <= upper
+        results.append(PairAuditResult(base.rstrip('_'), interface, layer_name, W, Gap, coupled_length, zdiff, target, lower, upper, passed, error))
+
+    if store is not None:
+        store.add_stackup(stackup, os.path.basename(filepath))
+        store.flush()
+    stats = {"segments": segment_count, "pairs": len(results), "unique_geometries": len(geometries), "cache_hits": hits,
+             "failing": sum(1 for result in results if not result.passed)}
+    return results, stats
+
+def write_audit_csv(filepath, results):
+    import csv
+    headers = ["Pair", MESSAGES["STD_INTERFACE"], MESSAGES["COL_NAME"], "W (mm)", "Gap (mm)", "Coupled Length (mm)", "Zdiff (Ohm)", "Target (Ohm)", "Lower", "Upper", MESSAGES["LABEL_STATUS"].split(':')[0]]
+    with open(filepath, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(headers)
+        for result in results:
+            status = MESSAGES["STATUS_OK"] if result.passed else (result.error or MESSAGES["STATUS_FAIL"])
+            numbers = [f"{value:.4f}" if value is not None else "" for value in (result.W, result.Gap, result.coupled_length, result.zdiff, result.target, result.lower, result.upper)]
+            writer.writerow([result.pair, result.interface, result.layer] + [value.replace('.', ',') for value in numbers] + [status])
+
+
+# --- Toplu (Batch) Komut Satırı Değerlendirmesi ---
+
+BATCH_FIELDS = ["file", "layer", "zdiff", "H", "Er", "reference_plane", "lower", "upper", "passed", "error"]
+
+def collect_stackup_files(patterns):
+    """Dizin (içindeki *.csv) veya glob desenlerinden sıralı, tekrarsız dosya listesi oluşturur."""
+    import glob
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "*.csv"))
+        else:
+            matches = glob.glob(pattern)
+        files.extend(sorted(matches))
+    return list(dict.fromkeys(files))
+
+def evaluate_stackup_file(filepath, W, Gap, S, target_zdiff, tolerance_percent, model="formula", cache=None):
+    """Bir stackup CSV'sinin tüm sinyal katmanlarını değerlendirir; rapor satırlarını (dict) döndürür.
+
+    Süreç havuzunda çalıştığı için hata fırlatmaz; dosya veya katman hatası satırın 'error' alanına yazılır.
+    """
+    lower, upper = Solver.tolerance_limits(target_zdiff, tolerance_percent)
+    try:
+        solver = Solver(Stackup.from_csv(filepath), cache)
+        layers = solver.stackup.signal_layers()
+    except Exception as e:
+        return [dict(zip(BATCH_FIELDS, [filepath, "", None, None, None, "", lower, upper, False, str(e)]))]
+
+    report = []
+    for layer_name in layers:
+        try:
+            result = solver.solve(layer_name, W, Gap, S, model)
+            values = [result.zdiff, result.H, result.Er, result.reference_plane, lower, upper, lower <= result.zdiff <= upper, ""]
+        except Exception as e:
+            values = [None, None, None, "", lower, upper, False, str(e)]
+        report.append(dict(zip(BATCH_FIELDS, [filepath, layer_name] + values)))
+    return report
+
+_worker_cache = None
+
+def _evaluate_stackup_file_task(task):
+    # Her işçi süreci kendi bellek içi önbelleğini tutar; aynı dielektrik kombinasyonları dosyalar arasında tekrarlanır
+    global _worker_cache
+    if _worker_cache is None:
+        _worker_cache = ImpedanceCache()
+    return evaluate_stackup_file(*task, cache=_worker_cache)
+
+def run_batch(files, W, Gap, S, target_zdiff, tolerance_percent, jobs=None, model="formula"):
+    """Dosyaları süreç havuzuna dağıtır; jobs=1 ise aynı süreçte çalışır. Dosya sırasını koruyarak satırları döndürür."""
+    from concurrent.futures import ProcessPoolExecutor
+    tasks = [(filepath, W, Gap, S, target_zdiff, tolerance_percent, model) for filepath in files]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) < 2:
+        return [row for task in tasks for row in _evaluate_stackup_file_task(task)]
+
+    # Dosya başına iş küçük olduğundan görevler parçalar halinde gönderilir (IPC yükü azalır)
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return [row for report in executor.map(_evaluate_stackup_file_task, tasks, chunksize=chunksize) for row in report]
+
+def store_batch_report(store, report, W, Gap, S, target_zdiff, tolerance_percent, model="formula"):
+    """Batch raporunu ResultStore'a tek işlemde yazar; stackup'lar dosyalardan yeniden okunur. Yazılan sonuç sayısını döndürür."""
+    for filepath, rows in itertools.groupby(report, key=lambda row: row["file"]):
+        rows = [row for row in rows if row["zdiff"] is not None]
+        if not rows:
+            continue
+        solver = Solver(Stackup.from_csv(filepath))
+        store.add_stackup(solver.stackup, os.path.splitext(os.path.basename(filepath))[0])
+        results = [ImpedanceResult(row["layer"], row["zdiff"], solver.layer_parameters(row["layer"])[1], row["H"], row["Er"],
+                                   row["reference_plane"], None, False, model) for row in rows]
+        store.record(solver.stackup, W, Gap, S, results, target_zdiff, tolerance_percent, source="batch")
+    return store.flush()
+
+def write_batch_report(filepath, report):
+    """Raporu uzantıya göre JSON veya CSV (';' ayraç, ondalık virgül) olarak yazar."""
+    import csv
+    if filepath.lower().endswith(".json"):
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return
+
+    with open(filepath, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(BATCH_FIELDS)
+        for row in report:
+            writer.writerow([f"{row[field]:.4f}".replace('.', ',') if isinstance(row[field], float) else row[field] for field in BATCH_FIELDS])
+
+
+# --- Performans Ölçümü (Benchmark) ---
+
+BENCH_LAYER_COUNTS = [2, 4, 6, 8, 10, 12, 14, 16, 24, 32]
+BENCH_IMPORT_SCRIPT = "import runpy, sys; runpy.run_path(sys.argv[1], run_name='startup_bench')"
+
+def benchmark_stackup(num_copper_layers, seed=0):
+    """Sabit tohumla dielektrik kalınlıkları ±%20 değiştirilmiş, tekrarlanabilir bir ölçüm stackup'ı."""
+    import random
+    rng = random.Random(seed * 1000 + num_copper_layers)
+    rows = Stackup.generate(num_copper_layers).rows
+    for row in rows:
+        if row[4] in DIELECTRIC_TYPES:
+            row[2] = f"{float(row[2]) * rng.uniform(0.8, 1.2):.4f}"
+    return Stackup(rows)
+
+def _time_call(function, number, repeat):
+    """Çağrı başına süreyi (µs) ölçer; en iyi ve medyan tekrar değerlerini döndürür."""
+    import timeit
+    timings = sorted(t / number * 1e6 for t in timeit.repeat(function, number=number, repeat=repeat))
+    return {"best_us": timings[0], "median_us": timings[len(timings) // 2], "number": number, "repeat": repeat}
+
+def run_benchmarks(seed=0, repeat=5, layer_counts=None, include_gui=True, progress=None):
+    """Formülleri, plane aramasını, CSV G/Ç'yi ve (ekran varsa) tablo çizimini ölçer; JSON'a yazılabilir sözlük döndürür."""
+    import platform
+    import random
+    import subprocess
+    import tempfile
+    layer_counts = BENCH_LAYER_COUNTS if layer_counts is None else layer_counts
+    results = {}
+
+    def record(name, function, number):
+        results[name] = _time_call(function, number, repeat)
+        if progress:
+            progress(name, results[name])
+
+    # Skaler formüller: sabit tohumlu 1000 giriş (dar: W/H < 1, geniş: W/H >= 1)
+    rng = random.Random(seed)
+    narrow_inputs = [(rng.uniform(0.05, 0.14), rng.uniform(0.05, 0.5), 0.035, 0.15, rng.uniform(3.0, 4.8)) for _ in range(1000)]
+    wide_inputs = [(rng.uniform(0.15, 0.5), rng.uniform(0.05, 0.5), 0.035, 0.15, rng.uniform(3.0, 4.8)) for _ in range(1000)]
+    record("scalar.narrow_traces[1000]", lambda: [calculate_narrow_traces(*args) for args in narrow_inputs], 20)
+    record("scalar.wide_traces[1000]", lambda: [calculate_wide_traces(*args) for args in wide_inputs], 20)
+
+    if _numpy() is not None:
+        generator = np.random.default_rng(seed)
+        size = 100000
+        W = generator.uniform(0.05, 0.5, size)
+        Gap = generator.uniform(0.05, 0.5, size)
+        Er = generator.uniform(3.0, 4.8, size)
+        record(f"batch.narrow_traces[{size}]", lambda: calculate_narrow_traces_batch(W, Gap, 0.035, 1.0, Er), 5)
+        record(f"batch.wide_traces[{size}]", lambda: calculate_wide_traces_batch(W, Gap, 0.035, 0.15, Er), 5)
+        record(f"batch.zdiff[{size}]", lambda: calculate_zdiff_batch(W, Gap, 0.12, 0.035, 0.15, Er), 5)
+
+        # Aynı hesap, paylaşımlı bellek üzerinden tüm çekirdeklerde (havuz ilk turda kurulur; medyan raporlanır)
+        with ParallelZdiffExecutor(min_parallel_points=0) as executor, executor.allocate(size) as shared:
+            shared.W[:], shared.Gap[:], shared.S[:], shared.T[:], shared.H[:], shared.Er[:] = W, Gap, 0.12, 0.035, 0.15, Er
+            record(f"parallel.zdiff[{size}]", lambda: executor.run(shared), 5)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for n in layer_counts:
+            stackup = benchmark_stackup(n, seed)
+            signals = [stackup.index_of(name) for name in stackup.signal_layers()]
+
+            def cold_search():
+                # Her turda indeks yeniden kurulur (stackup düzenlemesinden sonraki ilk hesap)
+                stackup._plane_index = None
+                for index in signals:
+                    stackup.find_nearest_plane_and_dielectric(index)
+
+            def warm_search():
+                for index in signals:
+                    stackup.find_nearest_plane_and_dielectric(index)
+
+            record(f"plane_search.cold[{n}L]", cold_search, 200)
+            record(f"plane_search.warm[{n}L]", warm_search, 200)
+
+            filepath = os.path.join(directory, f"stackup_{n}.csv")
+            record(f"csv.export[{n}L]", lambda: stackup.to_csv(filepath), 50)
+            record(f"csv.import[{n}L]", lambda: Stackup.from_csv(filepath), 50)
+
+    # Açılış: yeni süreçte yalın yorumlayıcı ve betiğin yüklenmesi (__main__ gibi derlenir, bytecode önbelleği yok)
+    record("startup.interpreter", lambda: subprocess.run([sys.executable, "-c", "pass"], check=True), 1)
+    record("startup.import", lambda: subprocess.run([sys.executable, "-c", BENCH_IMPORT_SCRIPT, os.path.abspath(__file__)], check=True), 1)
+
+    meta = {"seed": seed, "repeat": repeat, "python": sys.version.split()[0], "platform": platform.platform(),
+            "numpy": np.__version__ if _numpy() is not None else None, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "gui": None}
+    if include_gui:
+        meta["gui"] = _benchmark_redraw(record, layer_counts)
+    return {"meta": meta, "results": results}
+
+def _benchmark_redraw(record, layer_counts):
+    """redraw_stackup_table'ı gerçek bir Tk penceresinde ölçer. Ekran yoksa (ör. CI) 'xvfb-run' altında çalıştırılmalıdır."""
+    import subprocess
+    try:
+        _load_tk()
+        root = tk.Tk()
+    except ImportError as e:
+        return f"skipped: {e}"
+    except tk.TclError as e:
+        return f"skipped: {e}"
+    root.withdraw()
+    # İlk pencereye kadar geçen süre (yeni süreç; yorumlayıcı açılışı dahil)
+    record("startup.first_window", lambda: subprocess.run([sys.executable, os.path.abspath(__file__), "gui", "--exit-after-startup"], check=True), 1)
+    app = ImpedanceCalculatorApp(root)
+    try:
+        previous = None
+        for n in layer_counts:
+            def change_layer_count(n=n):
+                # Satır sayısı değişir: havuzdaki satırlar gizlenir/eklenir
+                app.generate_stackup_data(previous or 2)
+                app.generate_stackup_data(n)
+                root.update_idletasks()
+
+            def redraw_same():
+                app.redraw_stackup_table()
+                root.update_idletasks()
+
+            record(f"gui.redraw.layer_change[{n}L]", change_layer_count, 5)
+            app.generate_stackup_data(n)
+            record(f"gui.redraw.same[{n}L]", redraw_same, 20)
+            previous = n
+    finally:
+        app.on_close()
+    return "ok"
+
+def compare_benchmarks(old, new):
+    """İki ölçüm sonucunu (medyan) karşılaştıran satırlar döndürür: (ad, eski µs, yeni µs, oran)."""
+    rows = []
+    for name, result in new["results"].items():
+        if name in old.get("results", {}):
+            before = old["results"][name]["median_us"]
+            rows.append((name, before, result["median_us"], result["median_us"] / before if before else float("inf")))
+    return rows
+
+
+def describe_model(result):
+    """Sonuç için 'Model Selection' metnini oluşturur (GUI ile aynı biçim)."""
+    model_base = MESSAGES['LABEL_MODEL'].split(':')[0]
+    model_used = f"{model_base}: Reference Plane is {result.reference_plane}. Model: "
+    if result.model == "field":
+        model_used += f"2D Field Solver (finite differences, W/H={result.wh_ratio:.2f})"
+    elif result.wh_ratio >= 1.0:
+        model_used += f"Regime 1: WIDE Trace (W/H={result.wh_ratio:.2f}) - 'Best-Fit' Formula"
+    else:
+        model_used += f"Regime 2: NARROW Trace (W/H={result.wh_ratio:.2f}) - 'Academic' Formula"
+    return model_used
+
+
+def describe_cpwg(result):
+    if result.model == "field":
+        return MESSAGES["CPWG_FIELD"]
+    return MESSAGES["CPWG_APPLIED"] if result.cpwg_applied else MESSAGES["CPWG_IGNORED"]
+
+def describe_params(result):
+    """Sonuç için 'Used Parameters' metnini oluşturur (GUI ile aynı biçim)."""
+    return f"H={result.H:.3f} mm ({MESSAGES['MAP_H']}), T={result.T:.3f} mm, Er={result.Er:.2f} ({MESSAGES['MAP_ER']})"
+
+# --- Yerel JSON-RPC Servisi (asyncio) ---
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+# İlk istekten sonra aynı toplu hesaba katılacak istekler için bekleme süresi ve parti sınırı
+SERVICE_COALESCE_MS = 2.0
+SERVICE_MAX_BATCH = 4096
+# Boşta kalan stackup'lar bu süre sonunda (s) önbellekten düşer
+SERVICE_STACKUP_TTL = 600.0
+SERVICE_STACKUP_CACHE_SIZE = 256
+# Tek satırlık JSON mesajının üst sınırı (toplu istekler için yüksek tutulur)
+SERVICE_LINE_LIMIT = 16 * 1024 * 1024
+
+# JSON-RPC 2.0 hata kodları; -32001 servise özeldir
+RPC_PARSE_ERROR = -32700
+RPC_INVALID_REQUEST = -32600
+RPC_METHOD_NOT_FOUND = -32601
+RPC_INVALID_PARAMS = -32602
+RPC_SERVER_ERROR = -32000
+RPC_UNKNOWN_STACKUP = -32001
+
+_ServiceItem = namedtuple("_ServiceItem", ["layer", "T", "H", "Er", "reference_plane", "W", "Gap", "S"])
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class StackupCache:
+    """Servisin stackup önbelleği: içerik özeti (stackup_id) başına bir Solver, LRU ve boşta kalma süresiyle (keep-alive) sınırlı.
+
+    Tüm Solver'lar tek bir ImpedanceCache paylaşır; katman parametreleri (T, H, Er, plane) stackup başına bir kez bulunur.
+    Dosyadan yüklenen stackup'lar (yol, değişiklik zamanı, boyut) ile eşlenir; dosya değişmedikçe yeniden okunmaz.
+    Dosyayı okuma (read_file) servis tarafından olay döngüsü dışında çalıştırılır; diğer metotlar döngüde çağrılır.
+    """
+
+    def __init__(self, maxsize=SERVICE_STACKUP_CACHE_SIZE, ttl=SERVICE_STACKUP_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.files = OrderedDict()
+        self.impedance_cache = ImpedanceCache()
+        self.hits = 0
+        self.misses = 0
+
+    def _expire(self, now):
+        # En eski kullanım başta durur; süresi dolanlar baştan atılır
+        while self.entries:
+            key, (_, last_used) = next(iter(self.entries.items()))
+            if now - last_used <= self.ttl and len(self.entries) <= self.maxsize:
+                break
+            del self.entries[key]
+
+    def get(self, key):
+        now = time.monotonic()
+        self._expire(now)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries[key] = (entry[0], now)
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, stackup):
+        """(stackup_id, Solver) döndürür; aynı içerik daha önce gönderildiyse mevcut Solver kullanılır."""
+        key = stackup.content_hash()
+        solver = self.get(key)
+        if solver is None:
+            self.misses += 1
+            solver = Solver(stackup, self.impedance_cache)
+            self.entries[key] = (solver, time.monotonic())
+            self._expire(time.monotonic())
+        return key, solver
+
+    @staticmethod
+    def file_key(filepath):
+        try:
+            info = os.stat(filepath)
+        except OSError as e:
+            raise ValueError(f"Cannot read '{filepath}': {e.strerror}.")
+        return (os.path.abspath(filepath), info.st_mtime_ns, info.st_size)
+
+    @staticmethod
+    def read_file(filepath):
+        return read_kicad_stackup(filepath) if filepath.lower().endswith(".kicad_pcb") else Stackup.from_csv(filepath)
+
+    def get_file(self, file_key):
+        """Dosya değişmediyse önbellekteki (stackup_id, Solver), yoksa None."""
+        key = self.files.get(file_key)
+        solver = self.get(key) if key is not None else None
+        return (key, solver) if solver is not None else None
+
+    def put_file(self, file_key, stackup):
+        key, solver = self.put(stackup)
+        self.files[file_key] = key
+        while len(self.files) > self.maxsize:
+            self.files.popitem(last=False)
+        return key, solver
+
+    def load(self, filepath):
+        """Stackup CSV'si veya .kicad_pcb dosyasından (stackup_id, Solver) döndürür (senkron)."""
+        file_key = self.file_key(filepath)
+        return self.get_file(file_key) or self.put_file(file_key, self.read_file(filepath))
+
+
+class ZdiffService:
+    """Zdiff sorgularını yanıtlayan JSON-RPC 2.0 servisi (satır başına bir JSON mesajı, Unix soketi veya localhost TCP).
+
+    Aynı anda gelen istekler (tüm bağlantılardan) coalesce_ms boyunca biriktirilir ve tek calculate_zdiff_batch
+    çağrısıyla hesaplanır; bir bağlantı yanıt beklemeden çok sayıda istek gönderebilir. Yanıtlar GUI'nin Sonuç
+    alanındaki alanları (model_info, cpwg_info, params_used) ve H, T, Er, rejim bilgisini içerir. Alan çözücüsü
+    (model="field") istekleri toplanmaz; tek iş parçacığında sırayla çalışır.
+
+    Servis kimlik doğrulaması yapmaz. "path" yalnızca allowed_dirs altındaki .csv ve .kicad_pcb dosyalarını kabul eder
+    (None: çalışma dizini); dosya olay döngüsü dışında okunur, aynı dosya için eşzamanlı istekler tek okumayı bekler.
+
+    Metotlar: zdiff, stackup.register, stats.
+    """
+
+    def __init__(self, coalesce_ms=SERVICE_COALESCE_MS, max_batch=SERVICE_MAX_BATCH, cache_size=SERVICE_STACKUP_CACHE_SIZE,
+                 ttl=SERVICE_STACKUP_TTL, allowed_dirs=None):
+        self.coalesce = coalesce_ms / 1000.0
+        self.max_batch = max_batch
+        self.stackups = StackupCache(cache_size, ttl)
+        self.allowed_dirs = [os.path.realpath(directory) for directory in (allowed_dirs or [os.getcwd()])]
+        self.loading = {}
+        self.methods = {"zdiff": self.zdiff, "stackup.register": self.register_stackup, "stats": self.stats}
+        self.pending = []
+        self.flush_handle = None
+        self.field_executor = None
+        self.requests = 0
+        self.batches = 0
+        self.points = 0
+        self.largest_batch = 0
+
+    # --- Metotlar ---
+
+    async def _solver(self, params):
+        """İstekteki stackup (satırlar), path veya stackup_id'den (stackup_id, Solver) döndürür."""
+        if "stackup" in params:
+            rows = params["stackup"]
+            if not isinstance(rows, list) or not all(isinstance(row, list) and len(row) == 5 for row in rows):
+                raise ValueError("'stackup' must be a list of [Name, Class, Thickness, Dk, Layer_Type] rows.")
+            return self.stackups.put(Stackup(rows))
+        if "path" in params:
+            return await self._load(str(params["path"]))
+        if "stackup_id" in params:
+            solver = self.stackups.get(params["stackup_id"])
+            if solver is None:
+                raise RpcError(RPC_UNKNOWN_STACKUP, "Unknown or expired stackup_id; send the stackup again.")
+            return params["stackup_id"], solver
+        raise ValueError("One of 'stackup', 'path' or 'stackup_id' is required.")
+
+    def _allowed_path(self, filepath):
+        path = os.path.realpath(filepath)
+        if not path.lower().endswith((".csv", ".kicad_pcb")):
+            raise ValueError("'path' must point to a .csv or .kicad_pcb file.")
+        if not any(os.path.commonpath([path, directory]) == directory for directory in self.allowed_dirs):
+            raise ValueError(f"'{filepath}' is outside the directories this service may read (--allow-dir).")
+        return path
+
+    async def _load(self, filepath):
+        import asyncio
+        path = self._allowed_path(filepath)
+        file_key = self.stackups.file_key(path)
+        cached = self.stackups.get_file(file_key)
+        if cached is not None:
+            return cached
+        # Büyük .kicad_pcb dosyaları diğer bağlantıları bekletmesin; aynı dosyayı isteyenler tek okumayı paylaşır
+        loading = self.loading.get(file_key)
+        if loading is None:
+            loading = asyncio.get_running_loop().run_in_executor(None, StackupCache.read_file, path)
+            self.loading[file_key] = loading
+            try:
+                stackup = await loading
+            finally:
+                del self.loading[file_key]
+            return self.stackups.put_file(file_key, stackup)
+        await loading
+        return self.stackups.get_file(file_key) or self.stackups.put_file(file_key, loading.result())
+
+    async def register_stackup(self, params):
+        key, solver = await self._solver(params)
+        return {"stackup_id": key, "layers": solver.stackup.signal_layers(), "total_thickness": solver.stackup.total_thickness()}
+
+    async def zdiff(self, params):
+        """Tek katman (layer) veya tüm sinyal katmanları için sonuç; target verilirse tolerans kontrolü de yapılır."""
+        import asyncio
+        key, solver = await self._solver(params)
+        W = get_float_or_error(MESSAGES["LABEL_W"].split(':')[0], params.get("W"))
+        Gap = get_float_or_error(MESSAGES["LABEL_GAP"].split(':')[0], params.get("Gap"))
+        S = get_float_or_error(MESSAGES["LABEL_S"].split(':')[0], params.get("S"))
+        model = params.get("model", "formula")
+        if model not in IMPEDANCE_MODELS:
+            raise ValueError(f"Unknown impedance model '{model}' (expected 'formula' or 'field').")
+        limits = None
+        if params.get("target") is not None:
+            target = get_float_or_error(MESSAGES["LABEL_Z0_TARGET"].split(':')[0], params["target"])
+            tolerance = get_float_or_error(MESSAGES["LABEL_TOLERANCE"].split(':')[0], params.get("tolerance", 10.0), can_be_zero=True)
+            limits = Solver.tolerance_limits(target, tolerance)
+
+        single = "layer" in params
+        layers = [str(params["layer"])] if single else solver.stackup.signal_layers()
+        # Katman hataları (bilinmeyen ad, sinyal olmayan katman, referans düzlemi yok) geçersiz parametre olarak döner;
+        # toplu hesaba yalnızca geçerli noktalar girer
+        try:
+            parameters = [solver.layer_parameters(layer_name) for layer_name in layers]
+        except Exception as e:
+            raise RpcError(RPC_INVALID_PARAMS, str(e))
+        if model == "field":
+            results = await asyncio.gather(*(self._solve_field(solver, layer_name, W, Gap, S) for layer_name in layers))
+        else:
+            items = [_ServiceItem(layer_name, *layer[1:], W, Gap, S) for layer_name, layer in zip(layers, parameters)]
+            # Tüm katmanlar önce kuyruğa girer, böylece aynı partide hesaplanır
+            futures = [self._submit(item) for item in items]
+            results = [await future for future in futures]
+        responses = [self._response(key, result, limits) for result in results]
+        return responses[0] if single else responses
+
+    async def stats(self, params):
+        return {"requests": self.requests, "batches": self.batches, "points": self.points, "largest_batch": self.largest_batch,
+                "mean_batch": self.points / self.batches if self.batches else 0.0, "stackups": len(self.stackups.entries),
+                "stackup_hits": self.stackups.hits, "stackup_misses": self.stackups.misses}
+
+    @staticmethod
+    def _response(key, result, limits):
+        if result.model == "field":
+            regime = "field"
+        else:
+            regime = "wide" if result.wh_ratio >= 1.0 else "narrow"
+        response = {"stackup_id": key, "layer": result.layer, "zdiff": result.zdiff, "model": result.model, "regime": regime,
+                    "wh_ratio": result.wh_ratio, "cpwg_applied": result.cpwg_applied, "H": result.H, "T": result.T, "Er": result.Er,
+                    "reference_plane": result.reference_plane, "model_info": describe_model(result),
+                    "cpwg_info": describe_cpwg(result), "params_used": describe_params(result)}
+        if limits is not None:
+            response.update(lower=limits[0], upper=limits[1], passed=limits[0] <= result.zdiff <= limits[1])
+        return response
+
+    # --- Toplu Hesap (Coalescing) ---
+
+    def _submit(self, item):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((item, future))
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.coalesce, self._flush)
+        return future
+
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        items = [item for item, _ in pending]
+        try:
+            if _numpy() is not None:
+                columns = [np.array(column, dtype=float) for column in zip(*((item.W, item.Gap, item.S, item.T, item.H, item.Er) for item in items))]
+                values = calculate_zdiff_batch(*columns).tolist()
+            else:
+                values = [calculate_zdiff(item.W, item.Gap, item.S, item.T, item.H, item.Er) for item in items]
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.points += len(items)
+        self.largest_batch = max(self.largest_batch, len(items))
+        for (item, future), value in zip(pending, values):
+            if not future.done():
+                future.set_result(ImpedanceResult(item.layer, value, item.T, item.H, item.Er, item.reference_plane,
+                                                  item.W / item.H, item.S < item.H))
+
+    async def _solve_field(self, solver, layer_name, W, Gap, S):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        if self.field_executor is None:
+            self.field_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="impedance-field")
+        return await asyncio.get_running_loop().run_in_executor(self.field_executor, solver.solve, layer_name, W, Gap, S, "field")
+
+    # --- JSON-RPC ---
+
+    async def handle_message(self, message):
+        """Tek JSON-RPC isteğini yanıtlar; bildirimler (id yok) için None döndürür."""
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" or not isinstance(message.get("method"), str):
+            return self._error(None, RPC_INVALID_REQUEST, "Invalid JSON-RPC 2.0 request.")
+        request_id = message.get("id")
+        self.requests += 1
+        method = self.methods.get(message["method"])
+        params = message.get("params", {})
+        try:
+            if method is None:
+                raise RpcError(RPC_METHOD_NOT_FOUND, f"Unknown method '{message['method']}'.")
+            if not isinstance(params, dict):
+                raise RpcError(RPC_INVALID_PARAMS, "params must be an object.")
+            result = await method(params)
+        except RpcError as e:
+            response = self._error(request_id, e.code, str(e))
+        except ValueError as e:
+            response = self._error(request_id, RPC_INVALID_PARAMS, f"{MESSAGES['ERROR_INPUT']}: {e}")
+        except Exception as e:
+            response = self._error(request_id, RPC_SERVER_ERROR, str(e))
+        else:
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        return response if "id" in message else None
+
+    @staticmethod
+    def _error(request_id, code, message):
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+    async def handle_line(self, line):
+        """Bir satırı (tek istek veya toplu istek dizisi) yanıtlar; yanıt yoksa None."""
+        import asyncio
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            return self._error(None, RPC_PARSE_ERROR, f"Parse error: {e}")
+        if isinstance(message, list):
+            if not message:
+                return self._error(None, RPC_INVALID_REQUEST, "Empty batch.")
+            responses = [response for response in await asyncio.gather(*(self.handle_message(item) for item in message)) if response is not None]
+            return responses or None
+        return await self.handle_message(message)
+
+    async def handle_connection(self, reader, writer):
+        import asyncio
+        # Her satır ayrı görevde yanıtlanır: aynı bağlantıdaki ardışık istekler de birlikte toplanır
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line):
+            response = await self.handle_line(line)
+            if response is not None:
+                async with lock:
+                    writer.write(json.dumps(response).encode('utf-8') + b"\n")
+                    await writer.drain()
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    # Satır sınırı aşıldı veya bağlantı koptu
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(respond(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve(self, host=SERVICE_HOST, port=SERVICE_PORT, socket_path=None, ready=None):
+        """Sunucuyu başlatır ve iptal edilene kadar çalışır. ready verilirse dinlenen adresle çağrılır."""
+        import asyncio
+        import signal
+        # NumPy ilk istekte değil, açılışta yüklenir
+        _numpy()
+        # SIGTERM ile durdurulunca da Unix soketi silinir (Windows'ta sinyal işleyici yoktur)
+        with contextlib.suppress(NotImplementedError, AttributeError):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=socket_path, limit=SERVICE_LINE_LIMIT)
+            address = socket_path
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=SERVICE_LINE_LIMIT)
+            address = "%s:%d" % server.sockets[0].getsockname()[:2]
+        try:
+            if ready:
+                ready(address)
+            async with server:
+                await server.serve_forever()
+        finally:
+            if socket_path:
+                with contextlib.suppress(OSError):
+                    os.remove(socket_path)
+            if self.field_executor is not None:
+                self.field_executor.shutdown(wait=False)
+
+
+class ImpedanceServiceClient:
+    """ZdiffService için basit senkron istemci (KiCad betikleri vb.); çağrı başına bir istek gönderir ve yanıtı bekler.
+
+    Hata yanıtları RpcError olarak fırlatılır. stackup_id'yi saklayıp sonraki çağrılarda stackup yerine göndermek
+    aktarımı kısaltır; servis stackup'ı unuttuysa RPC_UNKNOWN_STACKUP döner.
+    """
+
+    def __init__(self, host=SERVICE_HOST, port=SERVICE_PORT, socket_path=None, timeout=30.0):
+        import socket
+        if socket_path:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(socket_path)
+        else:
+            self.socket = socket.create_connection((host, port), timeout=timeout)
+        self.stream = self.socket.makefile('rwb')
+        self.next_id = 0
+
+    def call(self, method, **params):
+        self.next_id += 1
+        self.stream.write(json.dumps({"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params}).encode('utf-8') + b"\n")
+        self.stream.flush()
+        line = self.stream.readline()
+        if not line:
+            raise ConnectionError("Service closed the connection.")
+        response = json.loads(line)
+        if "error" in response:
+            raise RpcError(response["error"]["code"], response["error"]["message"])
+        return response["result"]
+
+    def close(self):
+        self.stream.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+# --- Arka Plan İşleri (Job Scheduler) ---
+
+class JobCancelled(Exception):
+    """İş iptal edildiğinde iş fonksiyonunun içinde (job.check/job.report) fırlatılır."""
+
+
+class Job:
+    """Arka planda çalışan tek iş. İş fonksiyonu job.report() ile ilerleme bildirir; bu çağrı iptali de denetler.
+
+    İş fonksiyonu Tk nesnelerine dokunmamalıdır; girdiler ana iş parçacığında hazırlanır, sonuç on_done ile
+    yine ana iş parçacığında (master.after üzerinden) teslim edilir.
+    """
+
+    def __init__(self, key, title, function, on_done, on_error=None):
+        self.key = key
+        self.title = title
+        self.function = function
+        self.on_done = on_done
+        self.on_error = on_error
+        self.progress = 0.0
+        self.partial = None
+        self.future = None
+        self.messages = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def check(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def report(self, fraction, partial=None):
+        """İlerleme (0-1) ve isteğe bağlı ara sonuç metni gönderir; iş iptal edildiyse JobCancelled fırlatır."""
+        self.check()
+        self.messages.put((self, "progress", (fraction, partial)))
+
+
+class JobScheduler:
+    """İşleri bir iş parçacığı havuzunda çalıştırır; mesajlar master.after ile yoklanarak Tk döngüsünde işlenir.
+
+    Aynı anahtarla gelen yeni iş eskisinin yerini alır (coalescing): henüz başlamamış eski iş hiç çalışmaz,
+    çalışan eski iş iptal edilir ve sonucu atılır; anahtar başına en fazla bir iş bekler.
+    NumPy ve dosya G/Ç GIL'i bıraktığından iş parçacıkları yeterlidir; Tk nesneleri işlem sınırını geçemez.
+    """
+
+    def __init__(self, master, max_workers=2, poll_ms=JOB_POLL_MS, on_state_change=None):
+        from concurrent.futures import ThreadPoolExecutor
+        self.master = master
+        self.poll_ms = poll_ms
+        self.on_state_change = on_state_change
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="impedance-job")
+        self.messages = queue.SimpleQueue()
+        self.running = {}
+        self.pending = {}
+        self.poll_id = None
+
+    def submit(self, key, title, function, on_done, on_error=None):
+        job = Job(key, title, function, on_done, on_error)
+        job.messages = self.messages
+
+        stale = self.pending.pop(key, None)
+        if stale is not None:
+            stale.cancel()
+
+        current = self.running.get(key)
+        if current is None:
+            self._start(job)
+        else:
+            current.cancel()
+            if current.future.cancel():
+                # Eski iş henüz başlamamıştı; doğrudan yenisiyle değiştirilir
+                self._start(job)
+            else:
+                self.pending[key] = job
+
+        self._notify()
+        self._schedule_poll()
+        return job
+
+    def _start(self, job):
+        self.running[job.key] = job
+        job.future = self.executor.submit(self._run, job)
+
+    def _run(self, job):
+        try:
+            job.check()
+            result = job.function(job)
+            self.messages.put((job, "done", result))
+        except JobCancelled:
+            self.messages.put((job, "cancelled", None))
+        except Exception as e:
+            self.messages.put((job, "error", e))
+
+    def _schedule_poll(self):
+        if self.poll_id is None:
+            self.poll_id = self.master.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self.poll_id = None
+        while True:
+            try:
+                job, kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "progress":
+                job.progress, partial = payload
+                if partial is not None:
+                    job.partial = partial
+                continue
+
+            if self.running.get(job.key) is job:
+                del self.running[job.key]
+                next_job = self.pending.pop(job.key, None)
+                if next_job is not None:
+                    self._start(next_job)
+
+            if job.cancelled:
+                continue
+            if kind == "done":
+                job.on_done(payload)
+            elif kind == "error" and job.on_error is not None:
+                job.on_error(payload)
+
+        self._notify()
+        if self.running:
+            self._schedule_poll()
+
+    def _notify(self):
+        if self.on_state_change is not None:
+            self.on_state_change()
+
+    def active_jobs(self):
+        return list(self.running.values())
+
+    def cancel(self, key=None):
+        """Verilen anahtardaki (None ise tüm) işleri iptal eder."""
+        for jobs in (self.pending, self.running):
+            for job_key in [k for k in jobs if key is None or k == key]:
+                job = jobs[job_key]
+                job.cancel()
+                if jobs is self.pending or job.future.cancel():
+                    del jobs[job_key]
+        self._notify()
+
+    def shutdown(self, wait=False):
+        """Tüm işleri iptal eder; wait=True ise çalışan işlerin (bir sonraki job.report'ta) bitmesini bekler."""
+        self.cancel()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# --- GUI Sınıfı ---
+
+def _load_tk():
+    """tkinter'i yalnızca GUI gerçekten açılırken yükler (komut satırı ve içe aktarma Tk'siz çalışır)."""
+    global tk, ttk, messagebox, filedialog
+    if tk is None:
+        import tkinter
+        from tkinter import ttk as tkinter_ttk, messagebox as tkinter_messagebox, filedialog as tkinter_filedialog
+        ttk, messagebox, filedialog = tkinter_ttk, tkinter_messagebox, tkinter_filedialog
+        tk = tkinter
+    return tk
+
+class ImpedanceCalculatorApp:
+    def __init__(self, master, disk_cache=True):
+        build_start = time.perf_counter()
+        _load_tk()
+        self.master = master
+        
+        # Tek Dil: İngilizce
+        self.current_lang = MESSAGES 
+
+        self.layer_options = [2, 4, 6, 8, 10, 12, 14, 16]
+        self.num_layers_var = tk.StringVar(value=str(self.layer_options[2])) 
+        self.num_layers_var.trace_add('write', self.on_layer_count_change) 
+        self.suppress_layer_regeneration = False
+
+        self.W_var = tk.StringVar(value="0.2")    
+        self.Gap_var = tk.StringVar(value="0.2")  
+        self.S_var = tk.StringVar(value="1.0")    
+        self.target_zdiff_var = tk.StringVar(value="100.0") 
+        self.tolerance_percent_var = tk.StringVar(value="10.0") 
+        self.synth_variable = tk.StringVar(value="W")
+        # Canlı mod ve kaydırıcılar her zaman kapalı formları kullanır; alan çözücüsü yalnızca Hesapla ile çalışır
+        self.impedance_model = tk.StringVar(value=IMPEDANCE_MODELS[0])
+
+        # Canlı (otomatik) yeniden hesaplama durumu
+        self.live_mode_var = tk.BooleanVar(value=False)
+        self.live_mode_var.trace_add('write', self.on_live_mode_toggle)
+        self.live_dirty_rows = set()
+        self.live_dirty_all = False
+        self.live_after_id = None
+        self.live_tree = None
+        self.live_tree_items = {}
+        for var in (self.W_var, self.Gap_var, self.S_var, self.target_zdiff_var, self.tolerance_percent_var):
+            var.trace_add('write', self.on_geometry_edited)
+
+        self.stackup_data = [] 
+        self.stackup = Stackup([])
+        # Oturumlar arası kalıcı önbellek (disk_cache=False ise yalnızca bellek); pencere kapanırken on_close ile diske yazılır
+        self.impedance_cache = ImpedanceCache(path=os.path.join(APP_DATA_DIR, "impedance-cache") if disk_cache else None)
+        self.cache_stats_var = tk.StringVar(value="---")
+        # Senkronize edilen stackup'lar ve sonuçlar biriktirilip RESULT_FLUSH_MS aralıklarla tek işlemde kaydedilir.
+        # Veritabanı ilk pencere çizildikten sonra açılır (on_first_window)
+        self.result_store = None
+        self.result_flush_id = None
+
+        # Kaydırıcılar: katman parametreleri yalnızca stackup/katman değişince yeniden çözülür
+        self.slider_vars = [tk.DoubleVar(value=0.2), tk.DoubleVar(value=0.2), tk.DoubleVar(value=1.0)]
+        self.slider_zdiff_var = tk.StringVar(value="---")
+        self.slider_stackup = Stackup([])
+        self.slider_layer_key = None
+        self.slider_layer = None
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # İsteğe bağlı aşama profili (varsayılan kapalı)
+        self.profiler = StageProfiler()
+        self.profiler.listener = self.on_profiled_stage
+        self.profile_mode_var = tk.BooleanVar(value=False)
+        self.profile_mode_var.trace_add('write', self.on_profile_mode_toggle)
+        self.profile_summary_var = tk.StringVar(value="")
+
+        # Uzun işler (sweep, yield, denetim, sentez) arka planda çalışır; sonuçlar master.after ile teslim edilir
+        self.jobs = JobScheduler(master, on_state_change=self.on_jobs_changed)
+        self.job_status_var = tk.StringVar(value="")
+        self.job_progress_var = tk.DoubleVar(value=0.0)
+        self.entry_vars = [] 
+        self.signal_layers = []
+        self.selected_layer = tk.StringVar() 
+        
+        self.Zdiff_result = tk.StringVar()
+        self.tolerance_status_var = tk.StringVar(value="---") 
+        self.model_info = tk.StringVar()
+        self.cpwg_info = tk.StringVar()
+        self.params_used = tk.StringVar()
+        self.sync_status_var = tk.StringVar(value="")
+        
+        self.total_thickness_var = tk.StringVar(value="0.00") 
+
+        self.table_frame = None 
+        self.table_rows = []
+        self.table_header_built = False
+        self.table_updating = False
+        self.layer_select_combobox = None 
+        self.zdiff_result_label = None 
+        self.status_label = None 
+        self.sync_status_label = None 
+        self.notebook = None 
+
+        self.setup_styles()
+        self.vcmd_float = (master.register(self.validate_float_input), '%P')
+        
+        self.create_widgets()
+        self.generate_stackup_data(int(self.num_layers_var.get()))
+        self.update_main_title()
+
+        # Açılış süreleri: modül yükleme ve pencere kurulumu; ilk çizim on_first_window'da ölçülür
+        self.profiler.record("startup.import", _MODULE_READY - _SCRIPT_START)
+        self.profiler.record("startup.build", time.perf_counter() - build_start)
+        master.after_idle(self.on_first_window)
+
+    def on_first_window(self):
+        """İlk pencere çizildiğinde açılış süresini bildirir, ardından ertelenen işleri (veritabanı, NumPy) başlatır."""
+        import sqlite3
+        self.master.update_idletasks()
+        self.profiler.record("startup.first_window", time.perf_counter() - _SCRIPT_START)
+        self.profile_summary_var.set(self.current_lang["STARTUP_SUMMARY"].format(**self.startup_times()))
+        try:
+            self.result_store = ResultStore(RESULT_STORE_PATH, RESULT_STORE_MAX_ROWS)
+            self.result_store.add_stackup(self.current_stackup())
+            self.schedule_result_flush()
+        except (OSError, sqlite3.Error):
+            # Veritabanı açılamazsa (kilitli, salt okunur vb.) sonuçlar kaydedilmez
+            self.result_store = None
+        # Toplu hesaplamalar ilk kullanımda beklemesin diye NumPy arka planda yüklenir
+        threading.Thread(target=_numpy, name="numpy-preload", daemon=True).start()
+
+    def startup_times(self):
+        """{aşama: ms} - startup.* aşamalarından; first_window betiğin ilk satırından itibaren toplam süredir."""
+        summary = self.profiler.summary(STARTUP_STAGES)
+        return {name.split('.', 1)[1]: summary[name]["total_ms"] if name in summary else 0.0 for name in STARTUP_STAGES}
+
+    # --- Profil (Stage Timing) ---
+
+    def on_profile_mode_toggle(self, *args):
+        self.profiler.enabled = self.profile_mode_var.get()
+        if self.profiler.enabled:
+            # Açılış süreleri bir kez ölçülür; profil sıfırlansa da kaydedilen profilde kalır
+            startup = {name: self.profiler.totals[name] for name in STARTUP_STAGES if name in self.profiler.totals}
+            self.profiler.reset()
+            for name, seconds in startup.items():
+                self.profiler.record(name, seconds)
+        self.profile_summary_var.set("")
+
+    def on_profiled_stage(self, stage_name):
+        if stage_name in PROFILE_STAGE_GROUPS:
+            self.profile_summary_var.set(self.profiler.compact(stage_name, PROFILE_STAGE_GROUPS[stage_name]))
+
+    def save_profile(self):
+        try:
+            filepath = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")], title=self.current_lang["PROFILE_SAVE"])
+            if filepath:
+                self.profiler.dump_json(filepath)
+        except Exception as e:
+            messagebox.showerror(self.current_lang["ERROR_SYNC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+
+    # --- Arka Plan İşleri ---
+
+    def on_jobs_changed(self):
+        jobs = self.jobs.active_jobs()
+        if not jobs:
+            self.job_status_var.set("")
+            self.job_progress_var.set(0.0)
+            return
+        job = jobs[0]
+        text = self.current_lang["JOB_RUNNING"].format(title=job.title, percent=100.0 * job.progress)
+        if job.partial:
+            text += f" - {job.partial}"
+        queued = len(jobs) - 1 + len(self.jobs.pending)
+        if queued:
+            text += f", {self.current_lang['JOB_QUEUED'].format(count=queued)}"
+        self.job_status_var.set(text)
+        self.job_progress_var.set(100.0 * job.progress)
+
+    def show_job_error(self, error):
+        if isinstance(error, ValueError):
+            messagebox.showerror(self.current_lang["ERROR_INPUT"], f"{self.current_lang['ERROR_INPUT']}: {error}")
+        else:
+            messagebox.showerror(self.current_lang["ERROR_CALC"], f"{self.current_lang['ERROR_UNKNOWN']}: {error}")
+
+    def on_close(self):
+        import sqlite3
+        # Önbellek ve veritabanı, onları kullanan işler bittikten sonra kapatılır; her iş ilerleme bildirdiği için
+        # (job.report) iptal edilen iş en geç bir sonraki adımında (parça, katman, çift) durur
+        self.jobs.shutdown(wait=True)
+        self.impedance_cache.close()
+        if self.result_store is not None:
+            with contextlib.suppress(sqlite3.Error):
+                self.result_store.close()
+        self.master.destroy()
+
+    # --- Sonuç Veritabanı ---
+
+    def store_results(self, stackup, W, Gap, S, results, target=None, tolerance=None):
+        """Sonuçları veritabanı kuyruğuna ekler; yazma gecikmeli ve toplu yapılır."""
+        if self.result_store is None:
+            return
+        self.result_store.record(stackup, W, Gap, S, results, target, tolerance)
+        self.schedule_result_flush()
+
+    def schedule_result_flush(self):
+        if self.result_flush_id is None:
+            self.result_flush_id = self.master.after(RESULT_FLUSH_MS, self.flush_results)
+
+    def flush_results(self):
+        import sqlite3
+        self.result_flush_id = None
+        with contextlib.suppress(sqlite3.Error):
+            self.result_store.flush()
+
+    # Dil Seçimi ve Yenileme Fonksiyonları kaldırıldı
+    def update_main_title(self):
+        self.master.title(self.current_lang["TITLE"])
+        
+    def validate_float_input(self, P):
+        if P == "":
+            return True
+        if re.match(r'^\d*[,\.]?\d*$', P):
+            return True
+        return False
+
+    # --- Görsel ve Renk Fonksiyonları (Değişmedi) ---
+    
+    def setup_styles(self):
+        style = ttk.Style()
+        
+        style.configure("Cell.TLabel", padding=[5, 2], borderwidth=1, relief="solid", anchor="center")
+        style.configure("Header.TLabel", background=COLOR_HEADER, foreground=COLOR_TEXT_LIGHT, font=('Arial', 9, 'bold'), borderwidth=1, relief="solid", anchor="center")
+        style.configure("Copper.TLabel", background=COLOR_COPPER, foreground=COLOR_TEXT_DARK)
+        style.configure("Solder.TLabel", background=COLOR_SOLDER_MASK, foreground=COLOR_TEXT_LIGHT)
+        style.configure("Core.TLabel", background=COLOR_CORE, foreground=COLOR_TEXT_LIGHT)
+        style.configure("Dielectric.TLabel", background=COLOR_PREPREG, foreground=COLOR_TEXT_DARK)
+        style.configure("Total.TLabel", font=('Arial', 11, 'bold'), foreground='darkred') 
+        style.configure("MappingHeader.TLabel", 
+                        background=COLOR_MAPPING_HEADER, 
+                        foreground=COLOR_TEXT_LIGHT, 
+                        font=('Arial', 9, 'bold'), 
+                        borderwidth=1, 
+                        relief="solid", 
+                        anchor="center")
+        style.configure("Mapping.TLabel", background="white", borderwidth=1, relief="solid", anchor="w", padding=[5, 2], foreground='black')
+        style.configure("Designer.TLabel", font=('Arial', 8, 'italic'), foreground='gray', anchor="e")
+        style.configure("StandardHeader.TLabel", 
+                        background=COLOR_STANDARD_HEADER, 
+                        foreground=COLOR_TEXT_LIGHT, 
+                        font=('Arial', 10, 'bold'), 
+                        borderwidth=1, 
+                        relief="solid", 
+                        anchor="center",
+                        padding=[5, 5])
+        style.configure("StandardCell.TLabel", 
+                        background="white", 
+                        foreground="black", 
+                        font=('Arial', 9), 
+                        borderwidth=1, 
+                        relief="solid", 
+                        anchor="w",
+                        padding=[5, 2])
+        for name, background in (("MatrixPass", COLOR_MATRIX_PASS), ("MatrixFail", COLOR_MATRIX_FAIL), ("MatrixUnreachable", COLOR_MATRIX_UNREACHABLE)):
+            style.configure(f"{name}.TLabel", background=background, foreground="black", font=('Arial', 9),
+                            borderwidth=1, relief="solid", anchor="center", padding=[5, 2])
+        style.configure("Status.TLabel", font=('Arial', 12, 'bold'))
+        
+        style.configure("Sync.TButton", 
+                        background=COLOR_SYNC_BUTTON_BG, 
+                        foreground=COLOR_SYNC_BUTTON_FG,
+                        font=('Arial', 9, 'bold'))
+        style.map("Sync.TButton", 
+                  background=[('active', '#004a99')], 
+                  foreground=[('active', COLOR_SYNC_BUTTON_FG)])
+        
+        style.configure("SyncStatus.TLabel", 
+                        foreground=COLOR_SUCCESS, 
+                        font=('Arial', 9, 'bold'),
+                        anchor="e")
+
+
+    def get_color_style_by_type(self, layer_class, layer_name):
+        if layer_class == "Solder Mask":
+            return "Solder.TLabel"
+        elif layer_class == "Copper":
+            return "Copper.TLabel"
+        elif layer_class == "Core":
+            return "Core.TLabel"
+        elif layer_class in ["Prepreg", "Dielectric"]:
+            return "Dielectric.TLabel"
+        return "Cell.TLabel"
+
+    # --- Dinamik Stackup Oluşturma Mantığı (Değişmedi) ---
+
+    def generate_stackup_data(self, num_copper_layers):
+        
+        new_stackup = Stackup.generate(num_copper_layers).rows
+
+        self.stackup_data = new_stackup
+        
+        self.signal_layers = [item[0] for item in self.stackup_data if item[1] == "Signal"] 
+        if self.signal_layers:
+             self.selected_layer.set(self.signal_layers[0])
+
+        self.redraw_stackup_table()
+
+    def on_layer_count_change(self, *args):
+        if self.suppress_layer_regeneration:
+            return
+        try:
+            num = int(self.num_layers_var.get())
+            if num in self.layer_options:
+                self.generate_stackup_data(num)
+        except ValueError:
+            pass 
+
+    # --- METOT: Stackup Verilerini StringVar'lardan Ana Listeye Aktar ---
+    def update_stackup_data(self):
+        try:
+            for i, row_vars in enumerate(self.entry_vars):
+                
+                self.stackup_data[i][0] = row_vars[0].get().strip()
+                self.stackup_data[i][1] = row_vars[1].get().strip()
+                self.stackup_data[i][2] = row_vars[2].get().strip()
+                self.stackup_data[i][3] = row_vars[3].get().strip()
                 
+            self.refresh_signal_layers()
+            
+            self.update_total_thickness()
+
+            if self.result_store is not None:
+                self.result_store.add_stackup(self.current_stackup())
+                self.schedule_result_flush()
+            
+            self.sync_status_var.set(self.current_lang["SUCCESS"])
+            if self.sync_status_label:
+                self.sync_status_label.config(foreground=COLOR_SUCCESS)
+                self.master.after(2000, lambda: self.sync_status_var.set(""))
+
+        except Exception as e:
+            messagebox.showerror(self.current_lang["ERROR_SYNC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+            self.sync_status_var.set(self.current_lang["ERROR_SYNC"])
+            if self.sync_status_label:
+                self.sync_status_label.config(foreground="red")
+            self.master.after(3000, lambda: self.sync_status_var.set(""))
+
+
+    def refresh_signal_layers(self):
+        self.signal_layers = [item[0] for item in self.stackup_data if item[1] == "Signal"] 
+        if self.layer_select_combobox:
+            self.layer_select_combobox['values'] = self.signal_layers
+            if self.selected_layer.get() not in self.signal_layers and self.signal_layers:
+                self.selected_layer.set(self.signal_layers[0])
+            elif not self.signal_layers:
+                self.selected_layer.set("")
+
+    def current_stackup(self):
+        """stackup_data'yı kalıcı Stackup nesnesine aktarır; plane indeksi sadece içerik değiştiyse yeniden kurulur."""
+        self.stackup.set_rows(self.stackup_data)
+        return self.stackup
+
+    # --- Toplam Kalınlık Güncelleme Fonksiyonu (Değişmedi) ---
+
+    def update_total_thickness(self, *args):
+        if args and self.table_updating:
+            # Tablo toplu güncellenirken her hücre için değil, sonda bir kez hesaplanır
+            return
+        total = 0.0
+        for row_vars in self.entry_vars:
+            thickness_str = row_vars[2].get()
+            
+            if thickness_str:
+                try:
+                    # Virgüllü veya noktalı girişi float'a çevir
+                    value = float(thickness_str.replace(',', '.'))
+                    total += value
+                except ValueError:
+                    pass
+        
+        self.total_thickness_var.set(f"{total:.3f}")
+
+    # --- CSV İşlemleri ---
+
+    def export_to_csv(self):
+        self.update_stackup_data() 
+        
+        try:
+            filepath = filedialog.asksaveasfilename(
+                defaultextension=".csv",
+                filetypes=[("CSV files", "*.csv")],
+                title=self.current_lang["EXPORT_CSV"]
+            )
+            
+            if filepath:
+                self.current_stackup().to_csv(filepath, self.total_thickness_var.get())
+
+                messagebox.showinfo(self.current_lang["SUCCESS"], f"{self.current_lang['SUCCESS']} (CSV: {filepath})")
+            
+        except Exception as e:
+            messagebox.showerror(self.current_lang["ERROR_SYNC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+
+    def clean_dk_value(self, value):
+        value = str(value).strip()
+        if not value:
+            return ""
+
+        cleaned = re.sub(r'[a-zA-Z\s]+', '', value) 
+        
+        if cleaned:
+            return cleaned.replace('.', ',') 
+        
+        return ""
+
+
+    def import_from_csv(self):
+        try:
+            filepath = filedialog.askopenfilename(
+                defaultextension=".csv",
+                filetypes=[("CSV files", "*.csv")],
+                title=self.current_lang["IMPORT_CSV"]
+            )
+            
+            if not filepath:
+                return
+
+            self.load_stackup_csv(filepath)
+            messagebox.showinfo(self.current_lang["SUCCESS"], self.current_lang["SUCCESS"])
+
+        except ValueError as e:
+            messagebox.showerror(self.current_lang["ERROR_INPUT"], str(e))
+        except Exception as e:
+            messagebox.showerror(self.current_lang["ERROR_SYNC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+
+    @profiled("import_csv")
+    def load_stackup_csv(self, filepath):
+        """CSV'deki değerleri mevcut (aynı boyutlu) stackup'a uygular; boyut uyuşmazsa ValueError fırlatır.
+
+        Hata penceresini çağıran gösterir; modal pencerede geçen süre aşama süresine girmez.
+        """
+        with self.profiler.stage("import_csv.read"):
+            data = read_stackup_csv(filepath)
+        
+        if not data or len(data) != len(self.stackup_data):
+            raise ValueError(f"Stackup size mismatch. File row count ({len(data)}) does not match existing stackup ({len(self.stackup_data)}).")
+
+        with self.profiler.stage("import_csv.apply"):
+            for i, row in enumerate(data):
                 name_new = row[1].strip() if len(row) > 1 else self.stackup_data[i][0]
                 class_new = row[2].strip() if len(row) > 2 else self.stackup_data[i][1]
                 thickness_new = row[3].strip() if len(row) > 3 else self.stackup_data[i][2]
                 dk_raw = row[4].strip() if len(row) > 4 else self.stackup_data[i][3]
-                
+
                 dk_new = self.clean_dk_value(dk_raw)
 
                 self.entry_vars[i][0].set(name_new) 
@@ -468,20 +4455,227 @@ class ImpedanceCalculatorApp:
                 self.entry_vars[i][2].set(thickness_new)
                 if self.stackup_data[i][4] in ["Prepreg", "Core", "Solder Mask"]:
                     self.entry_vars[i][3].set(dk_new) 
-                
+
                 self.stackup_data[i][0] = name_new
                 self.stackup_data[i][1] = class_new
                 self.stackup_data[i][2] = thickness_new
                 self.stackup_data[i][3] = dk_new
             
-            self.redraw_stackup_table() 
+        self.redraw_stackup_table() 
+        with self.profiler.stage("import_csv.sync"):
             self.update_stackup_data() 
 
-            messagebox.showinfo(self.current_lang["SUCCESS"], self.current_lang["SUCCESS"])
 
+    def apply_stackup(self, stackup):
+        """Dışarıdan gelen (KiCad vb.) stackup'ı tabloya uygular; bakır katman sayısı gerekirse değişir."""
+        num_copper_layers = sum(1 for item in stackup.rows if item[4] == "Copper")
+        self.stackup_data = [list(row) for row in stackup.rows]
+
+        # Katman sayısı değişimi varsayılan stackup'ı yeniden üretmemeli
+        self.suppress_layer_regeneration = True
+        try:
+            self.num_layers_var.set(str(num_copper_layers))
+        finally:
+            self.suppress_layer_regeneration = False
+
+        self.redraw_stackup_table()
+        self.update_stackup_data()
+
+    def import_from_kicad(self):
+        try:
+            filepath = filedialog.askopenfilename(
+                defaultextension=".kicad_pcb",
+                filetypes=[("KiCad PCB files", "*.kicad_pcb")],
+                title=self.current_lang["IMPORT_KICAD"]
+            )
+            
+            if not filepath:
+                return
+
+            self.apply_stackup(read_kicad_stackup(filepath))
+            messagebox.showinfo(self.current_lang["SUCCESS"], f"{self.current_lang['SUCCESS']} ({filepath})")
+
+        except ValueError as e:
+            messagebox.showerror(self.current_lang["ERROR_INPUT"], f"{self.current_lang['ERROR_INPUT']}: {e}")
+        except Exception as e:
+            messagebox.showerror(self.current_lang["ERROR_SYNC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+
+    def open_stackup_library(self):
+        """Kütüphane dosyasını açar (yoksa ilk eklemede oluşturulur) ve seçiciyi gösterir."""
+        try:
+            filepath = filedialog.asksaveasfilename(
+                defaultextension=".kslib",
+                filetypes=[("Stackup libraries", "*.kslib")],
+                title=self.current_lang["LIBRARY_TITLE"],
+                confirmoverwrite=False
+            )
+            if not filepath:
+                return
+            self.show_stackup_library(StackupLibrary(filepath))
+
+        except ValueError as e:
+            messagebox.showerror(self.current_lang["ERROR_INPUT"], f"{self.current_lang['ERROR_INPUT']}: {e}")
         except Exception as e:
             messagebox.showerror(self.current_lang["ERROR_SYNC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
 
+    def show_stackup_library(self, library):
+        window = tk.Toplevel(self.master)
+        window.title(f"{self.current_lang['LIBRARY_TITLE']} - {library.path}")
+
+        filter_frame = ttk.Frame(window, padding="10")
+        filter_frame.pack(fill="x")
+        search_var = tk.StringVar()
+        layers_var = tk.StringVar(value=self.current_lang["LIBRARY_ALL"])
+        min_var, max_var = tk.StringVar(), tk.StringVar()
+
+        ttk.Label(filter_frame, text=self.current_lang["LIBRARY_SEARCH"]).pack(side='left', padx=5)
+        ttk.Entry(filter_frame, textvariable=search_var, width=25).pack(side='left', padx=5)
+        ttk.Label(filter_frame, text=self.current_lang["LIBRARY_LAYERS"]).pack(side='left', padx=5)
+        ttk.Combobox(filter_frame, textvariable=layers_var, state="readonly", width=6,
+                     values=[self.current_lang["LIBRARY_ALL"]] + [str(n) for n in self.layer_options]).pack(side='left', padx=5)
+        ttk.Label(filter_frame, text=self.current_lang["LIBRARY_THICKNESS"]).pack(side='left', padx=5)
+        ttk.Entry(filter_frame, textvariable=min_var, width=7).pack(side='left')
+        ttk.Label(filter_frame, text="-").pack(side='left', padx=2)
+        ttk.Entry(filter_frame, textvariable=max_var, width=7).pack(side='left')
+
+        columns = ("name", "layers", "thickness")
+        tree = ttk.Treeview(window, columns=columns, show="headings", height=18, selectmode="browse")
+        for column, heading, width in zip(columns, (self.current_lang["COL_NAME"], self.current_lang["LIBRARY_LAYERS"].rstrip(':'),
+                                                    self.current_lang["LIBRARY_THICKNESS"].rstrip(':')), (320, 70, 150)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor="w" if column == "name" else "center")
+        tree.pack(fill="both", expand=True, padx=10)
+
+        status_var = tk.StringVar()
+        ttk.Label(window, textvariable=status_var).pack(anchor="w", padx=10, pady=(5, 0))
+
+        def optional_float(var):
+            try:
+                return float(var.get().replace(',', '.')) if var.get().strip() else None
+            except ValueError:
+                return None
+
+        def refresh(*args):
+            layers = layers_var.get()
+            matches = library.find(search_var.get(), int(layers) if layers.isdigit() else None, optional_float(min_var), optional_float(max_var))
+            tree.delete(*tree.get_children())
+            for entry in matches[:LIBRARY_DISPLAY_LIMIT]:
+                tree.insert("", "end", iid=entry.name, values=(entry.name, entry.layer_count, f"{entry.total_thickness:.3f}"))
+            status_var.set(self.current_lang["LIBRARY_SHOWING"].format(shown=min(len(matches), LIBRARY_DISPLAY_LIMIT), matches=len(matches), total=len(library)))
+
+        def load_selected(*args):
+            selection = tree.selection()
+            if not selection:
+                return
+            try:
+                self.apply_stackup(library.load(selection[0]))
+                window.destroy()
+            except Exception as e:
+                messagebox.showerror(self.current_lang["ERROR_SYNC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+
+        def add_current():
+            answer = self.ask_parameters(self.current_lang["LIBRARY_ADD"], [("name", self.current_lang["LIBRARY_NAME"], "")])
+            if not answer or not answer["name"].strip():
+                return
+            name = answer["name"].strip()
+            if name in library and not messagebox.askyesno(self.current_lang["LIBRARY_TITLE"], self.current_lang["LIBRARY_REPLACE"].format(name=name)):
+                return
+            try:
+                self.update_stackup_data()
+                library.add(name, Stackup(self.current_stackup().rows))
+            except Exception as e:
+                messagebox.showerror(self.current_lang["ERROR_SYNC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+            refresh()
+
+        def remove_selected():
+            selection = tree.selection()
+            if not selection:
+                return
+            try:
+                library.remove(selection[0])
+            except Exception as e:
+                messagebox.showerror(self.current_lang["ERROR_SYNC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+            refresh()
+
+        for var in (search_var, layers_var, min_var, max_var):
+            var.trace_add('write', refresh)
+        tree.bind("<Double-1>", load_selected)
+
+        button_frame = ttk.Frame(window, padding="10")
+        button_frame.pack(fill="x")
+        ttk.Button(button_frame, text=self.current_lang["LIBRARY_LOAD"], command=load_selected).pack(side='right', padx=5)
+        ttk.Button(button_frame, text=self.current_lang["LIBRARY_ADD"], command=add_current).pack(side='right', padx=5)
+        ttk.Button(button_frame, text=self.current_lang["LIBRARY_REMOVE"], command=remove_selected).pack(side='right', padx=5)
+        refresh()
+
+    def run_stackup_optimizer(self):
+        """Katman hedeflerini sağlayan Prepreg/Core kalınlıklarını ve Dk seçimlerini arka planda arar."""
+        self.update_stackup_data()
+        stackup = Stackup(self.current_stackup().rows)
+        dk_values = sorted({row[3] for row in stackup.rows if row[4] in OPTIMIZER_THICKNESS_LIMITS and row[3]})
+        answer = self.ask_parameters(self.current_lang["OPT_TITLE"], [
+            ("targets", self.current_lang["OPT_TARGETS"], "; ".join(f"{layer}={self.target_zdiff_var.get()}" for layer in self.signal_layers)),
+            ("dk", self.current_lang["OPT_DK_VALUES"], "; ".join(dk_values)),
+            ("min_total", self.current_lang["OPT_MIN_TOTAL"], ""),
+            ("max_total", self.current_lang["OPT_MAX_TOTAL"], self.total_thickness_var.get()),
+        ], hint=self.current_lang["OPT_HINT"])
+        if not answer:
+            return
+
+        try:
+            targets = parse_stackup_targets(answer["targets"], self.tolerance_percent_var.get())
+            dk_values = [get_float_or_error(self.current_lang["OPT_DK_VALUES"].split(':')[0], value)
+                         for value in answer["dk"].split(';') if value.strip()]
+            min_total, max_total = (get_float_or_error(self.current_lang[key].split(':')[0], answer[field]) if answer[field].strip() else None
+                                    for key, field in (("OPT_MIN_TOTAL", "min_total"), ("OPT_MAX_TOTAL", "max_total")))
+            W, Gap, S = self.W_var.get(), self.Gap_var.get(), self.S_var.get()
+            # Geçersiz stackup veya katman adı iş kuyruğa alınmadan bildirilir
+            _optimizer_problem(stackup, targets, W, Gap, S, dk_values, None, min_total, max_total)
+        except ValueError as e:
+            messagebox.showerror(self.current_lang["ERROR_INPUT"], f"{self.current_lang['ERROR_INPUT']}: {e}")
+            return
+        except Exception as e:
+            messagebox.showerror(self.current_lang["ERROR_CALC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+            return
+
+        def work(job):
+            return optimize_stackup(stackup, targets, W, Gap, S, dk_values=dk_values, min_total=min_total, max_total=max_total,
+                                    progress=lambda done, total: job.report(done / total))
+
+        self.jobs.submit("optimize", self.current_lang["OPT_TITLE"], work,
+                         lambda results: self.show_optimized_stackups(targets, results), self.show_job_error)
+
+    def show_optimized_stackups(self, targets, results):
+        window = tk.Toplevel(self.master)
+        window.title(self.current_lang["OPT_TITLE"])
+
+        columns = ["rank", "thickness"] + [f"target{j}" for j in range(len(targets))] + ["status"]
+        headings = ["#", self.current_lang["TOTAL_THICKNESS"].rstrip(':')] + [f"{target.layer} ({target.target:g})" for target in targets] + \
+                   [self.current_lang["LABEL_STATUS"].split(':')[0]]
+        tree = ttk.Treeview(window, columns=columns, show="headings", height=min(max(len(results), 1), 16), selectmode="browse")
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=40 if column == "rank" else 130, anchor="center")
+        tree.tag_configure("fail", foreground="red")
+
+        for rank, result in enumerate(results, start=1):
+            status = self.current_lang["OPT_MET"] if result.met else self.current_lang["OPT_NOT_MET"]
+            tree.insert("", "end", iid=str(rank - 1), values=[rank, f"{result.total_thickness:.3f}"] + [f"{item.zdiff:.2f}" for item in result.results] + [status],
+                        tags=() if result.met else ("fail",))
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        def apply_selected(*args):
+            selection = tree.selection()
+            if not selection:
+                return
+            self.apply_stackup(results[int(selection[0])].stackup)
+            window.destroy()
+
+        tree.bind("<Double-1>", apply_selected)
+        button_frame = ttk.Frame(window, padding="10")
+        button_frame.pack(fill="x")
+        ttk.Button(button_frame, text=self.current_lang["OPT_APPLY"], command=apply_selected).pack(side='right', padx=5)
+
 
     # --- GUI Yaratma Metotları ---
     
@@ -510,6 +4704,13 @@ class ImpedanceCalculatorApp:
         button_and_status_container = ttk.Frame(save_button_frame)
         button_and_status_container.pack(side='right')
 
+        # Profil kontrolleri ve özet (durum etiketinin solunda)
+        profile_frame = ttk.Frame(save_button_frame)
+        profile_frame.pack(side='left', fill='x', expand=True)
+        ttk.Checkbutton(profile_frame, text=self.current_lang["PROFILE_MODE"], variable=self.profile_mode_var).pack(side='left', padx=5)
+        ttk.Button(profile_frame, text=self.current_lang["PROFILE_SAVE"], command=self.save_profile).pack(side='left', padx=5)
+        ttk.Label(profile_frame, textvariable=self.profile_summary_var, style="SyncStatus.TLabel", anchor="w").pack(side='left', fill='x', expand=True, padx=5)
+
         # 1. Durum etiketi (Butonun üstünde)
         self.sync_status_label = ttk.Label(button_and_status_container, 
                                            textvariable=self.sync_status_var, 
@@ -523,21 +4724,48 @@ class ImpedanceCalculatorApp:
                    command=self.update_stackup_data, 
                    style="Sync.TButton").pack(side='top')
         
+        # 2. ve 3. sekmeler boş eklenir; içerikleri ilk gösterildiklerinde kurulur (on_tab_changed)
+        self.pending_tabs = {}
+
         # 2. Sekme: Geometri & Hesaplama
         calc_frame = ttk.Frame(self.notebook)
         self.notebook.add(calc_frame, text=self.current_lang["TAB_CALC"])
-        self.setup_calculation_tab(calc_frame)
+        self.pending_tabs[str(calc_frame)] = ("calc", self.setup_calculation_tab, calc_frame)
         
         # 3. Sekme: Standart Empedanslar
         standards_frame = ttk.Frame(self.notebook)
         self.notebook.add(standards_frame, text=self.current_lang["TAB_STANDARDS"])
-        self.setup_standards_tab(standards_frame)
+        self.pending_tabs[str(standards_frame)] = ("standards", self.setup_standards_tab, standards_frame)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
+        # Arka plan işi durumu ve iptal
+        job_frame = ttk.Frame(main_frame)
+        job_frame.pack(fill='x', padx=5)
+        ttk.Progressbar(job_frame, variable=self.job_progress_var, maximum=100.0, length=160).pack(side='left', padx=5)
+        ttk.Label(job_frame, textvariable=self.job_status_var, anchor="w").pack(side='left', fill='x', expand=True, padx=5)
+        ttk.Button(job_frame, text=self.current_lang["JOB_CANCEL"], command=self.jobs.cancel).pack(side='right', padx=5)
+
         # Tasarımcı Bilgisi (En alta eklenmiştir)
         designer_label = ttk.Label(main_frame, text=self.current_lang["DESIGNED_BY"], style="Designer.TLabel")
         designer_label.pack(fill='x', padx=5, pady=(0, 5))
 
 
+    def on_tab_changed(self, event=None):
+        self.build_tab(self.notebook.select())
+
+    def build_tab(self, tab):
+        """Henüz kurulmamış bir sekmenin içeriğini oluşturur; kurulum süresi startup.tab[...] olarak kaydedilir."""
+        pending = self.pending_tabs.pop(str(tab), None)
+        if pending is None:
+            return
+        name, setup, frame = pending
+        started = time.perf_counter()
+        setup(frame)
+        if name == "calc":
+            # Katman listesi sekme kurulmadan önce de güncel tutulur; yeni açılır listeye aktarılır
+            self.refresh_signal_layers()
+        self.profiler.record(f"startup.tab[{name}]", time.perf_counter() - started)
+
     def setup_stackup_controls(self, frame):
         # Bu frame sadece katman sayısı ve Total Thickness/CSV kontrollerini içerir
         control_frame = ttk.Frame(frame)
@@ -562,6 +4790,9 @@ class ImpedanceCalculatorApp:
         # CSV Butonları
         ttk.Button(center_control_frame, text=self.current_lang["EXPORT_CSV"], command=self.export_to_csv).pack(side='left', padx=5)
         ttk.Button(center_control_frame, text=self.current_lang["IMPORT_CSV"], command=self.import_from_csv).pack(side='left', padx=5)
+        ttk.Button(center_control_frame, text=self.current_lang["IMPORT_KICAD"], command=self.import_from_kicad).pack(side='left', padx=5)
+        ttk.Button(center_control_frame, text=self.current_lang["LIBRARY_BUTTON"], command=self.open_stackup_library).pack(side='left', padx=5)
+        ttk.Button(center_control_frame, text=self.current_lang["OPT_BUTTON"], command=self.run_stackup_optimizer).pack(side='left', padx=5)
                      
         # Sağ Taraf: Toplam Kalınlık Gösterimi
         ttk.Label(right_control_frame, text=self.current_lang["TOTAL_THICKNESS"]).pack(side='left')
@@ -570,120 +4801,56 @@ class ImpedanceCalculatorApp:
         ttk.Label(right_control_frame, text=self.current_lang["MM"], style="Total.TLabel").pack(side='left')
 
 
+    @profiled("redraw_table")
     def redraw_stackup_table(self):
-        """Mevcut tabloyu siler ve yeni stackup verileriyle yeniden çizer."""
+        """Tabloyu yeni stackup verileriyle günceller.
+
+        Satır widget'ları havuzda tutulur: tipi (Copper/Prepreg/...) aynı kalan satırlar yeniden kullanılır ve
+        sadece değeri değişen hücreler güncellenir; fazla satırlar silinmez, gizlenir.
+        """
         if not self.table_frame:
             return
 
-        for widget in self.table_frame.winfo_children():
-            widget.destroy()
+        self.table_updating = True
         
-        self.entry_vars = []
-        
-        # Sütun Başlıkları
-        headers = ["#", self.current_lang["COL_NAME"], self.current_lang["COL_CLASS"], self.current_lang["COL_THICKNESS"], self.current_lang["COL_DK"]]
-        column_widths = [30, 150, 100, 100, 100]
-
-        for col, header in enumerate(headers):
-            ttk.Label(self.table_frame, text=header, style="Header.TLabel", width=column_widths[col]//10).grid(
-                row=0, column=col, sticky="nsew"
-            )
-            self.table_frame.grid_columnconfigure(col, weight=1, minsize=column_widths[col])
+        # Sütun Başlıkları (sadece bir kez oluşturulur)
+        if not self.table_header_built:
+            for col, header in enumerate(TABLE_HEADERS):
+                ttk.Label(self.table_frame, text=self.current_lang.get(header, header), style="Header.TLabel", width=TABLE_COLUMN_WIDTHS[col]//10).grid(
+                    row=0, column=col, sticky="nsew"
+                )
+                self.table_frame.grid_columnconfigure(col, weight=1, minsize=TABLE_COLUMN_WIDTHS[col])
+            self.table_header_built = True
 
         # Giriş Satırları
         for i, row_data in enumerate(self.stackup_data):
             # row_data: [Name (0), Class (1), Thickness (2), Dk (3), Layer_Type (4)]
-            layer_name = row_data[0]
-            layer_class = row_data[1] 
-            layer_type = row_data[4] 
-            style_name = self.get_color_style_by_type(layer_type, layer_name)
-            
-            # --- 0. Layer Number ---
-            cell_0 = ttk.Label(self.table_frame, text=f"{i+1:02d}", style=style_name, anchor="center")
-            cell_0.grid(row=i+1, column=0, sticky="nsew", padx=0, pady=0)
-            
-            row_vars = []
-            
-            # --- 1. Katman Adı (Düzenlenebilir Entry) ---
-            var_name = tk.StringVar(value=layer_name)
-            entry_name = ttk.Entry(self.table_frame, textvariable=var_name, width=column_widths[1]//10)
-            entry_name.grid(row=i+1, column=1, sticky="nsew", padx=1, pady=1)
-            
-            # Copper Layer Name rengi her zaman siyah
-            if layer_type == "Copper":
-                 entry_name.config(background=COLOR_COPPER, foreground=COLOR_TEXT_DARK)
+            record = self.table_rows[i] if i < len(self.table_rows) else None
+
+            if record is not None and record["type"] == row_data[4]:
+                self.update_table_row(record, row_data)
             else:
-                 entry_name.config(background='white', foreground='black')
+                if record is not None:
+                    for widget in record["widgets"]:
+                        widget.destroy()
+                record = self.create_table_row(i, row_data)
+                if i < len(self.table_rows):
+                    self.table_rows[i] = record
+                else:
+                    self.table_rows.append(record)
 
-            row_vars.append(var_name)
+        # Fazla satırlar havuzda gizli tutulur
+        for record in self.table_rows[len(self.stackup_data):]:
+            if record["visible"]:
+                for widget in record["widgets"]:
+                    widget.grid_remove()
+                record["visible"] = False
 
-            # --- 2. Sınıf (Combobox/Entry) ---
-            if layer_type == "Copper":
-                var_class = tk.StringVar(value=layer_class)
-                combo_values = ["Signal", "Plane"] 
-                
-                combo_class = ttk.Combobox(self.table_frame, 
-                                          textvariable=var_class, 
-                                          values=combo_values, 
-                                          state="readonly", 
-                                          width=column_widths[2]//10)
-                combo_class.grid(row=i+1, column=2, sticky="nsew", padx=1, pady=1)
-                
-                if layer_type == "Copper":
-                    combo_class.config(background=COLOR_COPPER, foreground=COLOR_TEXT_DARK)
-                
-                row_vars.append(var_class)
-            elif layer_type in ["Prepreg", "Core"]:
-                var_class = tk.StringVar(value=layer_class)
-                combo_class = ttk.Combobox(self.table_frame, 
-                                          textvariable=var_class, 
-                                          values=["Core", "Prepreg"], 
-                                          state="readonly", 
-                                          width=column_widths[2]//10)
-                combo_class.grid(row=i+1, column=2, sticky="nsew", padx=1, pady=1)
-                row_vars.append(var_class)
-            else:
-                cell_2 = ttk.Label(self.table_frame, text=layer_class, style=style_name, anchor="w")
-                cell_2.grid(row=i+1, column=2, sticky="nsew", padx=0, pady=0)
-                row_vars.append(tk.StringVar(value=layer_class))
-
-            # --- 3. Thickness (Sadece Float/Virgüllü Sayı) ---
-            var_thickness = tk.StringVar(value=row_data[2])
-            entry_thickness = ttk.Entry(self.table_frame, textvariable=var_thickness, width=column_widths[3]//10, 
-                                        validate='key', validatecommand=self.vcmd_float)
-            entry_thickness.grid(row=i+1, column=3, sticky="nsew", padx=1, pady=1)
-            
-            if layer_type == "Copper":
-                 entry_thickness.config(background=COLOR_COPPER, foreground=COLOR_TEXT_DARK)
-            else:
-                 entry_thickness.config(background='white', foreground='black') 
-                 
-            row_vars.append(var_thickness)
-            
-            var_thickness.trace_add('write', self.update_total_thickness) 
-            
-            # --- 4. Dk (Er) (Sadece Dielektrikler için Float/Virgüllü Sayı) ---
-            if layer_type in ["Prepreg", "Core", "Solder Mask"]:
-                var_dk = tk.StringVar(value=row_data[3])
-                entry_dk = ttk.Entry(self.table_frame, textvariable=var_dk, width=column_widths[4]//10,
-                                      validate='key', validatecommand=self.vcmd_float)
-                entry_dk.grid(row=i+1, column=4, sticky="nsew", padx=1, pady=1)
-                
-                # *** DÜZELTME: Metin rengi, arka plan ne olursa olsun siyah yapılmalı. ***
-                fg_color = COLOR_TEXT_DARK
-                bg_color = COLOR_SOLDER_MASK if layer_type == "Solder Mask" else (COLOR_CORE if layer_type == "Core" else COLOR_PREPREG)
-                
-                entry_dk.config(background=bg_color, foreground=fg_color)
-                
-                row_vars.append(var_dk)
-            else:
-                cell_4 = ttk.Label(self.table_frame, text="", background=COLOR_COPPER)
-                cell_4.grid(row=i+1, column=4, sticky="nsew", padx=0, pady=0)
-                row_vars.append(tk.StringVar(value="")) 
-            
-            self.entry_vars.append(row_vars)
+        self.entry_vars = [record["vars"] for record in self.table_rows[:len(self.stackup_data)]]
+        self.table_updating = False
 
         self.update_total_thickness() 
+        self.schedule_live_update(all_rows=True)
         
         signal_layer_names = [item[0] for item in self.stackup_data if item[1] == "Signal"]
         
@@ -695,6 +4862,128 @@ class ImpedanceCalculatorApp:
                 self.selected_layer.set("")
                 
 
+    def create_table_row(self, i, row_data):
+        """Tablonun i. satırı için widget'ları ve StringVar'ları oluşturur."""
+        column_widths = TABLE_COLUMN_WIDTHS
+        layer_name = row_data[0]
+        layer_class = row_data[1] 
+        layer_type = row_data[4] 
+        style_name = self.get_color_style_by_type(layer_type, layer_name)
+        widgets = []
+        class_label = None
+        
+        # --- 0. Layer Number ---
+        cell_0 = ttk.Label(self.table_frame, text=f"{i+1:02d}", style=style_name, anchor="center")
+        cell_0.grid(row=i+1, column=0, sticky="nsew", padx=0, pady=0)
+        widgets.append(cell_0)
+        
+        row_vars = []
+        
+        # --- 1. Katman Adı (Düzenlenebilir Entry) ---
+        var_name = tk.StringVar(value=layer_name)
+        entry_name = ttk.Entry(self.table_frame, textvariable=var_name, width=column_widths[1]//10)
+        entry_name.grid(row=i+1, column=1, sticky="nsew", padx=1, pady=1)
+        widgets.append(entry_name)
+        
+        # Copper Layer Name rengi her zaman siyah
+        if layer_type == "Copper":
+             entry_name.config(background=COLOR_COPPER, foreground=COLOR_TEXT_DARK)
+        else:
+             entry_name.config(background='white', foreground='black')
+
+        row_vars.append(var_name)
+
+        # --- 2. Sınıf (Combobox/Entry) ---
+        if layer_type == "Copper":
+            var_class = tk.StringVar(value=layer_class)
+            combo_values = ["Signal", "Plane"] 
+            
+            combo_class = ttk.Combobox(self.table_frame, 
+                                      textvariable=var_class, 
+                                      values=combo_values, 
+                                      state="readonly", 
+                                      width=column_widths[2]//10)
+            combo_class.grid(row=i+1, column=2, sticky="nsew", padx=1, pady=1)
+            widgets.append(combo_class)
+            
+            if layer_type == "Copper":
+                combo_class.config(background=COLOR_COPPER, foreground=COLOR_TEXT_DARK)
+            
+            row_vars.append(var_class)
+        elif layer_type in ["Prepreg", "Core"]:
+            var_class = tk.StringVar(value=layer_class)
+            combo_class = ttk.Combobox(self.table_frame, 
+                                      textvariable=var_class, 
+                                      values=["Core", "Prepreg"], 
+                                      state="readonly", 
+                                      width=column_widths[2]//10)
+            combo_class.grid(row=i+1, column=2, sticky="nsew", padx=1, pady=1)
+            widgets.append(combo_class)
+            row_vars.append(var_class)
+        else:
+            cell_2 = ttk.Label(self.table_frame, text=layer_class, style=style_name, anchor="w")
+            cell_2.grid(row=i+1, column=2, sticky="nsew", padx=0, pady=0)
+            widgets.append(cell_2)
+            class_label = cell_2
+            row_vars.append(tk.StringVar(value=layer_class))
+
+        # --- 3. Thickness (Sadece Float/Virgüllü Sayı) ---
+        var_thickness = tk.StringVar(value=row_data[2])
+        entry_thickness = ttk.Entry(self.table_frame, textvariable=var_thickness, width=column_widths[3]//10, 
+                                    validate='key', validatecommand=self.vcmd_float)
+        entry_thickness.grid(row=i+1, column=3, sticky="nsew", padx=1, pady=1)
+        widgets.append(entry_thickness)
+        
+        if layer_type == "Copper":
+             entry_thickness.config(background=COLOR_COPPER, foreground=COLOR_TEXT_DARK)
+        else:
+             entry_thickness.config(background='white', foreground='black') 
+             
+        row_vars.append(var_thickness)
+        
+        var_thickness.trace_add('write', self.update_total_thickness) 
+        
+        # --- 4. Dk (Er) (Sadece Dielektrikler için Float/Virgüllü Sayı) ---
+        if layer_type in ["Prepreg", "Core", "Solder Mask"]:
+            var_dk = tk.StringVar(value=row_data[3])
+            entry_dk = ttk.Entry(self.table_frame, textvariable=var_dk, width=column_widths[4]//10,
+                                  validate='key', validatecommand=self.vcmd_float)
+            entry_dk.grid(row=i+1, column=4, sticky="nsew", padx=1, pady=1)
+            widgets.append(entry_dk)
+            
+            # *** DÜZELTME: Metin rengi, arka plan ne olursa olsun siyah yapılmalı. ***
+            fg_color = COLOR_TEXT_DARK
+            bg_color = COLOR_SOLDER_MASK if layer_type == "Solder Mask" else (COLOR_CORE if layer_type == "Core" else COLOR_PREPREG)
+            
+            entry_dk.config(background=bg_color, foreground=fg_color)
+            
+            row_vars.append(var_dk)
+        else:
+            cell_4 = ttk.Label(self.table_frame, text="", background=COLOR_COPPER)
+            cell_4.grid(row=i+1, column=4, sticky="nsew", padx=0, pady=0)
+            widgets.append(cell_4)
+            row_vars.append(tk.StringVar(value="")) 
+        
+        for var in row_vars:
+            var.trace_add('write', lambda *args, index=i: self.on_row_edited(index))
+
+        return {"type": layer_type, "widgets": widgets, "vars": row_vars, "class_label": class_label, "visible": True}
+
+    def update_table_row(self, record, row_data):
+        """Havuzdaki satırı yeniden kullanır: gizliyse gösterir, sadece farklı olan değerleri yazar."""
+        if not record["visible"]:
+            for widget in record["widgets"]:
+                widget.grid()
+            record["visible"] = True
+
+        values = [row_data[0], row_data[1], row_data[2], row_data[3] if row_data[4] in DIELECTRIC_TYPES else ""]
+        for var, value in zip(record["vars"], values):
+            if var.get() != value:
+                var.set(value)
+
+        if record["class_label"] is not None and record["class_label"].cget("text") != row_data[1]:
+            record["class_label"].config(text=row_data[1])
+
     def setup_calculation_tab(self, frame):
         calc_content_frame = ttk.Frame(frame, padding="10")
         calc_content_frame.pack(fill="both", expand=True)
@@ -767,7 +5056,41 @@ class ImpedanceCalculatorApp:
                                                  width=20)
         self.layer_select_combobox.pack(side='left', padx=5)
 
+        ttk.Label(control_frame, text=self.current_lang["CALC_MODEL"]).pack(side='left', padx=5)
+        ttk.Combobox(control_frame, 
+                     textvariable=self.impedance_model, 
+                     values=IMPEDANCE_MODELS, 
+                     state="readonly", 
+                     width=8).pack(side='left', padx=5)
+
         ttk.Button(control_frame, text=self.current_lang["CALC_BUTTON"], command=self.calculate_impedance).pack(side='right', padx=5)
+        ttk.Checkbutton(control_frame, text=self.current_lang["LIVE_MODE"], variable=self.live_mode_var).pack(side='right', padx=5)
+
+        # Sentez Kontrolleri (Hedef Zdiff için W veya Gap bulma)
+        synth_frame = ttk.Frame(calc_content_frame)
+        synth_frame.pack(pady=(0, 10), fill='x', padx=10)
+
+        ttk.Label(synth_frame, text=self.current_lang["SYNTH_FOR"]).pack(side='left', padx=5)
+        ttk.Combobox(synth_frame, 
+                     textvariable=self.synth_variable, 
+                     values=["W", "Gap"], 
+                     state="readonly", 
+                     width=6).pack(side='left', padx=5)
+        ttk.Button(synth_frame, text=self.current_lang["SYNTH_BUTTON"], command=self.synthesize_all_layers).pack(side='right', padx=5)
+        ttk.Button(synth_frame, text=self.current_lang["SWEEP_BUTTON"], command=self.run_parameter_sweep).pack(side='right', padx=5)
+        ttk.Button(synth_frame, text=self.current_lang["MC_BUTTON"], command=self.run_yield_analysis).pack(side='right', padx=5)
+        ttk.Button(synth_frame, text=self.current_lang["LOSS_BUTTON"], command=self.run_loss_export).pack(side='right', padx=5)
+
+        # Kaydırıcılar (W, Gap, S) - Zdiff, katmanın saklanan T/H/Er değerleriyle doğrudan calculate_zdiff'ten hesaplanır
+        slider_frame = ttk.LabelFrame(calc_content_frame, text=self.current_lang["GROUP_SLIDERS"])
+        slider_frame.pack(padx=10, pady=5, fill="x")
+
+        slider_ranges = [(self.current_lang["LABEL_W"], 0.02, 1.5), (self.current_lang["LABEL_GAP"], 0.02, 1.5), (self.current_lang["LABEL_S"], 0.05, 3.0)]
+        for i, ((label_text, low, high), var) in enumerate(zip(slider_ranges, self.slider_vars)):
+            ttk.Label(slider_frame, text=label_text).grid(row=i, column=0, padx=5, pady=2, sticky="w")
+            ttk.Scale(slider_frame, from_=low, to=high, variable=var, orient="horizontal", command=self.on_slider_moved).grid(row=i, column=1, padx=5, pady=2, sticky="ew")
+        ttk.Label(slider_frame, textvariable=self.slider_zdiff_var, font=('Arial', 10, 'bold')).grid(row=0, column=2, rowspan=3, padx=10, sticky="w")
+        slider_frame.grid_columnconfigure(1, weight=1)
 
         # Sonuç Alanı
         result_frame = ttk.LabelFrame(calc_content_frame, text=self.current_lang["GROUP_RESULTS"])
@@ -793,27 +5116,36 @@ class ImpedanceCalculatorApp:
         ttk.Label(result_frame, textvariable=self.model_info, wraplength=200).grid(row=4, column=1, columnspan=2, padx=5, pady=5, sticky="w")
         ttk.Label(result_frame, text=self.current_lang["LABEL_CPWG"]).grid(row=5, column=0, padx=5, pady=5, sticky="w")
         ttk.Label(result_frame, textvariable=self.cpwg_info, wraplength=200).grid(row=5, column=1, columnspan=2, padx=5, pady=5, sticky="w")
+        ttk.Label(result_frame, text=self.current_lang["LABEL_CACHE"]).grid(row=6, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(result_frame, textvariable=self.cache_stats_var).grid(row=6, column=1, columnspan=2, padx=5, pady=5, sticky="w")
+
+        # Canlı Sonuç Tablosu (tüm sinyal katmanları)
+        live_frame = ttk.LabelFrame(calc_content_frame, text=self.current_lang["GROUP_LIVE"])
+        live_frame.pack(padx=10, pady=5, fill="both", expand=True)
+
+        columns = ("layer", "zdiff", "H", "Er", "status")
+        self.live_tree = ttk.Treeview(live_frame, columns=columns, show="headings", height=5)
+        headings = [self.current_lang["COL_NAME"], f"Zdiff ({self.current_lang['OHMS']})", "H (mm)", "Er", self.current_lang["LABEL_STATUS"].split(':')[0]]
+        for column, heading in zip(columns, headings):
+            self.live_tree.heading(column, text=heading)
+            self.live_tree.column(column, width=300 if column == "status" else 100, anchor="w" if column in ("layer", "status") else "center")
+        self.live_tree.tag_configure("pass", foreground="green")
+        self.live_tree.tag_configure("fail", foreground="red")
+        self.live_tree.pack(fill="both", expand=True, padx=5, pady=5)
         
     def setup_standards_tab(self, frame):
         """Üçüncü sekme için standart empedans tablosunu oluşturur."""
         
-        # Standart Veriler MESSAGES'tan çekiliyor
+        # Standart Veriler STANDARD_IMPEDANCES ve MESSAGES'tan çekiliyor
         standards_data = [
             (self.current_lang["STD_INTERFACE"], self.current_lang["STD_NOMINAL_Z"], self.current_lang["STD_TOLERANCE"], self.current_lang["STD_NOTES"]),
-            ("PCI Express (PCIe, Gen1-6)", "100 (or 85 for Gen2+)", "10", self.current_lang["NOTE_PCIE"]),
-            ("Ethernet (1000BASE-T)", "100", "10", self.current_lang["NOTE_ETH"]),
-            ("USB 2.0", "90", "15", self.current_lang["NOTE_USB2"]),
-            ("USB 3.0 / 3.x", "90", "10-15", self.current_lang["NOTE_USB3"]),
-            ("CAN Bus", "120", "10-20", self.current_lang["NOTE_CAN"]),
-            ("RS-485", "120", "20", self.current_lang["NOTE_RS485"]),
-            ("RS-422", "100-120", "20", self.current_lang["NOTE_RS422"]),
-            ("LVDS", "100", "10", self.current_lang["NOTE_LVDS"]),
-            ("HDMI", "100", "10", self.current_lang["NOTE_HDMI"]),
-            ("EtherCAT", "100", "10", self.current_lang["NOTE_ETHCAT"]),
-            ("MIL-STD-1553", "78", "10", self.current_lang["NOTE_MIL"]),
-            ("Profibus DP", "150", "10-20", self.current_lang["NOTE_PROFIBUS"]),
-        ]
+        ] + [(interface, nominal, tolerance, self.current_lang[note_key]) for interface, nominal, tolerance, note_key, _ in STANDARD_IMPEDANCES]
         
+        standards_controls = ttk.Frame(frame, padding=(10, 10, 10, 0))
+        standards_controls.pack(fill="x")
+        ttk.Button(standards_controls, text=self.current_lang["AUDIT_BUTTON"], command=self.audit_kicad_board).pack(side='right', padx=5)
+        ttk.Button(standards_controls, text=self.current_lang["STD_CHECK_ALL"], command=self.check_all_standards).pack(side='right', padx=5)
+
         container = ttk.Frame(frame, padding="10")
         container.pack(fill="both", expand=True)
 
@@ -829,142 +5161,108 @@ class ImpedanceCalculatorApp:
             container.grid_columnconfigure(j, weight=3 if j == 3 else 1)
 
 
-    def get_float_or_error(self, var_name, var_value, can_be_zero=False):
-        """String değeri float'a çevirir ve sıfırdan küçük/eşit olma durumunu kontrol eder."""
+    def check_all_standards(self):
+        """Tüm standart arayüzleri tüm sinyal katmanlarında mevcut W/Gap/S ile tek geçişte denetler."""
         try:
-            # Gerekirse virgülü noktaya çevir (Hem 0.15 hem 0,15 kabul edilir)
-            value = float(str(var_value).replace(',', '.')) 
-            if not can_be_zero and value <= 0:
-                 raise ValueError(f"'{var_name}' must be greater than zero.")
-            return value
-        except ValueError:
-            raise ValueError(f"Please enter a valid numeric value for '{var_name}' (e.g., 0.15 or 0,15).")
+            self.update_stackup_data()
+            matrix = Solver(self.current_stackup(), self.impedance_cache).compliance_matrix(self.W_var.get(), self.Gap_var.get(), self.S_var.get())
+        except ValueError as e:
+            messagebox.showerror(self.current_lang["ERROR_INPUT"], f"{self.current_lang['ERROR_INPUT']}: {e}")
+            return
+        except Exception as e:
+            messagebox.showerror(self.current_lang["ERROR_CALC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+            return
+        self.show_compliance_matrix(matrix)
 
-    # YARDIMCI FONKSİYON: Bitişik Plane'i ve Dielektrikleri Bulma (KESİN KURAL SETİ)
-    def find_nearest_plane_and_dielectric(self, signal_index):
-        
-        stackup_len = len(self.stackup_data)
-        
-        def get_dielectric_properties_to_plane(start_index, end_index, step):
-            """Belirtilen indeksten başlayıp Plane'e kadar olan dielektrik özelliklerini hesaplar."""
-            total_H = 0.0
-            weighted_H_sum = 0.0
-            
-            # Start/end/step değerlerini Python'ın range() fonksiyonu ile uyumlu hale getir
-            layer_indices = range(start_index, end_index + step, step) # step 1 veya -1 olabilir
-            
-            for i in layer_indices:
-                item = self.stackup_data[i]
-                
-                if item[4] in ["Prepreg", "Core", "Solder Mask"]:
-                    try:
-                        thickness = self.get_float_or_error("", self.entry_vars[i][2].get(), can_be_zero=True)
-                        er = self.get_float_or_error("", self.entry_vars[i][3].get(), can_be_zero=True)
-                        
-                        if thickness <= 0 or er <= 0:
-                            raise ValueError 
-                            
-                        total_H += thickness
-                        weighted_H_sum += thickness * er
-                    except ValueError:
-                        raise Exception(f"{self.current_lang['COL_THICKNESS']}/{self.current_lang['COL_DK']} value for layer ({item[0]}) is invalid or zero/negative.")
-                elif item[1] == "Signal":
-                     # Hata mesajı İngilizce
-                     raise Exception(f"Another signal layer ({item[0]}) found between signal layer ({self.stackup_data[signal_index][0]}) and the Plane. Stackup error!")
-            
-            if total_H == 0:
-                return 0.0, 1.0 
-                
-            final_Er = weighted_H_sum / total_H
-            return total_H, final_Er
+    def show_compliance_matrix(self, matrix):
+        window = tk.Toplevel(self.master)
+        window.title(self.current_lang["STD_MATRIX_TITLE"].format(W=matrix.W, Gap=matrix.Gap, S=matrix.S))
+
+        grid = ttk.Frame(window, padding="10")
+        grid.pack(fill="both", expand=True)
+        ttk.Label(grid, text=self.current_lang["STD_INTERFACE"], style="StandardHeader.TLabel").grid(row=0, column=0, sticky="nsew", padx=1, pady=1)
+        for j, layer_name in enumerate(matrix.layers, start=1):
+            # Katman başlığı: ad ve mevcut W/Gap ile Zdiff (ya da katman hatası)
+            zdiff = matrix.zdiff[j - 1]
+            detail = f"{zdiff:.2f} {self.current_lang['OHMS']}" if zdiff is not None else self.current_lang["ERROR_CALC"]
+            ttk.Label(grid, text=f"{layer_name}\n{detail}", style="StandardHeader.TLabel", wraplength=110).grid(row=0, column=j, sticky="nsew", padx=1, pady=1)
+
+        for i, interface in enumerate(matrix.interfaces):
+            ttk.Label(grid, text=f"{interface}\n{matrix.targets[i]:g} {self.current_lang['OHMS']} ± {matrix.tolerances[i]:g} %",
+                      style="StandardCell.TLabel", wraplength=180).grid(row=i + 1, column=0, sticky="nsew", padx=1, pady=1)
+            for j, layer_name in enumerate(matrix.layers):
+                if layer_name in matrix.errors:
+                    text, style = matrix.errors[layer_name], "MatrixUnreachable.TLabel"
+                else:
+                    status = self.current_lang["STD_MATRIX_PASS"] if matrix.passed[i][j] else self.current_lang["STD_MATRIX_FAIL"]
+                    required = matrix.required_W[i][j]
+                    text = f"{status}\n" + (f"W {required:.4f}" if required is not None else self.current_lang["STD_MATRIX_UNREACHABLE"])
+                    style = "MatrixPass.TLabel" if matrix.passed[i][j] else ("MatrixFail.TLabel" if required is not None else "MatrixUnreachable.TLabel")
+                ttk.Label(grid, text=text, style=style, wraplength=110).grid(row=i + 1, column=j + 1, sticky="nsew", padx=1, pady=1)
+
+        ttk.Label(window, text=self.current_lang["STD_MATRIX_HINT"], style="Designer.TLabel").pack(anchor="w", padx=10, pady=(0, 10))
+
+    def audit_kicad_board(self):
+        """Bir .kicad_pcb dosyasındaki tüm diferansiyel çiftleri kartın kendi stackup'ıyla denetler."""
+        try:
+            filepath = filedialog.askopenfilename(
+                defaultextension=".kicad_pcb",
+                filetypes=[("KiCad PCB files", "*.kicad_pcb")],
+                title=self.current_lang["AUDIT_TITLE"]
+            )
+            if not filepath:
+                return
 
+            Target_Z0 = get_float_or_error(self.current_lang["LABEL_Z0_TARGET"].split(':')[0], self.target_zdiff_var.get())
+            Tolerance_P = get_float_or_error(self.current_lang["LABEL_TOLERANCE"].split(':')[0], self.tolerance_percent_var.get(), can_be_zero=True)
+        except ValueError as e:
+            messagebox.showerror(self.current_lang["ERROR_INPUT"], f"{self.current_lang['ERROR_INPUT']}: {e}")
+            return
+        S = self.S_var.get()
 
-        is_top_layer = (self.stackup_data[signal_index][0] == "1. Top Layer")
-        is_bottom_layer = (self.stackup_data[signal_index][0].endswith("Bottom Layer"))
+        def work(job):
+            return audit_kicad_board(filepath, S, Target_Z0, Tolerance_P, cache=self.impedance_cache, progress=job.report, store=self.result_store)
 
-        
-        # --- ARAMA YÖNLERİ ---
-        
-        # 1. AŞAĞI YÖNDE ARAMA (Lower Plane)
-        down_plane_index = -1
-        current_index = signal_index + 1
-        while current_index < stackup_len:
-            if self.stackup_data[current_index][1] == "Plane":
-                down_plane_index = current_index
-                break
-            if self.stackup_data[current_index][4] == "Copper" and self.stackup_data[current_index][1] != "Plane":
-                 # Aşağıdaki katman bakır ama Plane değilse dur
-                 break 
-            current_index += 1
-        
-        H_down, Er_down, ref_down = (float('inf'), 0.0, None)
+        def done(audit):
+            results, stats = audit
+            if not results:
+                messagebox.showinfo(self.current_lang["AUDIT_TITLE"], self.current_lang["AUDIT_NO_PAIRS"])
+                return
+            self.show_audit_results(filepath, results, stats)
 
-        if down_plane_index != -1:
-            try:
-                H_down, Er_down = get_dielectric_properties_to_plane(signal_index + 1, down_plane_index, 1) # Dielektrikleri al
-                ref_down = self.stackup_data[down_plane_index][0]
-            except Exception as e:
-                raise e
+        self.jobs.submit("audit", self.current_lang["AUDIT_TITLE"], work, done, self.show_job_error)
 
+    def show_audit_results(self, filepath, results, stats):
+        window = tk.Toplevel(self.master)
+        window.title(f"{self.current_lang['AUDIT_TITLE']} - {filepath}")
 
-        # 2. YUKARI YÖNDE ARAMA (Upper Plane)
-        up_plane_index = -1
-        current_index = signal_index - 1
-        while current_index >= 0:
-            if self.stackup_data[current_index][1] == "Plane":
-                up_plane_index = current_index
-                break
-            if self.stackup_data[current_index][4] == "Copper" and self.stackup_data[current_index][1] != "Plane":
-                 # Yukarıdaki katman bakır ama Plane değilse dur
-                 break
-            current_index -= 1
-        
-        H_up, Er_up, ref_up = (float('inf'), 0.0, None)
+        ttk.Label(window, text=self.current_lang["AUDIT_SUMMARY"].format(**stats)).pack(padx=10, pady=(10, 0), anchor="w")
 
-        if up_plane_index != -1:
-            try:
-                H_up, Er_up = get_dielectric_properties_to_plane(signal_index - 1, up_plane_index, -1) # Dielektrikleri al
-                ref_up = self.stackup_data[up_plane_index][0]
-            except Exception as e:
-                raise e
-        
-        
-        # --- KARAR VERME: HANGİ PLANE KULLANILACAK? ---
-        
-        if is_top_layer:
-            if down_plane_index != -1 and H_down > 0:
-                return H_down, Er_down, ref_down
-            else:
-                raise Exception("No 'Plane' layer found immediately below the Top Layer. Stackup error!")
-                
-        elif is_bottom_layer:
-            if up_plane_index != -1 and H_up > 0:
-                return H_up, Er_up, ref_up
-            else:
-                raise Exception("No 'Plane' layer found immediately above the Bottom Layer. Stackup error!")
+        columns = ("pair", "interface", "layer", "W", "Gap", "zdiff", "target", "status")
+        tree = ttk.Treeview(window, columns=columns, show="headings", height=18)
+        headings = ["Pair", self.current_lang["STD_INTERFACE"], self.current_lang["COL_NAME"], "W (mm)", "Gap (mm)",
+                    f"Zdiff ({self.current_lang['OHMS']})", "Target", self.current_lang["LABEL_STATUS"].split(':')[0]]
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=200 if column in ("pair", "interface", "status") else 90, anchor="w" if column in ("pair", "interface", "layer", "status") else "center")
+        tree.tag_configure("pass", foreground="green")
+        tree.tag_configure("fail", foreground="red")
 
-        else:
-            down_available = H_down != float('inf') and H_down > 0
-            up_available = H_up != float('inf') and H_up > 0
+        # Hatalı çiftler listenin başında gösterilir
+        for result in sorted(results, key=lambda result: result.passed):
+            status = self.current_lang["STATUS_OK"] if result.passed else (result.error or self.current_lang["STATUS_FAIL"])
+            zdiff = f"{result.zdiff:.2f}" if result.zdiff is not None else "ERROR"
+            tree.insert("", "end", values=(result.pair, result.interface, result.layer, f"{result.W:.4f}", f"{result.Gap:.4f}", zdiff,
+                                           f"{result.lower:.1f} - {result.upper:.1f}", status),
+                        tags=("pass" if result.passed else "fail",))
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
 
-            if not down_available and not up_available:
-                raise Exception(f"{self.stackup_data[signal_index][0]} (Inner Layer): No 'Plane' layer found above or below. Stackup error!")
-                
-            elif down_available and not up_available:
-                return H_down, Er_down, ref_down
-                
-            elif not down_available and up_available:
-                return H_up, Er_up, ref_up
-            
-            elif down_available and up_available:
-                # İki Plane de varsa, en yakını seçilir
-                if H_down <= H_up:
-                    return H_down, Er_down, ref_down
-                else:
-                    return H_up, Er_up, ref_up
-        
-        raise Exception("Unexpected error occurred during reference plane selection.")
+        def export():
+            export_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title=self.current_lang["AUDIT_EXPORT"])
+            if export_path:
+                write_audit_csv(export_path, results)
 
+        ttk.Button(window, text=self.current_lang["AUDIT_EXPORT"], command=export).pack(side='right', padx=10, pady=(0, 10))
 
     def calculate_impedance(self):
         if self.zdiff_result_label:
@@ -974,105 +5272,848 @@ class ImpedanceCalculatorApp:
             self.tolerance_status_var.set(self.current_lang["ERROR_CALC"])
             
         try:
+            self._calculate_impedance()
+        except ValueError as e:
+            messagebox.showerror(self.current_lang["ERROR_INPUT"], f"{self.current_lang['ERROR_INPUT']}: {e}")
+            self.Zdiff_result.set("ERROR")
+            self.model_info.set("---")
+            self.cpwg_info.set("---")
+            self.params_used.set("---")
+            self.tolerance_status_var.set(self.current_lang["ERROR_INPUT"])
+        except Exception as e:
+            messagebox.showerror(self.current_lang["ERROR_CALC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+            self.Zdiff_result.set("ERROR")
+            self.model_info.set("---")
+            self.cpwg_info.set("---")
+            self.params_used.set("---")
+            self.tolerance_status_var.set(self.current_lang["ERROR_CALC"])
+
+    @profiled("calculate")
+    def _calculate_impedance(self):
+        """Hesapla düğmesinin ölçülen kısmı; hatalar calculate_impedance'ta aşama kapandıktan sonra gösterilir."""
+        with self.profiler.stage("calculate.sync"):
             self.update_stackup_data() 
-            
-            selected_layer_name = self.selected_layer.get()
-            layer_index = -1
-            
-            for i, item in enumerate(self.stackup_data):
-                if item[0] == selected_layer_name: 
-                    layer_index = i
-                    break
-            
-            if layer_index == -1 or selected_layer_name == "":
-                raise Exception("Please select a valid Signal Layer for calculation.")
-                
-            if self.stackup_data[layer_index][1] != "Signal": 
-                raise Exception(f"{self.current_lang['ERROR_INPUT']}: Layer Class ('{self.stackup_data[layer_index][1]}') must be 'Signal'.")
+            stackup = self.current_stackup()
 
-            T_str = self.entry_vars[layer_index][2].get()
-            T = self.get_float_or_error(f"{selected_layer_name} {self.current_lang['COL_THICKNESS']} (T)", T_str)
+        selected_layer_name = self.selected_layer.get()
+        solver = Solver(stackup, self.impedance_cache, self.profiler)
 
-            H, Er, reference_plane_name = self.find_nearest_plane_and_dielectric(layer_index)
-            
-            if H <= 0 or Er <= 0:
-                # Hata mesajları İngilizce'ye çevrildi
-                raise Exception(f"{self.current_lang['ERROR_INPUT']}: {self.current_lang['COL_THICKNESS']} (H={H:.3f}) or Dk (Er={Er:.2f}) is zero or negative. Check stackup parameters.")
-            
-            W_input = self.get_float_or_error(self.current_lang["LABEL_W"].split(':')[0], self.W_var.get())
-            Gap_input = self.get_float_or_error(self.current_lang["LABEL_GAP"].split(':')[0], self.Gap_var.get())
-            S_input = self.get_float_or_error(self.current_lang["LABEL_S"].split(':')[0], self.S_var.get())
+        result = solver.solve(selected_layer_name, self.W_var.get(), self.Gap_var.get(), self.S_var.get(), self.impedance_model.get())
+
+        with self.profiler.stage("calculate.tolerance"):
+            Target_Z0 = get_float_or_error(self.current_lang["LABEL_Z0_TARGET"].split(':')[0], self.target_zdiff_var.get())
 
-            Target_Z0 = self.get_float_or_error(self.current_lang["LABEL_Z0_TARGET"].split(':')[0], self.target_zdiff_var.get())
-            
             Tolerance_P_str = self.tolerance_percent_var.get()
-            Tolerance_P = self.get_float_or_error(self.current_lang["LABEL_TOLERANCE"].split(':')[0], Tolerance_P_str, can_be_zero=True)
+            Tolerance_P = get_float_or_error(self.current_lang["LABEL_TOLERANCE"].split(':')[0], Tolerance_P_str, can_be_zero=True)
             if Tolerance_P < 0:
-                 raise ValueError(self.current_lang["LABEL_TOLERANCE"] + " percentage cannot be negative.")
+                raise ValueError(self.current_lang["LABEL_TOLERANCE"] + " percentage cannot be negative.")
+
+            Lower_Limit, Upper_Limit = Solver.tolerance_limits(Target_Z0, Tolerance_P)
+            self.show_result(result, Lower_Limit, Upper_Limit)
+
+        self.store_results(stackup, self.W_var.get(), self.Gap_var.get(), self.S_var.get(), [result], Target_Z0, Tolerance_P)
 
 
-            WH_ratio = W_input / H
-            # Metin oluşturma işlemi İngilizce olarak ayarlandı
-            model_base = self.current_lang['LABEL_MODEL'].split(':')[0]
-            model_used = f"{model_base}: Reference Plane is {reference_plane_name}. Model: "
-            cpwg_note = self.current_lang["CPWG_IGNORED"]
+    def show_result(self, result, Lower_Limit, Upper_Limit):
+        """Tek katman sonucunu Sonuç alanına yazar."""
+        Zdiff_result = result.zdiff
+
+        self.Zdiff_result.set(f"{Zdiff_result:.2f}")
+
+        if Lower_Limit <= Zdiff_result <= Upper_Limit:
+            result_color = "green"
+            status_text = f"{self.current_lang['STATUS_OK']} (Target range: {Lower_Limit:.2f}Ω - {Upper_Limit:.2f}Ω)"
+            status_color = "green"
+        else:
+            result_color = "red"
+            status_text = f"{self.current_lang['STATUS_FAIL']} (Target range: {Lower_Limit:.2f}Ω - {Upper_Limit:.2f}Ω)"
+            status_color = "red"
             
-            if WH_ratio >= 1.0:
-                model_used += f"Regime 1: WIDE Trace (W/H={WH_ratio:.2f}) - 'Best-Fit' Formula"
-                Zdiff_result = calculate_wide_traces(W_input, Gap_input, T, H, Er)
+        self.zdiff_result_label.config(foreground=result_color)
+        self.tolerance_status_var.set(status_text)
+        self.status_label.config(foreground=status_color)
+
+        self.model_info.set(describe_model(result))
+        self.cpwg_info.set(describe_cpwg(result))
+        self.params_used.set(describe_params(result))
+        self.cache_stats_var.set(self.current_lang["CACHE_STATS"].format(**self.impedance_cache.stats()))
+
+    # --- Canlı Yeniden Hesaplama (Live Mode) ---
+
+    def on_live_mode_toggle(self, *args):
+        self.schedule_live_update(all_rows=True)
+
+    def on_row_edited(self, index):
+        if self.live_mode_var.get():
+            self.live_dirty_rows.add(index)
+            self.schedule_live_update()
+
+    def on_geometry_edited(self, *args):
+        # Geometri tüm katmanları etkiler
+        self.schedule_live_update(all_rows=True)
+
+        # Elle girilen değerler kaydırıcılara yansıtılır (DoubleVar.set kaydırıcı komutunu tetiklemez)
+        for var, slider_var in zip((self.W_var, self.Gap_var, self.S_var), self.slider_vars):
+            try:
+                slider_var.set(float(var.get().replace(',', '.')))
+            except ValueError:
+                pass
+
+    # --- Kaydırıcılar ---
+
+    def on_slider_moved(self, *args):
+        W, Gap, S = (var.get() for var in self.slider_vars)
+        for var, value in zip((self.W_var, self.Gap_var, self.S_var), (W, Gap, S)):
+            var.set(f"{value:.3f}")
+        self.update_slider_zdiff(W, Gap, S)
+
+    def update_slider_zdiff(self, W, Gap, S):
+        """Zdiff'i kapalı formülle hesaplar (~1 µs); katmanın T/H/Er değerleri stackup veya katman değişene kadar saklanır."""
+        layer_name = self.selected_layer.get()
+        try:
+            self.slider_stackup.set_rows([[row_vars[0].get().strip(), row_vars[1].get().strip(), row_vars[2].get().strip(), row_vars[3].get().strip(), row_data[4]]
+                                          for row_vars, row_data in zip(self.entry_vars, self.stackup_data)])
+            key = (self.slider_stackup.content_hash(), layer_name)
+            if key != self.slider_layer_key:
+                _, T, H, Er, _ = Solver(self.slider_stackup, self.impedance_cache).layer_parameters(layer_name)
+                self.slider_layer = (T, H, Er)
+                self.slider_layer_key = key
+        except Exception as e:
+            self.slider_layer_key = None
+            self.slider_zdiff_var.set(str(e))
+            return
+
+        T, H, Er = self.slider_layer
+        Zdiff = calculate_zdiff(W, Gap, S, T, H, Er)
+        self.slider_zdiff_var.set(self.current_lang["SLIDER_ZDIFF"].format(zdiff=Zdiff))
+
+    def schedule_live_update(self, all_rows=False):
+        """Değişiklikleri biriktirir; tek bir gecikmeli (debounce) karede işlenmesi için zamanlar."""
+        if not self.live_mode_var.get():
+            return
+        if all_rows:
+            self.live_dirty_all = True
+        if self.live_after_id is None:
+            self.live_after_id = self.master.after(LIVE_DEBOUNCE_MS, self.flush_live_update)
+
+    def flush_live_update(self):
+        """Sadece değişen satırları senkronize eder ve bu satırlara bağlı sinyal katmanlarını yeniden hesaplar."""
+        self.live_after_id = None
+        dirty_rows, dirty_all = self.live_dirty_rows, self.live_dirty_all
+        self.live_dirty_rows, self.live_dirty_all = set(), False
+        if not self.live_mode_var.get() or not self.live_tree:
+            return
+
+        # İzlenmeyen bir yoldan (katman sayısı, CSV) gelen değişiklik varsa tam yenileme yapılır
+        if self.stackup.set_rows(self.stackup_data):
+            dirty_all = True
+
+        changes = {}
+        for i in sorted(dirty_rows):
+            if i < len(self.entry_vars):
+                row = [var.get().strip() for var in self.entry_vars[i]] + [self.stackup_data[i][4]]
+                self.stackup_data[i][:4] = row[:4]
+                changes[i] = row
+
+        changed, topology_changed = self.stackup.update_rows(changes)
+        if topology_changed:
+            self.refresh_signal_layers()
+
+        index = self.stackup.plane_index()
+        if dirty_all or topology_changed:
+            affected = index.signal_indices
+            for item in self.live_tree.get_children():
+                self.live_tree.delete(item)
+            self.live_tree_items = {}
+        else:
+            affected = index.affected_signals(changed)
+
+        solver = Solver(self.stackup, self.impedance_cache)
+        try:
+            Target_Z0 = get_float_or_error(self.current_lang["LABEL_Z0_TARGET"].split(':')[0], self.target_zdiff_var.get())
+            Tolerance_P = get_float_or_error(self.current_lang["LABEL_TOLERANCE"].split(':')[0], self.tolerance_percent_var.get(), can_be_zero=True)
+            limits = Solver.tolerance_limits(Target_Z0, Tolerance_P)
+        except ValueError:
+            Target_Z0 = Tolerance_P = limits = None
+
+        solved = []
+        for signal_index in affected:
+            layer_name = self.stackup.rows[signal_index][0]
+            try:
+                result = solver.solve(layer_name, self.W_var.get(), self.Gap_var.get(), self.S_var.get())
+            except Exception as e:
+                values, tag = (layer_name, "ERROR", "---", "---", str(e)), "fail"
             else:
-                model_used += f"Regime 2: NARROW Trace (W/H={WH_ratio:.2f}) - 'Academic' Formula"
-                Zdiff_result = calculate_narrow_traces(W_input, Gap_input, T, H, Er)
-            
-            if S_input < H:
-                cpwg_note = self.current_lang["CPWG_APPLIED"]
-                coplanar_factor = math.pow(S_input / (S_input + 0.5 * W_input), 0.1)
-                Zdiff_result *= coplanar_factor
+                solved.append(result)
+                passed = limits is not None and limits[0] <= result.zdiff <= limits[1]
+                status = self.current_lang["STATUS_OK"] if passed else self.current_lang["STATUS_FAIL"]
+                values, tag = (layer_name, f"{result.zdiff:.2f}", f"{result.H:.3f}", f"{result.Er:.2f}", status), "pass" if passed else "fail"
+                if layer_name == self.selected_layer.get() and limits is not None:
+                    self.show_result(result, *limits)
 
-            self.Zdiff_result.set(f"{Zdiff_result:.2f}")
-            
-            Tolerance_Factor = Tolerance_P / 100.0
-            Lower_Limit = Target_Z0 * (1.0 - Tolerance_Factor)
-            Upper_Limit = Target_Z0 * (1.0 + Tolerance_Factor)
-
-            if Lower_Limit <= Zdiff_result <= Upper_Limit:
-                result_color = "green"
-                status_text = f"{self.current_lang['STATUS_OK']} (Target range: {Lower_Limit:.2f}Ω - {Upper_Limit:.2f}Ω)"
-                status_color = "green"
+            if signal_index in self.live_tree_items:
+                self.live_tree.item(self.live_tree_items[signal_index], values=values, tags=(tag,))
             else:
-                result_color = "red"
-                status_text = f"{self.current_lang['STATUS_FAIL']} (Target range: {Lower_Limit:.2f}Ω - {Upper_Limit:.2f}Ω)"
-                status_color = "red"
-                
-            self.zdiff_result_label.config(foreground=result_color)
-            self.tolerance_status_var.set(status_text)
-            self.status_label.config(foreground=status_color)
+                self.live_tree_items[signal_index] = self.live_tree.insert("", "end", values=values, tags=(tag,))
+
+        if solved:
+            self.store_results(self.stackup, self.W_var.get(), self.Gap_var.get(), self.S_var.get(), solved, Target_Z0, Tolerance_P)
+
+    def synthesize_all_layers(self):
+        """Tüm sinyal katmanları için hedef Zdiff'i sağlayan W (veya Gap) değerlerini bulur ve tablo olarak gösterir."""
+        self.update_stackup_data()
+        # İş parçacığı stackup'ın bir kopyasıyla çalışır; tablo düzenlemeleri hesabı etkilemez
+        solver = Solver(Stackup(self.current_stackup().rows))
+        inputs = (self.target_zdiff_var.get(), self.W_var.get(), self.Gap_var.get(), self.S_var.get())
+        solve_for = self.synth_variable.get()
+
+        self.jobs.submit("synthesize", self.current_lang["SYNTH_TITLE"],
+                         lambda job: solver.synthesize_all(*inputs, solve_for=solve_for, progress=lambda done, total: job.report(done / total)),
+                         self.show_synthesis_results, self.show_job_error)
+
+    def show_synthesis_results(self, results):
+        window = tk.Toplevel(self.master)
+        window.title(self.current_lang["SYNTH_TITLE"])
+
+        columns = ("layer", "W", "Gap", "zdiff", "status")
+        tree = ttk.Treeview(window, columns=columns, show="headings", height=min(len(results), 16))
+        headings = [self.current_lang["COL_NAME"], "W (mm)", "Gap (mm)", f"Zdiff ({self.current_lang['OHMS']})", self.current_lang["LABEL_STATUS"].split(':')[0]]
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=320 if column == "status" else 110, anchor="w" if column in ("layer", "status") else "center")
+        tree.tag_configure("fail", foreground="red")
+
+        for result in results:
+            status = self.current_lang["SYNTH_ACHIEVED"] if result.achieved else result.note
+            tree.insert("", "end", values=(result.layer, f"{result.W:.4f}", f"{result.Gap:.4f}", f"{result.zdiff:.2f}", status),
+                        tags=() if result.achieved else ("fail",))
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+
+    def ask_parameters(self, title, fields, hint=None):
+        """Basit modal form: fields = [(anahtar, etiket, varsayılan), ...]; bool varsayılan onay kutusu olur. İptalde None döndürür."""
+        window = tk.Toplevel(self.master)
+        window.title(title)
+        window.transient(self.master)
+
+        form = ttk.Frame(window, padding="10")
+        form.pack(fill="both", expand=True)
 
-            self.model_info.set(model_used)
-            self.cpwg_info.set(cpwg_note)
-            self.params_used.set(f"H={H:.3f} mm ({self.current_lang['MAP_H']}), T={T:.3f} mm, Er={Er:.2f} ({self.current_lang['MAP_ER']})")
+        field_vars = {}
+        for i, (key, label_text, default) in enumerate(fields):
+            if isinstance(default, bool):
+                field_vars[key] = tk.BooleanVar(value=default)
+                ttk.Checkbutton(form, text=label_text, variable=field_vars[key]).grid(row=i, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+                continue
+            ttk.Label(form, text=label_text).grid(row=i, column=0, padx=5, pady=5, sticky="w")
+            field_vars[key] = tk.StringVar(value=default)
+            ttk.Entry(form, textvariable=field_vars[key], width=30).grid(row=i, column=1, padx=5, pady=5, sticky="ew")
 
+        if hint:
+            ttk.Label(form, text=hint, style="Designer.TLabel").grid(row=len(fields), column=0, columnspan=2, sticky="w", pady=(5, 0))
+
+        answer = {}
+
+        def on_ok():
+            answer.update({key: var.get() for key, var in field_vars.items()})
+            window.destroy()
+
+        button_frame = ttk.Frame(form)
+        button_frame.grid(row=len(fields) + 1, column=0, columnspan=2, sticky="e", pady=(10, 0))
+        ttk.Button(button_frame, text=self.current_lang["DIALOG_OK"], command=on_ok).pack(side='right', padx=5)
+        ttk.Button(button_frame, text=self.current_lang["DIALOG_CANCEL"], command=window.destroy).pack(side='right', padx=5)
+
+        window.grab_set()
+        self.master.wait_window(window)
+        return answer or None
+
+    def run_parameter_sweep(self):
+        """W x Gap x S x katman taramasını çalıştırır ve sonuçları akış halinde CSV'ye yazar."""
+        answer = self.ask_parameters(self.current_lang["SWEEP_TITLE"], [
+            ("W", self.current_lang["LABEL_W"], self.W_var.get()),
+            ("Gap", self.current_lang["LABEL_GAP"], self.Gap_var.get()),
+            ("S", self.current_lang["LABEL_S"], self.S_var.get()),
+            ("layers", self.current_lang["SWEEP_LAYERS"], ""),
+            ("store", self.current_lang["SWEEP_STORE"], False),
+        ], hint=self.current_lang["SWEEP_HINT"])
+        if not answer:
+            return
+
+        try:
+            self.update_stackup_data()
+            W_values = parse_sweep_range(self.current_lang["LABEL_W"].split(':')[0], answer["W"])
+            Gap_values = parse_sweep_range(self.current_lang["LABEL_GAP"].split(':')[0], answer["Gap"])
+            S_values = parse_sweep_range(self.current_lang["LABEL_S"].split(':')[0], answer["S"])
+            layers = [name.strip() for name in answer["layers"].split(';') if name.strip()] or None
+
+            solver = Solver(Stackup(self.current_stackup().rows))
+            # İşçi havuzu ilk blokta kurulur; iş bitince (veya iptalde) kapatılır
+            executor = ParallelZdiffExecutor()
+            chunks = solver.sweep(W_values, Gap_values, S_values, layers=layers, executor=executor)
+            total_rows = len(W_values) * len(Gap_values) * len(S_values) * len(layers or solver.stackup.signal_layers())
+
+            filepath = filedialog.asksaveasfilename(
+                defaultextension=".csv",
+                filetypes=[("CSV files", "*.csv")],
+                title=self.current_lang["SWEEP_TITLE"]
+            )
+            if not filepath:
+                return
         except ValueError as e:
             messagebox.showerror(self.current_lang["ERROR_INPUT"], f"{self.current_lang['ERROR_INPUT']}: {e}")
-            self.Zdiff_result.set("ERROR")
-            self.model_info.set("---")
-            self.cpwg_info.set("---")
-            self.params_used.set("---")
-            self.tolerance_status_var.set(self.current_lang["ERROR_INPUT"])
+            return
         except Exception as e:
             messagebox.showerror(self.current_lang["ERROR_CALC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
-            self.Zdiff_result.set("ERROR")
-            self.model_info.set("---")
-            self.cpwg_info.set("---")
-            self.params_used.set("---")
-            self.tolerance_status_var.set(self.current_lang["ERROR_CALC"])
+            return
 
+        if answer["store"] and self.result_store is not None:
+            # İsteğe bağlı (satır başına ~4 kat yavaş); geçerli hedef varsa satırlar geçti/kaldı bilgisiyle kaydedilir
+            try:
+                Target_Z0 = get_float_or_error(self.current_lang["LABEL_Z0_TARGET"].split(':')[0], self.target_zdiff_var.get())
+                Tolerance_P = get_float_or_error(self.current_lang["LABEL_TOLERANCE"].split(':')[0], self.tolerance_percent_var.get(), can_be_zero=True)
+            except ValueError:
+                Target_Z0 = Tolerance_P = None
+            chunks = self.result_store.record_sweep(solver.stackup, chunks, Target_Z0, Tolerance_P)
 
-# Ana Pencereyi Oluşturma ve Uygulamayı Başlatma
-if __name__ == "__main__":
+        def work(job):
+            try:
+                return write_sweep_csv(filepath, chunks, progress=lambda rows: job.report(rows / total_rows)), executor.stats()
+            except JobCancelled:
+                # Yarım kalan dosya bırakılmaz
+                with contextlib.suppress(OSError):
+                    os.remove(filepath)
+                raise
+            finally:
+                # Tarama yarıda kalsa da paylaşımlı blok ve işçi havuzu hemen bırakılır
+                if hasattr(chunks, "close"):
+                    chunks.close()
+                executor.close()
+
+        def done(result):
+            row_count, stats = result
+            throughput = self.current_lang["PARALLEL_THROUGHPUT"].format(workers=stats.workers, rate=stats.points_per_second / 1e6)
+            messagebox.showinfo(self.current_lang["SWEEP_DONE"], f"{self.current_lang['SWEEP_DONE']}: {row_count} rows (CSV: {filepath}), {throughput}")
+
+        self.jobs.submit("sweep", self.current_lang["SWEEP_TITLE"], work, done, self.show_job_error)
+
+    def run_yield_analysis(self):
+        """Seçili katman için Monte Carlo verim analizini çalıştırır ve histogramı gösterir."""
+        answer = self.ask_parameters(self.current_lang["MC_TITLE"], [
+            ("samples", self.current_lang["MC_SAMPLES"] + ":", "100000"),
+            ("seed", self.current_lang["MC_SEED"], "0"),
+            ("sigma_W", self.current_lang["MC_SIGMA_W"], "0.01"),
+            ("sigma_thickness", self.current_lang["MC_SIGMA_THICKNESS"], "5.0"),
+            ("sigma_copper", self.current_lang["MC_SIGMA_COPPER"], "10.0"),
+            ("sigma_dk", self.current_lang["MC_SIGMA_DK"], "3.0"),
+        ], hint=self.current_lang["MC_HINT"])
+        if not answer:
+            return
+
+        try:
+            self.update_stackup_data()
+            solver = Solver(Stackup(self.current_stackup().rows))
+            args = (self.selected_layer.get(), self.W_var.get(), self.Gap_var.get(), self.S_var.get(),
+                    self.target_zdiff_var.get(), self.tolerance_percent_var.get())
+            options = dict(
+                samples=answer["samples"],
+                seed=int(get_float_or_error(self.current_lang["MC_SEED"].split(':')[0], answer["seed"], can_be_zero=True)),
+                sigma_W=get_float_or_error(self.current_lang["MC_SIGMA_W"].split(':')[0], answer["sigma_W"], can_be_zero=True),
+                sigma_thickness_percent=get_float_or_error(self.current_lang["MC_SIGMA_THICKNESS"].split(':')[0], answer["sigma_thickness"], can_be_zero=True),
+                sigma_copper_percent=get_float_or_error(self.current_lang["MC_SIGMA_COPPER"].split(':')[0], answer["sigma_copper"], can_be_zero=True),
+                sigma_dk_percent=get_float_or_error(self.current_lang["MC_SIGMA_DK"].split(':')[0], answer["sigma_dk"], can_be_zero=True),
+            )
+        except ValueError as e:
+            messagebox.showerror(self.current_lang["ERROR_INPUT"], f"{self.current_lang['ERROR_INPUT']}: {e}")
+            return
+
+        def work(job):
+            def progress(done, total, yield_percent):
+                job.report(done / total, f"{self.current_lang['MC_YIELD']} {yield_percent:.2f} %")
+            # Her iş kendi işçi havuzunu kullanır (aynı anda iki iş çalışabilir)
+            with ParallelZdiffExecutor() as executor:
+                return solver.monte_carlo_yield(*args, progress=progress, executor=executor, **options)
+
+        self.jobs.submit("yield", self.current_lang["MC_TITLE"], work, self.show_yield_result, self.show_job_error)
+
+    def run_loss_export(self):
+        """Seçili katmanın frekansa bağlı kaybını hesaplar ve SDD parametrelerini Touchstone dosyasına akış halinde yazar."""
+        answer = self.ask_parameters(self.current_lang["LOSS_TITLE"], [
+            ("length", self.current_lang["LOSS_LENGTH"], "100"),
+            ("start", self.current_lang["LOSS_START"], "10e6"),
+            ("stop", self.current_lang["LOSS_STOP"], "20e9"),
+            ("points", self.current_lang["LOSS_POINTS"], "10001"),
+            ("reference", self.current_lang["LOSS_REFERENCE"], "100"),
+            ("df", self.current_lang["LOSS_DF"], ""),
+            ("roughness", self.current_lang["LOSS_ROUGHNESS"], str(DEFAULT_ROUGHNESS_UM)),
+        ], hint=self.current_lang["LOSS_HINT"])
+        if not answer:
+            return
+
+        try:
+            self.update_stackup_data()
+            solver = Solver(Stackup(self.current_stackup().rows))
+            loss = LossParameters(
+                default_loss_tangent=get_float_or_error(self.current_lang["LOSS_DF"].split(':')[0], answer["df"], can_be_zero=True) if answer["df"].strip() else None,
+                default_roughness=get_float_or_error(self.current_lang["LOSS_ROUGHNESS"].split(':')[0], answer["roughness"], can_be_zero=True),
+            )
+            line = solver.line_model(self.selected_layer.get(), self.W_var.get(), self.Gap_var.get(), self.S_var.get(), loss)
+            args = (get_float_or_error(self.current_lang["LOSS_LENGTH"].split(':')[0], answer["length"]),
+                    get_float_or_error(self.current_lang["LOSS_START"].split(':')[0], answer["start"]),
+                    get_float_or_error(self.current_lang["LOSS_STOP"].split(':')[0], answer["stop"]),
+                    int(get_float_or_error(self.current_lang["LOSS_POINTS"].split(':')[0], answer["points"])))
+            reference = get_float_or_error(self.current_lang["LOSS_REFERENCE"].split(':')[0], answer["reference"])
+
+            filepath = filedialog.asksaveasfilename(
+                defaultextension=".s2p",
+                filetypes=[("Touchstone files", "*.s2p")],
+                title=self.current_lang["LOSS_TITLE"]
+            )
+            if not filepath:
+                return
+        except ValueError as e:
+            messagebox.showerror(self.current_lang["ERROR_INPUT"], f"{self.current_lang['ERROR_INPUT']}: {e}")
+            return
+        except Exception as e:
+            messagebox.showerror(self.current_lang["ERROR_CALC"], f"{self.current_lang['ERROR_UNKNOWN']}: {e}")
+            return
+
+        def work(job):
+            try:
+                return write_touchstone(filepath, line, *args, reference=reference, progress=lambda done, total: job.report(done / total))
+            except JobCancelled:
+                with contextlib.suppress(OSError):
+                    os.remove(filepath)
+                raise
+
+        def done(summary):
+            text = self.current_lang["LOSS_SUMMARY"].format(**summary._asdict(), frequency_ghz=summary.frequency / 1e9)
+            messagebox.showinfo(self.current_lang["LOSS_TITLE"], f"{line.layer}: {text}\n({filepath})")
+
+        self.jobs.submit("loss", self.current_lang["LOSS_TITLE"], work, done, self.show_job_error)
+
+    def show_yield_result(self, result):
+        window = tk.Toplevel(self.master)
+        window.title(f"{self.current_lang['MC_TITLE']} - {result.layer}")
+
+        summary = (f"{self.current_lang['MC_YIELD']} {result.yield_percent:.2f} %   "
+                   f"(N={result.samples}, mean={result.mean:.2f}Ω, σ={result.std:.2f}Ω, "
+                   f"min={result.minimum:.2f}Ω, max={result.maximum:.2f}Ω, "
+                   f"Target range: {result.lower:.2f}Ω - {result.upper:.2f}Ω)")
+        if result.parallel is not None:
+            summary += "   " + self.current_lang["PARALLEL_THROUGHPUT"].format(workers=result.parallel.workers, rate=result.parallel.points_per_second / 1e6)
+        ttk.Label(window, text=summary, wraplength=560, style="Status.TLabel",
+                  foreground="green" if result.yield_percent >= 99.0 else "darkred").pack(padx=10, pady=(10, 5), anchor="w")
+
+        # Histogram: spesifikasyon içindeki kutular yeşil, dışındakiler kırmızı
+        width, height, margin = 560, 260, 30
+        canvas = tk.Canvas(window, width=width, height=height, background="white")
+        canvas.pack(padx=10, pady=(0, 10))
+
+        edges = result.bin_edges
+        span = edges[-1] - edges[0]
+        peak = max(result.counts) or 1
+        bar_width = (width - 2 * margin) / len(result.counts)
+
+        def x_of(value):
+            return margin + (value - edges[0]) / span * (width - 2 * margin)
+
+        for i, count in enumerate(result.counts):
+            center = 0.5 * (edges[i] + edges[i + 1])
+            color = COLOR_SUCCESS if result.lower <= center <= result.upper else "red"
+            bar_height = (height - 2 * margin) * count / peak
+            canvas.create_rectangle(margin + i * bar_width, height - margin - bar_height,
+                                    margin + (i + 1) * bar_width, height - margin, fill=color, outline="white")
+
+        for limit in (result.lower, result.upper):
+            canvas.create_line(x_of(limit), margin / 2, x_of(limit), height - margin, fill="darkred", dash=(4, 2))
+            canvas.create_text(x_of(limit), margin / 2, text=f"{limit:.1f}", fill="darkred", anchor="s")
+
+        canvas.create_line(margin, height - margin, width - margin, height - margin)
+        canvas.create_text(margin, height - margin + 4, text=f"{edges[0]:.1f}", anchor="n")
+        canvas.create_text(width - margin, height - margin + 4, text=f"{edges[-1]:.1f} Ω", anchor="n")
+
+
+def batch_main(args):
+    files = collect_stackup_files(args.paths)
+    if not files:
+        print(f"No stackup files found for: {' '.join(args.paths)}", file=sys.stderr)
+        return 2
+
+    try:
+        values = [get_float_or_error(name, value) for name, value in
+                  (("W", args.width), ("Gap", args.gap), ("S", args.spacing), ("Target", args.target))]
+        tolerance = get_float_or_error("Tolerance", args.tolerance, can_be_zero=True)
+    except ValueError as e:
+        print(f"{MESSAGES['ERROR_INPUT']}: {e}", file=sys.stderr)
+        return 2
+
+    report = run_batch(files, *values, tolerance, jobs=args.jobs, model=args.model)
+    write_batch_report(args.output, report)
+    if args.store:
+        store = ResultStore(args.store)
+        try:
+            store_batch_report(store, report, *values, tolerance, model=args.model)
+        finally:
+            store.close()
+
+    failing = sum(1 for row in report if not row["passed"])
+    print(f"{len(files)} files, {len(report)} layers, {failing} failing -> {args.output}")
+    return 1 if failing else 0
+
+def bench_main(args):
+    def progress(name, result):
+        print(f"{name:40s} {result['median_us']:14.2f} us")
+
+    report = run_benchmarks(seed=args.seed, repeat=args.repeat, include_gui=not args.no_gui, progress=progress)
+    if report["meta"]["gui"] != "ok":
+        print(f"GUI redraw: {report['meta']['gui']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        print(f"\n{'benchmark':40s} {'before (us)':>14s} {'after (us)':>14s} {'ratio':>8s}")
+        for name, before, after, ratio in compare_benchmarks(previous, report):
+            print(f"{name:40s} {before:14.2f} {after:14.2f} {ratio:8.2f}")
+    return 0
+
+def loss_main(args):
+    try:
+        stackup = read_kicad_stackup(args.stackup) if args.stackup.lower().endswith(".kicad_pcb") else Stackup.from_csv(args.stackup)
+        loss = LossParameters(
+            loss_tangent=LossParameters.parse_overrides("Df", args.df_layer),
+            roughness=LossParameters.parse_overrides("Roughness", args.roughness_layer),
+            default_loss_tangent=None if args.df is None else get_float_or_error("Df", args.df, can_be_zero=True),
+            default_roughness=get_float_or_error("Roughness", args.roughness, can_be_zero=True),
+        )
+        line = Solver(stackup).line_model(args.layer, args.width, args.gap, args.spacing, loss)
+        summary = write_touchstone(args.output, line, get_float_or_error("Length", args.length),
+                                   get_float_or_error("Start", args.start), get_float_or_error("Stop", args.stop),
+                                   args.points, reference=get_float_or_error("Reference", args.reference))
+    except ValueError as e:
+        print(f"{MESSAGES['ERROR_INPUT']}: {e}", file=sys.stderr)
+        return 2
+    except Exception as e:
+        print(f"{MESSAGES['ERROR_UNKNOWN']}: {e}", file=sys.stderr)
+        return 1
+
+    print(MESSAGES["LOSS_SUMMARY"].format(**summary._asdict(), frequency_ghz=summary.frequency / 1e9) + f" -> {args.output}")
+    return 0
+
+def yield_main(args):
+    try:
+        stackup = read_kicad_stackup(args.stackup) if args.stackup.lower().endswith(".kicad_pcb") else Stackup.from_csv(args.stackup)
+        with ParallelZdiffExecutor(jobs=args.jobs) as executor:
+            result = Solver(stackup).monte_carlo_yield(
+                args.layer, args.width, args.gap, args.spacing, args.target, args.tolerance, samples=args.samples, seed=args.seed,
+                sigma_W=get_float_or_error("Sigma W", args.sigma_w, can_be_zero=True),
+                sigma_thickness_percent=get_float_or_error("Sigma thickness", args.sigma_thickness, can_be_zero=True),
+                sigma_copper_percent=get_float_or_error("Sigma copper", args.sigma_copper, can_be_zero=True),
+                sigma_dk_percent=get_float_or_error("Sigma Dk", args.sigma_dk, can_be_zero=True),
+                batch_size=args.batch_size, executor=executor)
+    except ValueError as e:
+        print(f"{MESSAGES['ERROR_INPUT']}: {e}", file=sys.stderr)
+        return 2
+    except Exception as e:
+        print(f"{MESSAGES['ERROR_UNKNOWN']}: {e}", file=sys.stderr)
+        return 1
+
+    print(f"{result.layer}: {MESSAGES['MC_YIELD']} {result.yield_percent:.2f} % (N={result.samples}, mean={result.mean:.2f} Ohm, "
+          f"std={result.std:.2f} Ohm, min={result.minimum:.2f}, max={result.maximum:.2f}, target range {result.lower:.2f} - {result.upper:.2f})")
+    for line in format_parallel_stats(result.parallel):
+        print(line)
+    return 0
+
+def serve_main(args):
+    import asyncio
+    service = ZdiffService(coalesce_ms=args.coalesce_ms, max_batch=args.max_batch, cache_size=args.cache_size, ttl=args.keep_alive,
+                           allowed_dirs=args.allow_dir)
+
+    def ready(address):
+        print(f"Listening on {address} (JSON-RPC 2.0, one message per line)", file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.socket, ready=ready))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    except OSError as e:
+        print(f"{MESSAGES['ERROR_UNKNOWN']}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def library_main(args):
+    try:
+        library = StackupLibrary(args.library)
+        if args.add:
+            items = []
+            for filepath in collect_stackup_files(args.add):
+                try:
+                    items.append((os.path.splitext(os.path.basename(filepath))[0], Stackup.from_csv(filepath)))
+                except Exception as e:
+                    # Okunamayan dosya atlanır; diğerleri eklenir
+                    print(f"Skipped {filepath}: {e}", file=sys.stderr)
+            library.add_many(items)
+            print(f"{len(items)} stackups added, {len(library)} in library")
+        if args.remove:
+            library.remove(args.remove)
+        if args.compact:
+            library.compact()
+        if args.export:
+            if not args.output:
+                raise ValueError("--export needs -o/--output.")
+            library.load(args.export).to_csv(args.output)
+            return 0
+    except ValueError as e:
+        print(f"{MESSAGES['ERROR_INPUT']}: {e}", file=sys.stderr)
+        return 2
+
+    if not (args.add or args.remove or args.compact):
+        for entry in library.find(args.search, args.layers, args.min_thickness, args.max_thickness):
+            print(f"{entry.name}\t{entry.layer_count}\t{entry.total_thickness:.3f}")
+    return 0
+
+def optimize_main(args):
+    try:
+        stackup = read_kicad_stackup(args.stackup) if args.stackup.lower().endswith(".kicad_pcb") else Stackup.from_csv(args.stackup)
+        targets = parse_stackup_targets("; ".join(args.target), args.tolerance)
+        limits = {}
+        for name, value in (("Prepreg", args.prepreg), ("Core", args.core)):
+            if value:
+                low, _, high = value.partition(':')
+                limits[name] = (get_float_or_error(f"{name} minimum", low), get_float_or_error(f"{name} maximum", high))
+        start = time.perf_counter()
+        results = optimize_stackup(stackup, targets, args.width, args.gap, args.spacing, dk_values=args.dk, thickness_limits=limits,
+                                   min_total=args.min_total, max_total=args.max_total, samples=args.samples,
+                                   iterations=args.iterations, restarts=args.restarts, jobs=args.jobs, seed=args.seed, keep=args.keep)
+        elapsed = time.perf_counter() - start
+    except ValueError as e:
+        print(f"{MESSAGES['ERROR_INPUT']}: {e}", file=sys.stderr)
+        return 2
+    except Exception as e:
+        print(f"{MESSAGES['ERROR_UNKNOWN']}: {e}", file=sys.stderr)
+        return 1
+
+    print("#\tcost\ttotal (mm)\t" + "\t".join(f"{target.layer} ({target.target:g})" for target in targets))
+    for rank, result in enumerate(results, start=1):
+        print(f"{rank}\t{result.cost:.3f}\t{result.total_thickness:.3f}\t" + "\t".join(f"{item.zdiff:.2f}" for item in result.results)
+              + ("" if result.met else "\tnot met"))
+    print(f"{len(results)} stackups in {elapsed:.2f} s")
+    if results and args.output:
+        results[0].stackup.to_csv(args.output)
+    return 0 if results and results[0].met else 1
+
+def results_main(args):
+    try:
+        zdiff_min, zdiff_max = args.min_zdiff, args.max_zdiff
+        if args.zdiff is not None:
+            zdiff_min, zdiff_max = Solver.tolerance_limits(args.zdiff, get_float_or_error("Tolerance", args.tolerance, can_be_zero=True))
+        store = ResultStore(args.db)
+    except ValueError as e:
+        print(f"{MESSAGES['ERROR_INPUT']}: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        results = store.query(zdiff_min, zdiff_max, layer_kind=args.kind, min_W=args.min_width, max_W=args.max_width,
+                              layer_count=args.layers, model=args.model, limit=args.limit)
+    finally:
+        store.close()
+
+    if args.stackups:
+        # Stackup başına bir satır ve eşleşen sonuç sayısı
+        matches = OrderedDict()
+        for result in results:
+            matches.setdefault((result.stackup, result.name), []).append(result)
+        for (stackup_hash, name), items in matches.items():
+            print(f"{name or stackup_hash[:12]}\t{items[0].layer_count}\t{len(items)} results\t{stackup_hash}")
+        return 0
+
+    for result in results:
+        print(f"{result.name or result.stackup[:12]}\t{result.layer}\t{result.W:.4f}\t{result.Gap:.4f}\t{result.S:.4f}\t{result.zdiff:.2f}\t{result.model}\t{result.source}")
+    return 0
+
+def gui_main(startup_time=False, exit_after_startup=False, disk_cache=True):
+    """GUI'yi açar. startup_time açılış aşamalarını (ms) yazdırır; exit_after_startup ilk pencere çizilince kapatır.
+
+    disk_cache=False Zdiff önbelleğini yalnızca bellekte tutar.
+    """
+    # Ana Pencereyi Oluşturma ve Uygulamayı Başlatma
     try:
+        tk_start = time.perf_counter()
+        _load_tk()
         root = tk.Tk()
-        app = ImpedanceCalculatorApp(root)
+        tk_seconds = time.perf_counter() - tk_start
+        app = ImpedanceCalculatorApp(root, disk_cache)
+        app.profiler.record("startup.tk", tk_seconds)
+
+        def started():
+            # on_first_window'dan sonra çalışır (ondan sonra kuyruğa eklendi)
+            if startup_time:
+                for name, milliseconds in app.startup_times().items():
+                    print(f"{name:<14}{milliseconds:8.1f} ms")
+            if exit_after_startup:
+                app.on_close()
+
+        if startup_time or exit_after_startup:
+            root.after_idle(started)
         root.mainloop()
     except Exception as e:
-        print(f"Critical error occurred during application startup: {e}")
\ No newline at end of file
+        print(f"Critical error occurred during application startup: {e}")
+        return 1
+    return 0
+
+def main(argv=None):
+    """Argüman yoksa GUI'yi açar; 'batch' alt komutu stackup CSV'lerini paralel olarak değerlendirir."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        return gui_main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description=MESSAGES["TITLE"])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch = subparsers.add_parser("batch", help="Evaluate every signal layer of many stackup CSV files (export_to_csv format).")
+    batch.add_argument("paths", nargs="+", help="Directories (all *.csv inside) or glob patterns.")
+    batch.add_argument("-W", "--width", required=True, help="Trace width W (mm).")
+    batch.add_argument("-G", "--gap", required=True, help="Trace gap (mm).")
+    batch.add_argument("-S", "--spacing", required=True, help="Coplanar ground spacing S (mm).")
+    batch.add_argument("-t", "--target", default="100", help="Target Zdiff (Ohm). Default: 100")
+    batch.add_argument("--tolerance", default="10", help="Tolerance (%%). Default: 10")
+    batch.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes. Default: CPU count")
+    batch.add_argument("--model", choices=IMPEDANCE_MODELS, default="formula",
+                       help="Impedance model: closed-form formulas or the 2D field solver. Default: formula")
+    batch.add_argument("-o", "--output", required=True, help="Report file (.csv or .json).")
+    batch.add_argument("--store", metavar="DB", help="Also save stackups and results to this SQLite result database (see 'results').")
+
+    bench = subparsers.add_parser("bench", help="Time the formulas, plane search, CSV I/O and table redraw (fixed seeds and stackups).")
+    bench.add_argument("-o", "--output", help="Save results as JSON.")
+    bench.add_argument("--compare", help="Previous JSON result to compare against.")
+    bench.add_argument("--seed", type=int, default=0, help="Random seed. Default: 0")
+    bench.add_argument("--repeat", type=int, default=5, help="Timing repeats (median is reported). Default: 5")
+    bench.add_argument("--no-gui", action="store_true", help="Skip the Tk table redraw benchmark (use xvfb-run on headless machines instead).")
+
+    loss = subparsers.add_parser("loss", help="Frequency-dependent loss and Zdiff of one signal layer, streamed to a Touchstone (.s2p) file.")
+    loss.add_argument("stackup", help="Stackup CSV (export_to_csv format) or .kicad_pcb board.")
+    loss.add_argument("-l", "--layer", required=True, help="Signal layer name, e.g. '1. Top Layer'.")
+    loss.add_argument("-W", "--width", required=True, help="Trace width W (mm).")
+    loss.add_argument("-G", "--gap", required=True, help="Trace gap (mm).")
+    loss.add_argument("-S", "--spacing", required=True, help="Coplanar ground spacing S (mm).")
+    loss.add_argument("--length", required=True, help="Trace length (mm).")
+    loss.add_argument("--start", default="10e6", help="Start frequency (Hz). Default: 10e6")
+    loss.add_argument("--stop", default="20e9", help="Stop frequency (Hz). Default: 20e9")
+    loss.add_argument("--points", type=int, default=10001, help="Frequency points. Default: 10001")
+    loss.add_argument("--reference", default="100", help="Differential reference impedance (Ohm). Default: 100")
+    loss.add_argument("--df", default=None, help="Loss tangent of all dielectrics. Default: per type (Prepreg/Core 0.02, Solder Mask 0.025)")
+    loss.add_argument("--df-layer", action="append", metavar="NAME=VALUE", help="Loss tangent of one dielectric layer (repeatable).")
+    loss.add_argument("--roughness", default=str(DEFAULT_ROUGHNESS_UM), help=f"Copper roughness Rq (um). Default: {DEFAULT_ROUGHNESS_UM}")
+    loss.add_argument("--roughness-layer", action="append", metavar="NAME=VALUE", help="Roughness Rq (um) of one copper layer (repeatable).")
+    loss.add_argument("-o", "--output", required=True, help="Touchstone file (.s2p).")
+
+    yield_parser = subparsers.add_parser("yield", help="Monte Carlo yield of one signal layer on all cores (same result for any --jobs).")
+    yield_parser.add_argument("stackup", help="Stackup CSV (export_to_csv format) or .kicad_pcb board.")
+    yield_parser.add_argument("-l", "--layer", required=True, help="Signal layer name, e.g. '1. Top Layer'.")
+    yield_parser.add_argument("-W", "--width", required=True, help="Trace width W (mm).")
+    yield_parser.add_argument("-G", "--gap", required=True, help="Trace gap (mm).")
+    yield_parser.add_argument("-S", "--spacing", required=True, help="Coplanar ground spacing S (mm).")
+    yield_parser.add_argument("-t", "--target", default="100", help="Target Zdiff (Ohm). Default: 100")
+    yield_parser.add_argument("--tolerance", default="10", help="Tolerance (%%). Default: 10")
+    yield_parser.add_argument("-n", "--samples", type=int, default=1000000, help="Number of samples. Default: 1000000")
+    yield_parser.add_argument("--seed", type=int, default=0, help="Random seed. Default: 0")
+    yield_parser.add_argument("--sigma-w", default="0.01", help="Etched width sigma (mm). Default: 0.01")
+    yield_parser.add_argument("--sigma-thickness", default="5.0", help="Dielectric thickness sigma (%%). Default: 5")
+    yield_parser.add_argument("--sigma-copper", default="10.0", help="Copper thickness sigma (%%). Default: 10")
+    yield_parser.add_argument("--sigma-dk", default="3.0", help="Dk sigma (%%). Default: 3")
+    yield_parser.add_argument("--batch-size", type=int, default=250000, help="Samples per random batch; part of the seeded result. Default: 250000")
+    yield_parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes. Default: CPU count")
+
+    library = subparsers.add_parser("library", help="Build, list, filter and export a stackup library file (.kslib). Lists entries when no action is given.")
+    library.add_argument("library", help="Library file (.kslib); created on first --add.")
+    library.add_argument("--add", nargs="+", metavar="PATH", help="Add stackup CSVs (directories or glob patterns); the file name becomes the stackup name.")
+    library.add_argument("--remove", metavar="NAME", help="Remove a stackup.")
+    library.add_argument("--compact", action="store_true", help="Rewrite the file without replaced/removed records.")
+    library.add_argument("--export", metavar="NAME", help="Write one stackup as CSV (needs -o).")
+    library.add_argument("-o", "--output", help="CSV file for --export.")
+    library.add_argument("--search", default="", help="List only names containing this text.")
+    library.add_argument("--layers", type=int, help="List only stackups with this many copper layers.")
+    library.add_argument("--min-thickness", type=float, help="Minimum total thickness (mm).")
+    library.add_argument("--max-thickness", type=float, help="Maximum total thickness (mm).")
+
+    optimize = subparsers.add_parser("optimize", help="Search Prepreg/Core thicknesses and Dk values that meet Zdiff targets on several layers.")
+    optimize.add_argument("stackup", help="Starting stackup CSV (export_to_csv format) or .kicad_pcb board.")
+    optimize.add_argument("-t", "--target", action="append", required=True, metavar="LAYER=ZDIFF[/TOL]",
+                          help="Layer target, e.g. '3. Inner Layer 2=85' or '1. Top Layer=USB 2.0' (repeatable).")
+    optimize.add_argument("-W", "--width", required=True, help="Trace width W (mm).")
+    optimize.add_argument("-G", "--gap", required=True, help="Trace gap (mm).")
+    optimize.add_argument("-S", "--spacing", required=True, help="Coplanar ground spacing S (mm).")
+    optimize.add_argument("--tolerance", default="10", help="Tolerance (%%) of targets without one. Default: 10")
+    optimize.add_argument("--dk", type=float, nargs="+", help="Allowed Dk values. Default: the Dk values already in the stackup")
+    optimize.add_argument("--prepreg", metavar="MIN:MAX", help=f"Prepreg thickness range (mm). Default: {':'.join(map(str, OPTIMIZER_THICKNESS_LIMITS['Prepreg']))}")
+    optimize.add_argument("--core", metavar="MIN:MAX", help=f"Core thickness range (mm). Default: {':'.join(map(str, OPTIMIZER_THICKNESS_LIMITS['Core']))}")
+    optimize.add_argument("--min-total", type=float, help="Minimum total board thickness (mm).")
+    optimize.add_argument("--max-total", type=float, help="Maximum total board thickness (mm).")
+    optimize.add_argument("--samples", type=int, default=2048, help="Candidates per iteration. Default: 2048")
+    optimize.add_argument("--iterations", type=int, default=30, help="Iterations per chain. Default: 30")
+    optimize.add_argument("--restarts", type=int, default=4, help="Independent chains (run in parallel). Default: 4")
+    optimize.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes. Default: CPU count")
+    optimize.add_argument("--seed", type=int, default=0, help="Random seed. Default: 0")
+    optimize.add_argument("--keep", type=int, default=10, help="Number of ranked stackups to report. Default: 10")
+    optimize.add_argument("-o", "--output", help="Save the best stackup as CSV.")
+
+    results = subparsers.add_parser("results", help="Query stored stackups and results (saved by the GUI, audits, sweeps and 'batch --store') without recomputing.")
+    results.add_argument("--db", default=RESULT_STORE_PATH, help=f"Result database. Default: {RESULT_STORE_PATH}")
+    results.add_argument("--zdiff", type=float, help="Target Zdiff (Ohm); matches results within --tolerance.")
+    results.add_argument("--tolerance", default="10", help="Tolerance (%%) around --zdiff. Default: 10")
+    results.add_argument("--min-zdiff", type=float, help="Minimum Zdiff (Ohm), when --zdiff is not given.")
+    results.add_argument("--max-zdiff", type=float, help="Maximum Zdiff (Ohm), when --zdiff is not given.")
+    kind = results.add_mutually_exclusive_group()
+    kind.add_argument("--inner", dest="kind", action="store_const", const="inner", help="Only inner signal layers.")
+    kind.add_argument("--outer", dest="kind", action="store_const", const="outer", help="Only the top and bottom layers.")
+    results.add_argument("--min-width", type=float, help="Minimum trace width W (mm).")
+    results.add_argument("--max-width", type=float, help="Maximum trace width W (mm).")
+    results.add_argument("--layers", type=int, help="Only stackups with this many copper layers.")
+    results.add_argument("--model", choices=IMPEDANCE_MODELS, help="Only results of this impedance model.")
+    results.add_argument("--limit", type=int, help="Maximum number of results.")
+    results.add_argument("--stackups", action="store_true", help="List matching stackups (one line each) instead of results.")
+
+    serve = subparsers.add_parser("serve", help="Run a local JSON-RPC service (methods: zdiff, stackup.register, stats) for scripts and other tools.")
+    serve.add_argument("--host", default=SERVICE_HOST, help=f"TCP address to listen on. Default: {SERVICE_HOST}")
+    serve.add_argument("--port", type=int, default=SERVICE_PORT, help=f"TCP port. Default: {SERVICE_PORT}")
+    serve.add_argument("--socket", help="Listen on this Unix socket path instead of TCP.")
+    serve.add_argument("--coalesce-ms", type=float, default=SERVICE_COALESCE_MS, help=f"Wait this long for concurrent requests to batch together. Default: {SERVICE_COALESCE_MS}")
+    serve.add_argument("--max-batch", type=int, default=SERVICE_MAX_BATCH, help=f"Largest batch. Default: {SERVICE_MAX_BATCH}")
+    serve.add_argument("--allow-dir", action="append", help="Directory that 'path' requests may read .csv/.kicad_pcb files from (repeatable). Default: the current directory.")
+    serve.add_argument("--cache-size", type=int, default=SERVICE_STACKUP_CACHE_SIZE, help=f"Stackups kept in memory. Default: {SERVICE_STACKUP_CACHE_SIZE}")
+    serve.add_argument("--keep-alive", type=float, default=SERVICE_STACKUP_TTL, help=f"Seconds an unused stackup stays cached. Default: {SERVICE_STACKUP_TTL:.0f}")
+
+    gui = subparsers.add_parser("gui", help="Open the GUI (same as running without arguments).")
+    gui.add_argument("--startup-time", action="store_true", help="Print the startup stages (ms) once the first window is drawn.")
+    gui.add_argument("--exit-after-startup", action="store_true", help="Close the window as soon as it is drawn (for timing).")
+    gui.add_argument("--no-disk-cache", action="store_true", help="Keep the Zdiff cache in memory only (nothing is written to ~/.kicad-impedance-calculator).")
+
+    args = parser.parse_args(argv)
+    if args.command == "gui":
+        return gui_main(args.startup_time, args.exit_after_startup, not args.no_disk_cache)
+    if args.command == "serve":
+        return serve_main(args)
+    if args.command == "library":
+        return library_main(args)
+    if args.command == "bench":
+        return bench_main(args)
+    if args.command == "loss":
+        return loss_main(args)
+    if args.command == "yield":
+        return yield_main(args)
+    if args.command == "results":
+        return results_main(args)
+    if args.command == "optimize":
+        return optimize_main(args)
+    return batch_main(args)
+
+
+# Modül tanımları burada biter; startup.import süresi bu noktaya kadar ölçülür
+_MODULE_READY = time.perf_counter()
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,12 @@
+import importlib.util
+import os
+import sys
+
+# Betik tire içeren bir dosya adına sahip olduğundan README'deki gibi yüklenir; testler "import kicalc" ile kullanır
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Kicad-Differential-Impedance-Calculator.py")
+
+if "kicalc" not in sys.modules:
+    spec = importlib.util.spec_from_file_location("kicalc", SCRIPT)
+    kicalc = importlib.util.module_from_spec(spec)
+    sys.modules["kicalc"] = kicalc
+    spec.loader.exec_module(kicalc)
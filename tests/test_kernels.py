@@ -0,0 +1,49 @@
+import math
+
+import pytest
+
+import kicalc
+
+np = pytest.importorskip("numpy")
+
+
+def random_geometry(rng, n):
+    # W/H 0.1-5 arası: geniş ve dar rejim ile S < H (koplanar) ve S >= H noktaları birlikte örneklenir
+    H = rng.uniform(0.05, 1.0, n)
+    W = H * rng.uniform(0.1, 5.0, n)
+    Gap = H * rng.uniform(0.2, 4.0, n)
+    S = H * rng.uniform(0.2, 3.0, n)
+    T = rng.uniform(0.009, 0.07, n)
+    Er = rng.uniform(2.0, 6.0, n)
+    return W, Gap, S, T, H, Er
+
+
+def test_batch_matches_scalar():
+    rng = np.random.default_rng(0)
+    W, Gap, S, T, H, Er = random_geometry(rng, 20000)
+    Z = kicalc.calculate_zdiff_batch(W, Gap, S, T, H, Er)
+    expected = np.array([kicalc.calculate_zdiff(*point) for point in zip(W.tolist(), Gap.tolist(), S.tolist(), T.tolist(), H.tolist(), Er.tolist())])
+
+    # Örneklemin her iki rejimi ve koplanar düzeltmeyi kapsadığı doğrulanır
+    assert (W / H >= 1.0).any() and (W / H < 1.0).any() and (S < H).any() and (S >= H).any()
+    assert np.max(np.abs(Z - expected) / np.abs(expected)) < 1e-12
+
+
+@pytest.mark.parametrize("function, scalar", [
+    (kicalc.calculate_wide_traces_batch, kicalc.calculate_wide_traces),
+    (kicalc.calculate_narrow_traces_batch, kicalc.calculate_narrow_traces),
+])
+def test_regime_kernels_match_scalar(function, scalar):
+    rng = np.random.default_rng(1)
+    W, Gap, _, T, H, Er = random_geometry(rng, 2000)
+    Z = function(W, Gap, T, H, Er)
+    for i in range(len(Z)):
+        assert Z[i] == pytest.approx(scalar(W[i], Gap[i], T[i], H[i], Er[i]), rel=1e-12)
+
+
+def test_batch_broadcasts_scalars():
+    W = np.linspace(0.05, 0.5, 50)
+    Z = kicalc.calculate_zdiff_batch(W, 0.2, 0.3, 0.035, 0.2, 4.2)
+    assert Z.shape == W.shape
+    for w, z in zip(W.tolist(), Z.tolist()):
+        assert math.isclose(z, kicalc.calculate_zdiff(w, 0.2, 0.3, 0.035, 0.2, 4.2), rel_tol=1e-12)
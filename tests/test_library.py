@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+import kicalc
+
+
+def stackups(prefix, count, layers=4):
+    return [(f"{prefix} {i}", kicalc.Stackup.generate(layers + 2 * (i % 3))) for i in range(count)]
+
+
+def assert_contents(library, items):
+    assert sorted(library.entries) == sorted(name for name, _ in items)
+    for name, stackup in items:
+        assert library.load(name).rows == stackup.rows
+
+
+def cut_points(start, stop):
+    # Kayıtların, indeksin ve trailer'ın içi ile sınırları
+    trailer = kicalc.StackupLibrary.TRAILER.size
+    points = set(range(start, stop, 97)) | {start + 1, stop - trailer, stop - trailer + 1, stop - 1}
+    return sorted(point for point in points if start < point < stop)
+
+
+def test_truncated_append_keeps_earlier_entries(tmp_path):
+    path = str(tmp_path / "lib.kslib")
+    first = stackups("first", 3)
+    kicalc.StackupLibrary(path).add_many(first)
+    with open(path, 'rb') as f:
+        before = f.read()
+
+    second = stackups("second", 4)
+    kicalc.StackupLibrary(path).add_many(second)
+    with open(path, 'rb') as f:
+        after = f.read()
+    assert after.startswith(before)
+
+    third = stackups("third", 2)
+    for cut in cut_points(len(before), len(after)):
+        # Yarıda kesilen ikinci ekleme: yalnızca o ekleme kaybolur
+        with open(path, 'wb') as f:
+            f.write(after[:cut])
+        library = kicalc.StackupLibrary(path)
+        assert_contents(library, first)
+
+        library.add_many(third)
+        assert_contents(library, first + third)
+        assert_contents(kicalc.StackupLibrary(path), first + third)
+
+
+def test_truncated_first_write_opens_empty(tmp_path):
+    path = str(tmp_path / "lib.kslib")
+    kicalc.StackupLibrary(path).add_many(stackups("first", 2))
+    size = os.path.getsize(path)
+    with open(path, 'r+b') as f:
+        f.truncate(size - 3)
+
+    library = kicalc.StackupLibrary(path)
+    assert len(library) == 0
+    items = stackups("again", 2)
+    library.add_many(items)
+    assert_contents(kicalc.StackupLibrary(path), items)
+
+
+def test_replace_and_remove_survive_reopen(tmp_path):
+    path = str(tmp_path / "lib.kslib")
+    library = kicalc.StackupLibrary(path)
+    library.add_many(stackups("a", 3))
+    replacement = kicalc.Stackup.generate(8)
+    library.add("a 1", replacement)
+    library.remove("a 2")
+
+    reopened = kicalc.StackupLibrary(path)
+    assert sorted(reopened.entries) == ["a 0", "a 1"]
+    assert reopened.load("a 1").rows == replacement.rows
+    assert [entry.name for entry in reopened.find(layer_count=8)] == ["a 1"]
+
+    reopened.compact()
+    assert_contents(kicalc.StackupLibrary(path), [("a 0", kicalc.Stackup.generate(4)), ("a 1", replacement)])
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "other.kslib"
+    path.write_bytes(b"not a library")
+    with pytest.raises(ValueError):
+        kicalc.StackupLibrary(str(path))
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import kicalc
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def request(method, params=None, request_id=1):
+    message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+    if params is not None:
+        message["params"] = params
+    return json.dumps(message)
+
+
+async def call(service, method, params=None, request_id=1):
+    return await service.handle_line(request(method, params, request_id))
+
+
+def error_code(response):
+    return response["error"]["code"]
+
+
+ROWS = kicalc.Stackup.generate(6).rows
+GEOMETRY = {"W": 0.2, "Gap": 0.2, "S": 1.0}
+
+
+def expected_zdiff(layer):
+    return kicalc.Solver(kicalc.Stackup(ROWS)).solve(layer, 0.2, 0.2, 1.0).zdiff
+
+
+def test_register_and_query_by_stackup_id():
+    async def scenario():
+        service = kicalc.ZdiffService()
+        registered = (await call(service, "stackup.register", {"stackup": ROWS}))["result"]
+        response = await call(service, "zdiff", dict(GEOMETRY, stackup_id=registered["stackup_id"], layer="1. Top Layer", target=100))
+        return registered, response["result"], await call(service, "stats")
+
+    registered, result, stats = run(scenario())
+    assert registered["stackup_id"] == kicalc.Stackup(ROWS).content_hash()
+    assert registered["layers"] == kicalc.Stackup(ROWS).signal_layers()
+    assert result["zdiff"] == pytest.approx(expected_zdiff("1. Top Layer"), rel=1e-12)
+    assert result["passed"] == (result["lower"] <= result["zdiff"] <= result["upper"])
+    assert stats["result"]["stackups"] == 1
+
+
+def test_concurrent_requests_share_one_batch():
+    layers = kicalc.Stackup(ROWS).signal_layers()
+
+    async def scenario():
+        # Uzun bekleme süresi: aynı anda gönderilen tüm istekler ilk partiye girer
+        service = kicalc.ZdiffService(coalesce_ms=50)
+        stackup_id = (await call(service, "stackup.register", {"stackup": ROWS}))["result"]["stackup_id"]
+        responses = await asyncio.gather(*(call(service, "zdiff", dict(GEOMETRY, stackup_id=stackup_id, layer=layer), i)
+                                           for i, layer in enumerate(layers * 25)))
+        return service, responses
+
+    service, responses = run(scenario())
+    assert service.batches == 1
+    assert service.largest_batch == service.points == len(layers) * 25
+    for i, response in enumerate(responses):
+        assert response["id"] == i
+        assert response["result"]["zdiff"] == pytest.approx(expected_zdiff(response["result"]["layer"]), rel=1e-12)
+
+
+def test_all_layers_in_one_request():
+    response = run(call(kicalc.ZdiffService(), "zdiff", dict(GEOMETRY, stackup=ROWS)))
+    assert [item["layer"] for item in response["result"]] == kicalc.Stackup(ROWS).signal_layers()
+
+
+def test_error_codes():
+    async def scenario():
+        service = kicalc.ZdiffService()
+        return {
+            "unknown method": await call(service, "no.such.method", {}),
+            "unknown layer": await call(service, "zdiff", dict(GEOMETRY, stackup=ROWS, layer="No Such Layer")),
+            "plane layer": await call(service, "zdiff", dict(GEOMETRY, stackup=ROWS, layer="2. Inner Layer 1")),
+            "bad width": await call(service, "zdiff", dict(GEOMETRY, stackup=ROWS, layer="1. Top Layer", W="abc")),
+            "bad rows": await call(service, "zdiff", dict(GEOMETRY, stackup=[["only", "three", "cells"]])),
+            "params not an object": await service.handle_line(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "zdiff", "params": [1]})),
+            "unknown stackup": await call(service, "zdiff", dict(GEOMETRY, stackup_id="0" * 40)),
+            "parse error": await service.handle_line("{not json"),
+            "invalid request": await service.handle_line(json.dumps({"id": 1, "method": "zdiff"})),
+        }
+
+    responses = run(scenario())
+    assert error_code(responses.pop("unknown method")) == kicalc.RPC_METHOD_NOT_FOUND == -32601
+    assert error_code(responses.pop("parse error")) == kicalc.RPC_PARSE_ERROR == -32700
+    assert error_code(responses.pop("invalid request")) == kicalc.RPC_INVALID_REQUEST
+    assert error_code(responses.pop("unknown stackup")) == kicalc.RPC_UNKNOWN_STACKUP
+    for name, response in responses.items():
+        assert error_code(response) == kicalc.RPC_INVALID_PARAMS == -32602, name
+
+
+def test_notifications_and_batches():
+    async def scenario():
+        service = kicalc.ZdiffService()
+        notification = await service.handle_line(json.dumps({"jsonrpc": "2.0", "method": "stats"}))
+        batch = await service.handle_line("[" + ",".join(request("zdiff", dict(GEOMETRY, stackup=ROWS, layer=layer), i)
+                                                         for i, layer in enumerate(["1. Top Layer", "6. Bottom Layer"])) + "]")
+        empty = await service.handle_line("[]")
+        return notification, batch, empty
+
+    notification, batch, empty = run(scenario())
+    assert notification is None
+    assert [response["result"]["layer"] for response in batch] == ["1. Top Layer", "6. Bottom Layer"]
+    assert error_code(empty) == kicalc.RPC_INVALID_REQUEST
+
+
+@pytest.fixture
+def stackup_dirs(tmp_path):
+    allowed, outside = tmp_path / "allowed", tmp_path / "outside"
+    allowed.mkdir()
+    outside.mkdir()
+    kicalc.Stackup(ROWS).to_csv(str(allowed / "board.csv"))
+    kicalc.Stackup(ROWS).to_csv(str(outside / "board.csv"))
+    (allowed / "notes.txt").write_text("1. Top Layer")
+    return allowed, outside
+
+
+def test_path_inside_allowed_dirs_is_loaded_once(stackup_dirs, monkeypatch):
+    allowed, _ = stackup_dirs
+    reads = []
+    read_file = kicalc.StackupCache.read_file
+    monkeypatch.setattr(kicalc.StackupCache, "read_file", staticmethod(lambda path: reads.append(path) or read_file(path)))
+
+    async def scenario():
+        service = kicalc.ZdiffService(allowed_dirs=[str(allowed)])
+        params = dict(GEOMETRY, path=str(allowed / "board.csv"), layer="1. Top Layer")
+        # Aynı dosya için eşzamanlı istekler tek okumayı paylaşır; dosya değişmedikçe yeniden okunmaz
+        responses = await asyncio.gather(*(call(service, "zdiff", params, i) for i in range(8)))
+        return responses + [await call(service, "zdiff", params)]
+
+    responses = run(scenario())
+    assert len(reads) == 1
+    for response in responses:
+        assert response["result"]["zdiff"] == pytest.approx(expected_zdiff("1. Top Layer"), rel=1e-12)
+
+
+def test_paths_outside_allowed_dirs_are_rejected(stackup_dirs):
+    allowed, outside = stackup_dirs
+    link = allowed / "link.csv"
+    os.symlink(outside / "board.csv", link)
+
+    async def scenario():
+        service = kicalc.ZdiffService(allowed_dirs=[str(allowed)])
+        paths = [outside / "board.csv", allowed / ".." / "outside" / "board.csv", link, allowed / "notes.txt", allowed / "missing.csv"]
+        return [await call(service, "stackup.register", {"path": str(path)}) for path in paths]
+
+    for response in run(scenario()):
+        assert error_code(response) == kicalc.RPC_INVALID_PARAMS
+
+
+def test_client_over_tcp():
+    def client(address):
+        host, port = address.rsplit(":", 1)
+        with kicalc.ImpedanceServiceClient(host, int(port), timeout=10) as connection:
+            registered = connection.call("stackup.register", stackup=ROWS)
+            result = connection.call("zdiff", stackup_id=registered["stackup_id"], layer="6. Bottom Layer", **GEOMETRY)
+            with pytest.raises(kicalc.RpcError) as error:
+                connection.call("zdiff", stackup_id=registered["stackup_id"], layer="No Such Layer", **GEOMETRY)
+        return result, error.value.code
+
+    async def scenario():
+        ready = asyncio.get_running_loop().create_future()
+        server = asyncio.ensure_future(kicalc.ZdiffService().serve(port=0, ready=ready.set_result))
+        try:
+            # İstemci engelleyen soket kullanır; olay döngüsü sunucuya hizmet etmeye devam etmelidir
+            return await asyncio.get_running_loop().run_in_executor(None, client, await ready)
+        finally:
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+
+    result, code = run(scenario())
+    assert result["zdiff"] == pytest.approx(expected_zdiff("6. Bottom Layer"), rel=1e-12)
+    assert code == kicalc.RPC_INVALID_PARAMS
@@ -0,0 +1,172 @@
+import math
+import random
+
+import pytest
+
+import kicalc
+
+
+def legacy_find_nearest_plane_and_dielectric(rows, signal_index):
+    """PlaneIndex'ten önceki GUI metodunun (ImpedanceCalculatorApp.find_nearest_plane_and_dielectric) satırlar üzerindeki kopyası."""
+    stackup_len = len(rows)
+
+    def get_dielectric_properties_to_plane(start_index, end_index, step):
+        total_H = 0.0
+        weighted_H_sum = 0.0
+        for i in range(start_index, end_index + step, step):
+            item = rows[i]
+            if item[4] in ["Prepreg", "Core", "Solder Mask"]:
+                try:
+                    thickness = kicalc.get_float_or_error("", item[2], can_be_zero=True)
+                    er = kicalc.get_float_or_error("", item[3], can_be_zero=True)
+                    if thickness <= 0 or er <= 0:
+                        raise ValueError
+                    total_H += thickness
+                    weighted_H_sum += thickness * er
+                except ValueError:
+                    raise Exception(f"{kicalc.MESSAGES['COL_THICKNESS']}/{kicalc.MESSAGES['COL_DK']} value for layer ({item[0]}) is invalid or zero/negative.")
+            elif item[1] == "Signal":
+                raise Exception(f"Another signal layer ({item[0]}) found between signal layer ({rows[signal_index][0]}) and the Plane. Stackup error!")
+        if total_H == 0:
+            return 0.0, 1.0
+        return total_H, weighted_H_sum / total_H
+
+    is_top_layer = (rows[signal_index][0] == "1. Top Layer")
+    is_bottom_layer = (rows[signal_index][0].endswith("Bottom Layer"))
+
+    down_plane_index = -1
+    current_index = signal_index + 1
+    while current_index < stackup_len:
+        if rows[current_index][1] == "Plane":
+            down_plane_index = current_index
+            break
+        if rows[current_index][4] == "Copper" and rows[current_index][1] != "Plane":
+            break
+        current_index += 1
+
+    H_down, Er_down, ref_down = (float('inf'), 0.0, None)
+    if down_plane_index != -1:
+        H_down, Er_down = get_dielectric_properties_to_plane(signal_index + 1, down_plane_index, 1)
+        ref_down = rows[down_plane_index][0]
+
+    up_plane_index = -1
+    current_index = signal_index - 1
+    while current_index >= 0:
+        if rows[current_index][1] == "Plane":
+            up_plane_index = current_index
+            break
+        if rows[current_index][4] == "Copper" and rows[current_index][1] != "Plane":
+            break
+        current_index -= 1
+
+    H_up, Er_up, ref_up = (float('inf'), 0.0, None)
+    if up_plane_index != -1:
+        H_up, Er_up = get_dielectric_properties_to_plane(signal_index - 1, up_plane_index, -1)
+        ref_up = rows[up_plane_index][0]
+
+    if is_top_layer:
+        if down_plane_index != -1 and H_down > 0:
+            return H_down, Er_down, ref_down
+        raise Exception("No 'Plane' layer found immediately below the Top Layer. Stackup error!")
+    elif is_bottom_layer:
+        if up_plane_index != -1 and H_up > 0:
+            return H_up, Er_up, ref_up
+        raise Exception("No 'Plane' layer found immediately above the Bottom Layer. Stackup error!")
+    else:
+        down_available = H_down != float('inf') and H_down > 0
+        up_available = H_up != float('inf') and H_up > 0
+        if not down_available and not up_available:
+            raise Exception(f"{rows[signal_index][0]} (Inner Layer): No 'Plane' layer found above or below. Stackup error!")
+        elif down_available and not up_available:
+            return H_down, Er_down, ref_down
+        elif not down_available and up_available:
+            return H_up, Er_up, ref_up
+        elif H_down <= H_up:
+            return H_down, Er_down, ref_down
+        else:
+            return H_up, Er_up, ref_up
+
+
+def outcome(function, *args):
+    try:
+        return "ok", function(*args)
+    except Exception as e:
+        return "error", str(e)
+
+
+def assert_same(new, legacy):
+    assert new[0] == legacy[0], (new, legacy)
+    if new[0] == "error":
+        assert new[1] == legacy[1]
+    else:
+        (H, Er, reference), (legacy_H, legacy_Er, legacy_reference) = new[1], legacy[1]
+        assert reference == legacy_reference
+        assert math.isclose(H, legacy_H, rel_tol=1e-9, abs_tol=1e-12)
+        assert math.isclose(Er, legacy_Er, rel_tol=1e-9, abs_tol=1e-12)
+
+
+# Eşit H'li iki plane (eşitlikte aşağı yön seçilir) sık görülsün diye kalınlıklar küçük bir kümeden de seçilir
+THICKNESS_VALUES = ["0.1", "0.15", "0.2", "0,2", "0.51", "0.01"]
+INVALID_VALUES = ["", "0", "-0.1", "abc"]
+
+
+def random_value(rng, values):
+    roll = rng.random()
+    if roll < 0.03:
+        return rng.choice(INVALID_VALUES)
+    if roll < 0.5:
+        return rng.choice(values)
+    return f"{rng.uniform(0.01, 1.0):.4f}"
+
+
+def randomize(rng, rows):
+    rows = [list(row) for row in rows]
+    for row in rows:
+        if row[4] == "Copper":
+            row[1] = rng.choice(["Signal", "Plane"])
+        else:
+            row[2] = random_value(rng, THICKNESS_VALUES)
+            row[3] = random_value(rng, ["3.5", "4.1", "4.5"])
+    return rows
+
+
+def test_plane_search_matches_legacy_on_random_stackups():
+    rng = random.Random(0)
+    checked = 0
+    for trial in range(1500):
+        stackup = kicalc.Stackup.generate(rng.choice([2, 4, 6, 8, 10, 12, 16]))
+        # Önce kurulan indeks, update_rows sonrası geçersiz kılınmalıdır
+        stackup.plane_index()
+        rows = randomize(rng, stackup.rows)
+        stackup.update_rows(dict(enumerate(rows)))
+        for i, row in enumerate(stackup.rows):
+            if row[4] == "Copper" and row[1] == "Signal":
+                assert_same(outcome(stackup.find_nearest_plane_and_dielectric, i),
+                            outcome(legacy_find_nearest_plane_and_dielectric, stackup.rows, i))
+                checked += 1
+    assert checked > 5000
+
+
+@pytest.mark.parametrize("layers", [2, 4, 6, 8, 12, 32])
+def test_default_stackups_match_legacy(layers):
+    stackup = kicalc.Stackup.generate(layers)
+    for i, row in enumerate(stackup.rows):
+        if row[1] == "Signal":
+            assert_same(outcome(stackup.find_nearest_plane_and_dielectric, i),
+                        outcome(legacy_find_nearest_plane_and_dielectric, stackup.rows, i))
+
+
+def test_signal_plane_flip_changes_reference():
+    stackup = kicalc.Stackup.generate(6)
+    inner = stackup.index_of("3. Inner Layer 2")
+    assert stackup.find_nearest_plane_and_dielectric(inner)[2] == "2. Inner Layer 1"
+
+    # L2 sinyal yapılınca L3'ün iki komşu bakırı da sinyaldir; arama iki yönde de plane bulamadan durur
+    row = list(stackup.rows[stackup.index_of("2. Inner Layer 1")])
+    row[1] = "Signal"
+    _, topology_changed = stackup.update_rows({stackup.index_of("2. Inner Layer 1"): row})
+    assert topology_changed
+    assert_same(outcome(stackup.find_nearest_plane_and_dielectric, inner),
+                outcome(legacy_find_nearest_plane_and_dielectric, stackup.rows, inner))
+    with pytest.raises(Exception, match="No 'Plane' layer found above or below"):
+        stackup.find_nearest_plane_and_dielectric(inner)
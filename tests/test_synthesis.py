@@ -0,0 +1,74 @@
+import pytest
+
+import kicalc
+
+
+@pytest.fixture(scope="module")
+def solver():
+    return kicalc.Solver(kicalc.Stackup.generate(8))
+
+
+def round_trip(solver, result, S):
+    _, T, H, Er, _ = solver.layer_parameters(result.layer)
+    return kicalc.calculate_zdiff(result.W, result.Gap, S, T, H, Er)
+
+
+@pytest.mark.parametrize("target", [50, 85, 90, 100, 120])
+@pytest.mark.parametrize("S", [0.1, 1.0])
+def test_synthesized_width_reaches_target(solver, target, S):
+    results = solver.synthesize_all(target, 0.2, 0.2, S, solve_for="W")
+    assert [result.layer for result in results] == solver.stackup.signal_layers()
+    for result in results:
+        assert result.achieved and result.note == ""
+        assert result.Gap == 0.2
+        assert round_trip(solver, result, S) == pytest.approx(target, rel=1e-6)
+        assert result.zdiff == round_trip(solver, result, S)
+
+
+@pytest.mark.parametrize("target", [85, 90, 100])
+def test_synthesized_gap_reaches_target(solver, target):
+    for result in solver.synthesize_all(target, 0.2, 0.2, 1.0, solve_for="Gap"):
+        assert result.achieved
+        assert result.W == 0.2
+        assert round_trip(solver, result, 1.0) == pytest.approx(target, rel=1e-6)
+
+
+def test_synthesize_accepts_text_inputs(solver):
+    result = solver.synthesize("1. Top Layer", "100", "0,2", "0,2", "1,0")
+    assert result.achieved
+    assert round_trip(solver, result, 1.0) == pytest.approx(100, rel=1e-6)
+
+
+@pytest.mark.parametrize("target, solve_for", [(1000, "W"), (10, "Gap"), (1000, "Gap")])
+def test_unreachable_target_returns_closest_value(solver, target, solve_for):
+    for result in solver.synthesize_all(target, 0.2, 0.2, 1.0, solve_for=solve_for):
+        assert result.achieved is False
+        assert result.note == kicalc.MESSAGES["SYNTH_UNREACHABLE"]
+        # Gösterilen değer aralığın en yakın ucudur ve Zdiff o değerle hesaplanmıştır
+        assert result.zdiff == round_trip(solver, result, 1.0)
+        assert abs(result.zdiff - target) > 1.0
+
+
+def test_unknown_variable_is_rejected(solver):
+    with pytest.raises(ValueError):
+        solver.synthesize("1. Top Layer", 100, 0.2, 0.2, 1.0, solve_for="S")
+
+
+def test_synthesize_all_reports_progress_per_layer(solver):
+    calls = []
+    solver.synthesize_all(100, 0.2, 0.2, 1.0, progress=lambda done, total: calls.append((done, total)))
+    total = len(solver.stackup.signal_layers())
+    assert calls == [(done, total) for done in range(1, total + 1)]
+
+
+def test_synthesize_all_stops_when_progress_raises(solver):
+    # GUI işi iptal edildiğinde job.report JobCancelled fırlatır; kalan katmanlar çözülmemelidir
+    solved = []
+
+    def progress(done, total):
+        solved.append(done)
+        raise kicalc.JobCancelled()
+
+    with pytest.raises(kicalc.JobCancelled):
+        solver.synthesize_all(100, 0.2, 0.2, 1.0, progress=progress)
+    assert solved == [1]
@@ -0,0 +1,58 @@
+import multiprocessing
+
+import pytest
+
+import kicalc
+
+pytest.importorskip("numpy")
+
+# İki yönde de plane'i olan iç katman: her örnekte referans seçimi de boru hattında yapılır
+LAYER = "3. Inner Layer 2"
+ARGS = (LAYER, 0.2, 0.2, 1.0, 100, 10)
+OPTIONS = dict(samples=50000, seed=7, batch_size=20000, sigma_W=0.02)
+
+
+def without_stats(result):
+    # İşçi başına verim çalıştırmaya özgüdür; geri kalan her alan birebir aynı olmalıdır
+    return result._replace(parallel=None)
+
+
+@pytest.fixture(scope="module")
+def solver():
+    return kicalc.Solver(kicalc.Stackup.generate(6))
+
+
+@pytest.fixture(scope="module")
+def reference(solver):
+    return solver.monte_carlo_yield(*ARGS, **OPTIONS)
+
+
+@pytest.mark.parametrize("jobs", [1, 2, 3])
+def test_same_result_for_any_jobs(solver, reference, jobs):
+    # Küçük parçalar ve sıfır eşik: jobs > 1 iken her parti gerçekten süreç havuzunda hesaplanır
+    if jobs > 1 and multiprocessing.get_start_method() != "fork":
+        pytest.skip("workers import the script by module name, which needs the fork start method here")
+    with kicalc.ParallelZdiffExecutor(jobs=jobs, chunk_size=4096, min_parallel_points=1) as executor:
+        result = solver.monte_carlo_yield(*ARGS, executor=executor, **OPTIONS)
+    assert without_stats(result) == without_stats(reference)
+    assert result.parallel.points == OPTIONS["samples"]
+    assert result.parallel.chunks == sum(-(-n // 4096) for n in (20000, 20000, 10000))
+
+
+def test_seed_changes_result(solver, reference):
+    other = solver.monte_carlo_yield(*ARGS, **dict(OPTIONS, seed=8))
+    assert other.mean != reference.mean
+
+
+def test_result_is_consistent(reference):
+    assert reference.samples == OPTIONS["samples"]
+    assert sum(reference.counts) == OPTIONS["samples"]
+    assert len(reference.bin_edges) == len(reference.counts) + 1
+    assert reference.minimum <= reference.mean <= reference.maximum
+    assert 0.0 < reference.yield_percent <= 100.0
+
+
+@pytest.mark.parametrize("samples", [0, 0.5, -3])
+def test_rejects_fewer_than_one_sample(solver, samples):
+    with pytest.raises(ValueError):
+        solver.monte_carlo_yield(*ARGS, samples=samples)